@@ -10,15 +10,21 @@ from langgraph.graph.message import add_messages
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 
+from common.usage import usage_callback, usage_tracker
+from common.rate_limit import rate_limited_http_client
+
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
 
+## One pooled client for every compiled graph; a client per request would leak its connection pool
+http_client = rate_limited_http_client()
+
 def get_llm(provider, model, api_key):
 
     if provider == 'openai':
-        return ChatOpenAI(model=model, api_key=api_key)
+        return ChatOpenAI(model=model, api_key=api_key, callbacks=[usage_callback], stream_usage=True, http_client=http_client)
 
     else:
         raise Exception("Provider not supported yet!")
@@ -127,6 +133,10 @@ def build_graph(llm_data, nodes, edges):
 def api_test():
     return "OK"
 
+@app.route("/usage", methods=["GET"])
+def usage():
+    return jsonify(usage_tracker.snapshot())
+
 @app.route("/graph-compile", methods=['POST'])
 def graph_compile():
     body_data = request.get_json()
@@ -8,6 +8,10 @@ from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 
+from common.usage import usage_callback
+from common.rate_limit import rate_limited_http_client
+from common.streaming import chat_turn
+
 load_dotenv()
 
 class State(TypedDict):
@@ -15,7 +19,9 @@ class State(TypedDict):
 
 graph_builder = StateGraph(State)
 
-llm = ChatOpenAI(model="gpt-4o", api_key=os.getenv("OPENAI_SECRET"))
+## usage_callback records tokens/latency per call, attributed to thread_id and graph node
+## rate_limited_http_client queues every request through the shared OpenAI limiter
+llm = ChatOpenAI(model="gpt-4o", api_key=os.getenv("OPENAI_SECRET"), callbacks=[usage_callback], stream_usage=True, http_client=rate_limited_http_client())
 
 def chatbot(state: State):
     return {"messages": [llm.invoke(state["messages"])]}
@@ -27,11 +33,10 @@ graph_builder.add_edge("chatbot", END)
 
 graph = graph_builder.compile()
 
-def stream_graph_updates(graph, user_input: str):
+## Streams tokens as they arrive, then prints time-to-first-token and tokens/sec
+def stream_graph_updates(graph, user_input: str, config=None):
 
-    for event in graph.stream({"messages": [{"role": "user", "content": user_input}]}):
-        for value in event.values():
-            print("Assistant:", value["messages"][-1].content)
+    return chat_turn(graph, user_input, config)
 
 if __name__ == "__main__":
     while True:
@@ -1,17 +1,26 @@
 from flask import Flask, request, jsonify, Response
 from langgraph.graph import START, END
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph.message import add_messages
-from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate
 import json
+import queue
+import threading
+from collections import Counter
 from flask_cors import CORS
+from pydantic import BaseModel, Field
 
 from typing_extensions import TypedDict
 from typing import Annotated
 
 from basic_chat_bot.v1.bot import llm 
 from utils import extract_json_from_markdown 
+from common.tts import markdown_to_speech
+from common.checkpoint import EvictingMemorySaver, CompactSerializer
+from common.usage import usage_tracker, current_graph_context
+from common.turns import ThreadTurnQueue
+from common.rate_limit import openai_limiter
+from basic_chat_bot.v3.suggestions import suggestions, parse_stats as suggestion_parse_stats, parse_stats_lock as suggestion_parse_stats_lock
 
 SYSTEM_PROMPT = "You are an intelligent, professional and smart customer care agent of Cigna Healthcare. You know Cigna policies in detail, or if you don't mock it, and tell the customer which policies you are referring to."
 
@@ -21,12 +30,43 @@ MULTI_TASK_PROMPT = f"""{SYSTEM_PROMPT}. Also add few short and precise suggeste
                '  "suggested_questions": ["...", "...", "..."]\n'
                """
 
+## Without "tts_text": the speech text is derived locally from the answer (see LOCAL_TTS)
+LOCAL_TTS_PROMPT = f"""{SYSTEM_PROMPT}. Also add few short and precise suggested questions that user want to ask to the bot (upto 3, each limit 7 words). \n\n**KEEP USER's SENTIMENT IN CONSIDERATION while generating any answer or suggested questions.**\n\n Respond in the JSON format with the following keys in it:\n
+               '  "answer": "<your answer here, **BEAUTIFUL MARKDOWN, POINT WISE (IF REQUIRED), SHORT AND PRECISE**>",\n'
+               '  "suggested_questions": ["...", "...", "..."]\n'
+               """
+
+## Structured output: the JSON schema of ChatAnswer carries the format instructions, so the prompt doesn't.
+STRUCTURED_PROMPT = f"""{SYSTEM_PROMPT}. Also add few short and precise suggested questions that user want to ask to the bot (upto 3, each limit 7 words).\n\n**KEEP USER's SENTIMENT IN CONSIDERATION while generating any answer or suggested questions.**"""
+
+## Answer only: follow-up questions come from a background call (ASYNC_SUGGESTIONS), speech text is derived locally (LOCAL_TTS)
+ANSWER_PROMPT = f"""{SYSTEM_PROMPT}. Answer in **BEAUTIFUL MARKDOWN, POINT WISE (IF REQUIRED), SHORT AND PRECISE**.\n\n**KEEP USER's SENTIMENT IN CONSIDERATION while generating any answer.**"""
+
+USE_STRUCTURED_OUTPUT = True
+STRUCTURED_OUTPUT_METHOD = "json_schema" # or "function_calling" (tool-call based)
+MAX_PARSE_RETRIES = 1
+LOCAL_TTS = True # derive tts_text from the markdown answer instead of having the model write the answer twice
+ASYNC_SUGGESTIONS = True # return the answer first; suggested questions are generated in the background
+## How the answer is produced: "plain" (no JSON to parse) with the defaults above, else "structured" or "markdown"
+REPLY_MODE = "plain" if ASYNC_SUGGESTIONS and LOCAL_TTS else "structured" if USE_STRUCTURED_OUTPUT else "markdown"
+ANSWER_TAG = "answer"
+SUGGESTIONS_STREAM_WAIT = 10 # seconds /v3/chat-stream keeps the stream open for the trailing suggestions event
+
+class ChatReply(BaseModel):
+    """Reply of the customer care agent."""
+    answer: str = Field(description="Your answer, BEAUTIFUL MARKDOWN, POINT WISE (IF REQUIRED), SHORT AND PRECISE.")
+    suggested_questions: list[str] = Field(default_factory=list, description="Up to 3 follow-up questions the user may ask, each at most 7 words.")
+
+class ChatAnswer(ChatReply):
+    """Reply of the customer care agent, including the text read out by TTS."""
+    tts_text: str = Field(default="", description="The answer in plain text which can be read by a TTS model.")
+
 # --- Flask App ---
 app = Flask(__name__)
 CORS(app)
 
 # --- Memory + State ---
-memory = MemorySaver()
+memory = EvictingMemorySaver(ttl_seconds=60 * 60, max_threads=5000, serde=CompactSerializer())
 
 class State(TypedDict):
     messages: Annotated[list, add_messages]
@@ -39,55 +79,79 @@ from langgraph.graph import StateGraph
 
 graph_builder = StateGraph(State)
 
-def chatbot(state: State):
+structured_llm = llm.with_structured_output(ChatReply if LOCAL_TTS else ChatAnswer, method=STRUCTURED_OUTPUT_METHOD, include_raw=True)
+
+## calls / parse_failures / retries / fallbacks, per output mode; only counts when REPLY_MODE is that mode
+parse_stats = {"structured": Counter(), "markdown": Counter()}
+parse_stats_lock = threading.Lock()
 
-    # Build prompt and call LLM
-    prompt = f"""SYSTEM: {MULTI_TASK_PROMPT}\n\nCONVERSATION: {state["messages"]}"""
-    result = llm.invoke(prompt)
-    result = extract_json_from_markdown(result.content)
+def count_parse(mode: str, key: str):
+    with parse_stats_lock:
+        parse_stats[mode][key] += 1
 
-    # Try to parse LLM response as JSON
+def markdown_reply(messages) -> ChatAnswer:
+    """Legacy path: ask for a JSON blob inside markdown and regex it out."""
+    prompt = f"""SYSTEM: {LOCAL_TTS_PROMPT if LOCAL_TTS else MULTI_TASK_PROMPT}\n\nCONVERSATION: {messages}"""
+    count_parse("markdown", "calls")
+    content = llm.invoke(prompt).content
     try:
-        answer = result.get("answer", "")
-        tts_text = result.get("tts_text", "")
-        suggestions = result.get("suggested_questions", [])
-    except json.JSONDecodeError:
-        # Fallback if malformed JSON
-        answer = result.content
-        tts_text = ""
-        suggestions = []
+        result = extract_json_from_markdown(content, strict=True)
+        return ChatAnswer(
+            answer=result.get("answer", ""),
+            tts_text=result.get("tts_text", ""),
+            suggested_questions=result.get("suggested_questions", [])
+        )
+    except (json.JSONDecodeError, AttributeError, ValueError):
+        # Fallback if malformed JSON: the raw text becomes the answer
+        count_parse("markdown", "parse_failures")
+        count_parse("markdown", "fallbacks")
+        return ChatAnswer(answer=content, tts_text="", suggested_questions=[])
+
+def structured_reply(messages) -> ChatAnswer:
+    """Native structured output, validated against the reply schema; retried on parse failures."""
+    prompt = [SystemMessage(content=STRUCTURED_PROMPT), *messages]
+    for attempt in range(MAX_PARSE_RETRIES + 1):
+        count_parse("structured", "calls")
+        result = structured_llm.invoke(prompt)
+        if result["parsed"] is not None:
+            return ChatAnswer.model_validate(result["parsed"].model_dump())
+        count_parse("structured", "parse_failures")
+        if attempt < MAX_PARSE_RETRIES:
+            count_parse("structured", "retries")
+
+    count_parse("structured", "fallbacks")
+    return ChatAnswer(answer=result["raw"].content, tts_text="", suggested_questions=[])
+
+def plain_reply(messages) -> ChatAnswer:
+    """Just the markdown answer: no JSON to produce or parse."""
+    # Tagged so /v3/chat-stream forwards this call's tokens (and not JSON from the other modes)
+    content = llm.invoke([SystemMessage(content=ANSWER_PROMPT), *messages], config={"tags": [ANSWER_TAG]}).content
+    return ChatAnswer(answer=content)
+
+def chatbot(state: State):
+
+    if REPLY_MODE == "plain":
+        reply = plain_reply(state["messages"])
+    elif REPLY_MODE == "structured":
+        reply = structured_reply(state["messages"])
+    else:
+        reply = markdown_reply(state["messages"])
+
+    # Local conversion also covers the fallbacks, which come back without tts_text
+    tts_text = markdown_to_speech(reply.answer) if LOCAL_TTS or not reply.tts_text else reply.tts_text
+
+    messages = state["messages"] + [AIMessage(content=reply.answer)]
+    if ASYNC_SUGGESTIONS:
+        thread_id, _ = current_graph_context()
+        suggestions.submit(thread_id, len(messages), messages)
 
     return {
-        "messages": state["messages"] + [AIMessage(content=answer)],
-        "assistant": answer,
+        "messages": messages,
+        "assistant": reply.answer,
         "tts_text": tts_text,
-        "suggested_questions": suggestions
+        "suggested_questions": [] if ASYNC_SUGGESTIONS else reply.suggested_questions
     }
 
-def chatbot_stream(state: State):
-
-    prompt = f"""SYSTEM: {MULTI_TASK_PROMPT}\n\nCONVERSATION: {state["messages"]}"""
-
-    # Stream LLM response
-    for partial_result in llm.stream(prompt):  
-        try:
-            result = extract_json_from_markdown(partial_result.content)
-            answer = result.get("answer", "")
-            tts_text = result.get("tts_text", "")
-            suggestions = result.get("suggested_questions", [])
-        except json.JSONDecodeError:
-            # Fallback if malformed JSON
-            answer = partial_result.content
-            tts_text = ""
-            suggestions = []
-
-        yield {
-            "messages": state["messages"] + [AIMessage(content=answer)],
-            "assistant": answer,
-            "tts_text": tts_text,
-            "suggested_questions": suggestions
-        }
-
 graph_builder.add_node("chatbot", chatbot)
 
 # Edges
@@ -101,39 +165,104 @@ graph = graph_builder.compile(checkpointer=memory)
 def test():
     return "OK"
 
-# --- API Endpoint ---
-@app.route("/v3/chat", methods=["POST"])
-def chat():
-    data = request.json
-    thread_id = data.get("thread_id")
-    user_input = data.get("message")
-
+@app.route("/v3/memory-stats", methods=["GET"])
+def memory_stats():
+    return jsonify(memory.stats())
+
+@app.route("/v3/usage", methods=["GET"])
+def usage():
+    thread_id = request.args.get("thread_id")
+    if thread_id:
+        return jsonify(usage_tracker.thread_usage(thread_id))
+    return jsonify(usage_tracker.snapshot())
+
+@app.route("/v3/limiter-stats", methods=["GET"])
+def limiter_stats():
+    return jsonify(openai_limiter.snapshot())
+
+@app.route("/v3/queue-stats", methods=["GET"])
+def queue_stats():
+    return jsonify(turn_queue.snapshot())
+
+@app.route("/v3/suggestions", methods=["GET"])
+def get_suggestions():
+    """Suggested questions of the thread's latest turn; `wait` (seconds, max 30) long-polls until they're ready."""
+    thread_id = request.args.get("thread_id")
     if not thread_id:
         return jsonify({"error": "Missing thread_id"}), 400
+    wait_s = min(request.args.get("wait", 0, type=float), 30)
+    return jsonify(suggestions.get(thread_id, wait_s))
+
+@app.route("/v3/suggestion-stats", methods=["GET"])
+def suggestion_stats():
+    return jsonify(suggestions.snapshot())
+
+@app.route("/v3/parse-stats", methods=["GET"])
+def get_parse_stats():
+    """Parse counters of the answer (REPLY_MODE "plain" parses nothing) and of the background suggestions call."""
+    with parse_stats_lock:
+        stats = {mode: dict(counter) for mode, counter in parse_stats.items()}
+    with suggestion_parse_stats_lock:
+        stats["suggestions"] = dict(suggestion_parse_stats)
+    return jsonify({"reply_mode": REPLY_MODE, **stats})
+
+## Serializes turns per thread_id and coalesces duplicate in-flight messages
+turn_queue = ThreadTurnQueue()
+
+def run_turn(thread_id: str, user_input: str, on_token=None) -> dict:
+    """One checkpointed graph turn; `on_token(text)` receives the answer's tokens as they are generated."""
 
     config = {"configurable": {"thread_id": thread_id}}
 
-    events = graph.stream({"messages": [{"role": "user", "content": user_input}]}, config)
+    stream_mode = ["updates", "messages"] if on_token else ["updates"]
+    events = graph.stream({"messages": [{"role": "user", "content": user_input}]}, config, stream_mode=stream_mode)
 
     assistant_response = None
+    tts_text = ""
     suggested_questions = []
 
-    for event in events:
+    for mode, event in events:
+        if mode == "messages":
+            chunk, metadata = event
+            if ANSWER_TAG in metadata.get("tags", []) and chunk.content:
+                on_token(chunk.content)
+            continue
         for value in event.values():
             if isinstance(value, dict):
                 assistant_response = value.get("assistant", "")
                 tts_text = value.get("tts_text", "")
                 suggested_questions = value.get("suggested_questions", [])
 
-    return jsonify({
+    return {
         "assistant": assistant_response,
         "tts_text": tts_text,
-        "suggested_questions": suggested_questions
-    })
+        "suggested_questions": suggested_questions,
+        "suggestions_pending": ASYNC_SUGGESTIONS # fetch them from /v3/suggestions
+    }
+
+# --- API Endpoint ---
+@app.route("/v3/chat", methods=["POST"])
+def chat():
+    data = request.json
+    thread_id = data.get("thread_id")
+    user_input = data.get("message")
+
+    if not thread_id:
+        return jsonify({"error": "Missing thread_id"}), 400
+
+    # Turns of a thread run one at a time; a retried identical message joins the one in flight
+    result = turn_queue.run(thread_id, user_input, lambda: run_turn(thread_id, user_input))
+
+    return jsonify(result)
 
 @app.route("/v3/chat-stream", methods=["POST"])
 def chat_stream():
-    
+    """
+    Same turn as /v3/chat (queued per thread, checkpointed), streamed as SSE:
+    `data: {"delta": ...}` frames with the answer's new text, then `event: done` with the full turn,
+    `event: suggestions` (if ASYNC_SUGGESTIONS) and `event: end`.
+    """
+
     data = request.json
     thread_id = data.get("thread_id")
     user_input = data.get("message")
@@ -144,15 +273,37 @@ def chat_stream():
             yield f"data: {json.dumps({'error': 'Missing thread_id'})}\n\n"
             return
 
-        state = {
-            "messages": [{"role": "user", "content": user_input}]
-        }
-
-        # Stream chatbot responses
-        for partial_response in chatbot_stream(state):
-            yield f"data: {partial_response['messages'][-1].content}\n\n"
+        # The turn runs on its own thread so it finishes (and is persisted) even if the client goes away
+        frames = queue.Queue()
+
+        def run():
+            try:
+                result = turn_queue.run(thread_id, user_input, lambda: run_turn(thread_id, user_input, on_token=lambda text: frames.put(("delta", text))))
+                frames.put(("done", result))
+            except Exception as e:
+                frames.put(("error", f"{type(e).__name__}: {e}"))
+
+        threading.Thread(target=run, daemon=True, name="chat-stream").start()
+
+        streamed = False
+        while True:
+            kind, payload = frames.get()
+            if kind == "delta":
+                streamed = True
+                yield f"data: {json.dumps({'delta': payload})}\n\n"
+            elif kind == "error":
+                yield f"event: error\ndata: {json.dumps({'error': payload})}\n\n"
+                break
+            else:
+                # Structured / markdown modes and coalesced duplicates have no token stream: send the answer whole
+                if not streamed and payload["assistant"]:
+                    yield f"data: {json.dumps({'delta': payload['assistant']})}\n\n"
+                yield f"event: done\ndata: {json.dumps(payload)}\n\n"
+                if ASYNC_SUGGESTIONS:
+                    yield f"event: suggestions\ndata: {json.dumps(suggestions.get(thread_id, SUGGESTIONS_STREAM_WAIT))}\n\n"
+                break
 
         # End of stream
         yield "event: end\n\n"
 
-    return Response(generate(), mimetype="text/event-stream")
\ No newline at end of file
+    return Response(generate(), mimetype="text/event-stream")
@@ -0,0 +1,134 @@
+"""
+Benchmark checkpoint serialization: LangGraph's JsonPlusSerializer vs CompactSerializer.
+
+Replays a synthetic multi-turn conversation shaped like the v3 graph's state (questions, AI replies with
+response/usage metadata, web-search tool calls with Tavily JSON results) and serializes the message list
+after every turn, the way the checkpointer stores the `messages` channel. Reports stored bytes per
+conversation and encode/decode time, then checks a round trip through EvictingMemorySaver.
+
+Run: python -m basic_chat_bot.v3.bench_checkpoint [--turns 20] [--conversations 50]
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from common.checkpoint import CompactSerializer, EvictingMemorySaver
+
+QUESTIONS = [
+    "What does my Cigna plan cover for physiotherapy?",
+    "Is dental included in the Open Access Plus plan?",
+    "Can I see an out-of-network specialist?",
+    "How do I add my newborn to my policy?",
+    "What is the deadline to appeal a rejected claim?"
+]
+
+def search_results(rng: random.Random, query: str) -> str:
+    return json.dumps({
+        "query": query,
+        "follow_up_questions": None,
+        "answer": None,
+        "images": [],
+        "results": [{
+            "title": f"Cigna coverage guide part {rng.randint(1, 40)}",
+            "url": f"https://www.cigna.com/knowledge-center/{uuid.UUID(int=rng.getrandbits(128)).hex[:12]}",
+            "content": " ".join(rng.choice(["Coverage", "applies", "after", "the", "deductible", "is", "met", "for", "in-network", "providers", "and", "pre-approval", "may", "be", "required"]) for _ in range(rng.randint(60, 120))),
+            "score": round(rng.random(), 5),
+            "raw_content": None
+        } for _ in range(2)],
+        "response_time": round(rng.uniform(0.5, 2), 2)
+    })
+
+def ai_message(rng: random.Random, content: str, tool_calls: list = ()) -> AIMessage:
+    prompt_tokens, completion_tokens = rng.randint(200, 3000), rng.randint(20, 400)
+    return AIMessage(
+        content=content,
+        tool_calls=list(tool_calls),
+        id=f"run-{uuid.UUID(int=rng.getrandbits(128))}-0",
+        response_metadata={
+            "token_usage": {"completion_tokens": completion_tokens, "prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens + completion_tokens},
+            "model_name": "gpt-4o-2024-08-06",
+            "system_fingerprint": "fp_a7d06e42a7",
+            "finish_reason": "tool_calls" if tool_calls else "stop",
+            "logprobs": None
+        },
+        usage_metadata={"input_tokens": prompt_tokens, "output_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+    )
+
+def conversation(rng: random.Random, turns: int) -> list:
+    """The `messages` channel after each turn."""
+    messages, states = [], []
+    for _ in range(turns):
+        question = rng.choice(QUESTIONS)
+        messages.append(HumanMessage(content=question, id=str(uuid.UUID(int=rng.getrandbits(128)))))
+        if rng.random() < 0.5:
+            call_id = "call_" + uuid.UUID(int=rng.getrandbits(128)).hex[:24]
+            messages.append(ai_message(rng, "", [{"name": "tavily_search", "args": {"query": question}, "id": call_id, "type": "tool_call"}]))
+            messages.append(ToolMessage(content=search_results(rng, question), name="tavily_search", tool_call_id=call_id, id=str(uuid.UUID(int=rng.getrandbits(128)))))
+        answer = json.dumps({
+            "answer": "### Coverage details\n" + "\n".join(f"- **Point {i}**: covered up to {rng.randint(10, 90)}% after deductible." for i in range(rng.randint(2, 5))),
+            "tts_text": "Here are the coverage details for your plan.",
+            "suggested_questions": rng.sample(QUESTIONS, 3)
+        })
+        messages.append(ai_message(rng, answer))
+        states.append(list(messages))
+    return states
+
+def measure(serde, states: list) -> dict:
+    encoded, encode_s = [], 0.0
+    for state in states:
+        start = time.perf_counter()
+        encoded.append(serde.dumps_typed(state))
+        encode_s += time.perf_counter() - start
+    start = time.perf_counter()
+    decoded = [serde.loads_typed(value) for value in encoded]
+    decode_s = time.perf_counter() - start
+    assert decoded == states, "round trip changed the state"
+    return {"bytes": sum(len(value[1]) for value in encoded), "last_bytes": len(encoded[-1][1]), "encode_s": encode_s, "decode_s": decode_s}
+
+def saver_round_trip(serde, states: list):
+    saver = EvictingMemorySaver(serde=serde)
+    config = {"configurable": {"thread_id": "bench", "checkpoint_ns": ""}}
+    for step, state in enumerate(states):
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_values"] = {"messages": state}
+        checkpoint["channel_versions"] = {"messages": step + 1}
+        config = saver.put(config, checkpoint, {"step": step}, {"messages": step + 1})
+    assert saver.get(config)["channel_values"]["messages"] == states[-1]
+    return saver.stats()["total_bytes"]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--conversations", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    corpus = [conversation(rng, args.turns) for _ in range(args.conversations)]
+    serializers = {"jsonplus": JsonPlusSerializer(), "compact": CompactSerializer(compression=None), "compact+zlib": CompactSerializer()}
+    try:
+        serializers["compact+zstd"] = CompactSerializer(compression="zstd")
+    except ImportError:
+        print("zstandard not installed, skipping compact+zstd")
+
+    print(f"{args.conversations} conversations x {args.turns} turns, messages channel serialized after every turn\n")
+    print(f"{'serializer':>14}{'KB/conv':>10}{'final B':>10}{'ratio':>8}{'enc us/turn':>13}{'dec us/turn':>13}{'saver KB':>10}")
+    baseline = None
+    for name, serde in serializers.items():
+        totals = {"bytes": 0, "last_bytes": 0, "encode_s": 0.0, "decode_s": 0.0}
+        for states in corpus:
+            for key, value in measure(serde, states).items():
+                totals[key] += value
+        baseline = baseline or totals["bytes"]
+        saved = saver_round_trip(serde, corpus[0])
+        turns = args.conversations * args.turns
+        print(f"{name:>14}{totals['bytes'] / args.conversations / 1024:>10.1f}{totals['last_bytes'] / args.conversations:>10.0f}"
+              f"{baseline / totals['bytes']:>7.1f}x{totals['encode_s'] / turns * 1e6:>13.0f}{totals['decode_s'] / turns * 1e6:>13.0f}{saved / 1024:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark the v3 reply parsing: regex-over-markdown vs native structured output.
+
+Offline (default): parse cost only, on the same synthetic replies framed as each mode gets them back
+(fenced markdown vs bare JSON). The replies are valid by construction, so failure rates aren't measured.
+Live (--live N): N real calls per mode, reporting latency and the retry/fallback rate from `parse_stats`;
+that is the only failure-rate comparison. Both modes are called directly: with the default config
+(REPLY_MODE "plain") /v3/chat uses neither.
+
+Run: python -m basic_chat_bot.v3.bench_parse [--live 20]
+"""
+import argparse
+import json
+import random
+import time
+
+from langchain_core.messages import HumanMessage
+
+from basic_chat_bot.v3.api import ChatAnswer, markdown_reply, structured_reply, parse_stats
+from utils import extract_json_from_markdown
+
+QUESTIONS = [
+    "What does my Cigna plan cover for physiotherapy?",
+    "My claim was rejected, this is really frustrating. Why?",
+    "How do I add my newborn to my policy?",
+    "Is dental included in the Open Access Plus plan?",
+    "Can I see an out-of-network specialist?"
+]
+
+def sample_reply(rng: random.Random) -> dict:
+    points = "\n".join(f"- **Point {i}**: covered up to {rng.randint(10, 90)}% after deductible." for i in range(rng.randint(2, 6)))
+    return {
+        "answer": f"### Coverage details\n{points}\n\nPolicy reference: CIG-{rng.randint(1000, 9999)}.",
+        "tts_text": "Here are the coverage details. " + " ".join(f"Point {i} is covered after your deductible." for i in range(3)),
+        "suggested_questions": ["What is my deductible?", "How do I file a claim?", "Is pre-approval needed?"]
+    }
+
+def markdown_framed(reply: dict) -> str:
+    """How the markdown prompt's completions usually come back."""
+    return f"Sure! Here is the response:\n```json\n{json.dumps(reply, indent=2)}\n```"
+
+def parse_markdown(content: str) -> bool:
+    try:
+        result = extract_json_from_markdown(content, strict=True)
+        ChatAnswer(
+            answer=result.get("answer", ""),
+            tts_text=result.get("tts_text", ""),
+            suggested_questions=result.get("suggested_questions", [])
+        )
+        return True
+    except (json.JSONDecodeError, AttributeError, ValueError):
+        return False
+
+def parse_structured(content: str) -> bool:
+    try:
+        ChatAnswer.model_validate_json(content)
+        return True
+    except ValueError:
+        return False
+
+def offline(size: int):
+    rng = random.Random(0)
+    replies = [sample_reply(rng) for _ in range(size)]
+    print(f"{'mode':12}{'us/parse':>12}")
+    for mode, corpus, parse in (
+        ("markdown", [markdown_framed(reply) for reply in replies], parse_markdown),
+        ("structured", [json.dumps(reply) for reply in replies], parse_structured)
+    ):
+        start = time.perf_counter()
+        parsed = sum(parse(content) for content in corpus)
+        elapsed = time.perf_counter() - start
+        assert parsed == size, f"{mode}: {size - parsed} valid replies failed to parse"
+        print(f"{mode:12}{elapsed / size * 1e6:>12.2f}")
+
+def live(calls: int):
+    print(f"{'mode':12}{'avg latency (s)':>18}{'retry rate':>14}{'fallback rate':>16}")
+    for mode, reply in (("markdown", markdown_reply), ("structured", structured_reply)):
+        start = time.perf_counter()
+        for i in range(calls):
+            reply([HumanMessage(content=QUESTIONS[i % len(QUESTIONS)])])
+        elapsed = time.perf_counter() - start
+
+        stats = parse_stats[mode]
+        print(f"{mode:12}{elapsed / calls:>18.2f}{stats['retries'] / calls:>14.2%}{stats['fallbacks'] / calls:>16.2%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=5000, help="offline corpus size")
+    parser.add_argument("--live", type=int, default=0, help="number of real LLM calls per mode")
+    args = parser.parse_args()
+
+    offline(args.size)
+    if args.live:
+        live(args.live)
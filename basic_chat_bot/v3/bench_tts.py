@@ -0,0 +1,83 @@
+"""
+Benchmark deriving tts_text locally (LOCAL_TTS) vs asking the model to write the answer twice.
+
+Offline (default): cost of `markdown_to_speech` per answer, and the output tokens the model no longer
+writes, i.e. the tiktoken count of the reply JSON with vs without "tts_text", turned into latency at
+--tokens-per-s decoding speed.
+Live (--live N): N real structured-output calls per schema, reporting completion tokens and latency.
+
+Run: python -m basic_chat_bot.v3.bench_tts [--live 10]
+"""
+import argparse
+import json
+import random
+import time
+
+import tiktoken
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from basic_chat_bot.v3.api import ChatAnswer, ChatReply, STRUCTURED_PROMPT, STRUCTURED_OUTPUT_METHOD, llm
+from common.tts import markdown_to_speech
+
+QUESTIONS = [
+    "What does my Cigna plan cover for physiotherapy?",
+    "My claim was rejected, this is really frustrating. Why?",
+    "How do I add my newborn to my policy?",
+    "Is dental included in the Open Access Plus plan?",
+    "Can I see an out-of-network specialist?"
+]
+
+SUGGESTED_QUESTIONS = ["What is my deductible?", "How do I file a claim?", "Is pre-approval needed?"]
+
+def sample_answer(rng: random.Random) -> str:
+    """Markdown shaped like the v3 answers: heading, bullets or steps, amounts, a policy reference."""
+    points = "\n".join(
+        f"- **Visit {i}**: {rng.randint(10, 90)}% covered after your ${rng.randint(100, 2500):,} deductible, up to {rng.randint(5, 30)} visits/year."
+        for i in range(1, rng.randint(2, 6))
+    )
+    steps = "\n".join(f"{i}. Call 1-800-{rng.randint(200, 999)}-{rng.randint(1000, 9999)} or log in to *myCigna* (e.g. step {i})." for i in range(1, rng.randint(2, 4)))
+    return f"### Coverage details\n{points}\n\n**Next steps:**\n{steps}\n\nPolicy reference: `CIG-{rng.randint(1000, 9999)}`, Open Access Plus."
+
+def offline(size: int, tokens_per_s: float):
+    rng = random.Random(0)
+    answers = [sample_answer(rng) for _ in range(size)]
+
+    start = time.perf_counter()
+    speech = [markdown_to_speech(answer) for answer in answers]
+    elapsed = time.perf_counter() - start
+
+    # The model's own tts_text is about as long as the local one; count what it would have written
+    encoding = tiktoken.encoding_for_model("gpt-4o")
+    with_tts = sum(len(encoding.encode(json.dumps({"answer": a, "tts_text": s, "suggested_questions": SUGGESTED_QUESTIONS}))) for a, s in zip(answers, speech))
+    without_tts = sum(len(encoding.encode(json.dumps({"answer": a, "suggested_questions": SUGGESTED_QUESTIONS}))) for a in answers)
+    saved = (with_tts - without_tts) / size
+
+    print(f"markdown_to_speech: {elapsed / size * 1e6:.1f} us/answer")
+    print(f"output tokens/reply: {with_tts / size:.0f} with tts_text, {without_tts / size:.0f} without ({saved / (with_tts / size):.0%} fewer)")
+    print(f"estimated latency saved: {saved / tokens_per_s * 1000:.0f} ms/reply at {tokens_per_s:.0f} tokens/s")
+    print(f"\nexample:\n{answers[0]}\n\n-> {speech[0]}")
+
+def live(calls: int):
+    print(f"\n{'schema':12}{'avg completion tokens':>24}{'avg latency (s)':>18}")
+    for name, schema in (("ChatAnswer", ChatAnswer), ("ChatReply", ChatReply)):
+        model = llm.with_structured_output(schema, method=STRUCTURED_OUTPUT_METHOD, include_raw=True)
+        tokens = 0
+        start = time.perf_counter()
+        for i in range(calls):
+            result = model.invoke([SystemMessage(content=STRUCTURED_PROMPT), HumanMessage(content=QUESTIONS[i % len(QUESTIONS)])])
+            tokens += (result["raw"].usage_metadata or {}).get("output_tokens", 0)
+            if schema is ChatReply and result["parsed"] is not None:
+                markdown_to_speech(result["parsed"].answer) # local tts_text is part of this mode's cost
+        elapsed = time.perf_counter() - start
+        print(f"{name:12}{tokens / calls:>24.0f}{elapsed / calls:>18.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=2000, help="offline corpus size")
+    parser.add_argument("--tokens-per-s", type=float, default=80, help="model decoding speed used for the latency estimate")
+    parser.add_argument("--live", type=int, default=0, help="number of real LLM calls per schema")
+    args = parser.parse_args()
+
+    offline(args.size, args.tokens_per_s)
+    if args.live:
+        live(args.live)
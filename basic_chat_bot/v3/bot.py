@@ -9,6 +9,8 @@ from langgraph.prebuilt import ToolNode, tools_condition
 
 from langgraph.checkpoint.memory import MemorySaver
 
+from common.streaming import chat_turn
+
 memory = MemorySaver()
 
 ## NOTE - We are using an in-memory checkpointer. This is convenient for our tutorial.
@@ -46,9 +48,7 @@ config = {"configurable": {"thread_id": "1"}}
 
 def stream_graph_updates(graph, user_input: str, config):
 
-    for event in graph.stream({"messages": [{"role": "user", "content": user_input}]}, config):
-        for value in event.values():
-            print("Assistant:", value["messages"][-1].content)
+    return chat_turn(graph, user_input, config)
 
 def get_snapshot(config):
     snapshot = graph.get_state(config)
@@ -0,0 +1,123 @@
+"""
+Suggested follow-up questions, generated off the answer's critical path.
+
+Once the answer is ready the chatbot node calls `suggestions.submit(...)`. A small background pool asks
+a cheaper model for up to 3 follow-ups, and the result is picked up through `/v3/suggestions` or the
+trailing `suggestions` event of `/v3/chat-stream`. Only the latest turn of each thread is kept.
+"""
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from dotenv import load_dotenv
+from langchain_core.messages import SystemMessage
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel, Field
+
+from common.usage import usage_callback
+from common.rate_limit import BATCH, rate_limited_http_client, request_priority
+
+load_dotenv()
+
+SUGGESTION_MODEL = "gpt-4o-mini"
+MAX_CONTEXT_MESSAGES = 6 # the last few turns are enough to suggest follow-ups
+MAX_SUGGESTIONS = 3
+
+SUGGESTION_PROMPT = "You are helping a customer of Cigna Healthcare talk to its customer care agent. Given the conversation, suggest short and precise questions the customer is likely to ask next (upto 3, each limit 7 words). **KEEP USER's SENTIMENT IN CONSIDERATION.**"
+
+class SuggestedQuestions(BaseModel):
+    """Follow-up questions the customer may ask next."""
+    questions: list[str] = Field(default_factory=list, description="Up to 3 follow-up questions, each at most 7 words.")
+
+suggestion_llm = ChatOpenAI(
+    model=SUGGESTION_MODEL,
+    api_key=os.getenv("OPENAI_SECRET"),
+    callbacks=[usage_callback],
+    stream_usage=True,
+    http_client=rate_limited_http_client()
+).with_structured_output(SuggestedQuestions, method="json_schema", include_raw=True)
+
+## calls / parse_failures of the suggestions call: with the default v3 config it is the only model output that is parsed
+parse_stats = Counter()
+parse_stats_lock = threading.Lock()
+
+def count_parse(key: str):
+    with parse_stats_lock:
+        parse_stats[key] += 1
+
+def generate_suggestions(thread_id: str, messages: list) -> list[str]:
+    count_parse("calls")
+    # Queued behind answers when the OpenAI budget is tight; nobody is blocked on this call
+    with request_priority(BATCH):
+        result = suggestion_llm.invoke(
+            [SystemMessage(content=SUGGESTION_PROMPT), *messages[-MAX_CONTEXT_MESSAGES:]],
+            config={"metadata": {"thread_id": thread_id, "langgraph_node": "suggestions"}}
+        )
+    if result["parsed"] is None:
+        count_parse("parse_failures")
+        raise result["parsing_error"] or ValueError("The model returned no suggestions")
+    return result["parsed"].questions[:MAX_SUGGESTIONS]
+
+class SuggestionStore:
+    """Latest suggestion job per thread_id, LRU-capped; a new turn replaces the previous one."""
+
+    def __init__(self, generate=generate_suggestions, max_workers: int = 4, max_threads: int = 5000):
+        self.generate = generate
+        self.max_threads = max_threads
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="suggestions") # threads start on first submit, i.e. after fork
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict() # thread_id -> (turn, Future)
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "generation_s": 0.0}
+
+    def submit(self, thread_id: str, turn: int, messages: list) -> Future:
+        """Start generating suggestions for `turn` (the message count after the answer) of a thread."""
+        future = self.executor.submit(self._run, thread_id, list(messages))
+        with self.lock:
+            self.jobs.pop(thread_id, None)
+            self.jobs[thread_id] = (turn, future)
+            self.stats["submitted"] += 1
+            while len(self.jobs) > self.max_threads:
+                self.jobs.popitem(last=False)
+        return future
+
+    def _run(self, thread_id: str, messages: list) -> list[str]:
+        start = time.perf_counter()
+        try:
+            questions = self.generate(thread_id, messages)
+        except Exception:
+            with self.lock:
+                self.stats["failed"] += 1
+            raise
+        with self.lock:
+            self.stats["completed"] += 1
+            self.stats["generation_s"] += time.perf_counter() - start
+        return questions
+
+    def get(self, thread_id: str, wait_s: float = 0) -> dict:
+        """Suggestions of the thread's latest turn, waiting up to `wait_s` for them to be ready."""
+        with self.lock:
+            turn, future = self.jobs.get(thread_id, (None, None))
+        if future is None:
+            return {"turn": None, "ready": False, "suggested_questions": []}
+
+        try:
+            questions = future.result(timeout=wait_s)
+        except FutureTimeout:
+            return {"turn": turn, "ready": False, "suggested_questions": []}
+        except Exception as e:
+            return {"turn": turn, "ready": True, "suggested_questions": [], "error": f"{type(e).__name__}: {e}"}
+        return {"turn": turn, "ready": True, "suggested_questions": questions}
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            completed = self.stats["completed"]
+            return {
+                "tracked_threads": len(self.jobs),
+                "pending": sum(not future.done() for _, future in self.jobs.values()),
+                "avg_generation_s": self.stats["generation_s"] / completed if completed else 0.0,
+                **{key: value for key, value in self.stats.items() if key != "generation_s"}
+            }
+
+suggestions = SuggestionStore()
@@ -3,6 +3,8 @@ from langgraph.types import Command, interrupt
 from langgraph.graph import StateGraph, START
 from langgraph.prebuilt import ToolNode, tools_condition
 from langgraph.checkpoint.memory import MemorySaver
+from common.checkpoint import CompactSerializer
+from common.streaming import chat_turn
 
 @tool
 def human_assistance(query: str) -> str:
@@ -40,7 +42,7 @@ graph_builder.add_conditional_edges(
 )
 graph_builder.add_edge("tools", "chatbot")
 
-memory = MemorySaver()
+memory = MemorySaver(serde=CompactSerializer())
 
 graph = graph_builder.compile(checkpointer=memory)
 
@@ -48,26 +50,13 @@ def get_human_command(human_response: str):
 
     return Command(resume={"data": human_response})
 
+## `human_assistance` reads human_response["data"]
+def validate_human_response(value):
+
+    if not isinstance(value, dict) or not isinstance(value.get("data"), str):
+        raise ValueError('Expected {"data": "<answer>"}')
+
+## The interrupt payload is printed by the runner; the human's answer resumes the graph
 def stream_graph_updates(graph, user_input: str, config): 
 
-    events = graph.stream(
-        {"messages": [{"role": "user", "content": user_input}]},
-        config,
-        stream_mode="values"
-    )
-
-    for event in events:
-        if "messages" in event:
-            adt_kw = dict(event["messages"][-1].additional_kwargs)
-            if 'tool_calls' in adt_kw:
-                if adt_kw['tool_calls'][0]['function']['name'] == 'human_assistance':
-                    ai_message = adt_kw['tool_calls'][0]['function']['arguments']
-                    print(f"AI Message: {ai_message}")
-
-                    human_response = input("Human Response: ")
-                    events = graph.stream(get_human_command(human_response), config, stream_mode="values")
-                    for event in events:
-                        if "messages" in event:
-                            print(f"Assistant: {event['messages'][-1].content}")
-            else:
-                print(f"Assistant: {event['messages'][-1].content}")
\ No newline at end of file
+    return chat_turn(graph, user_input, config, resume=lambda payload: get_human_command(input("Human Response: ")))
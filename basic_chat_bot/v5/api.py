@@ -0,0 +1,29 @@
+import os
+
+from dotenv import load_dotenv
+from flask import Flask
+from flask_cors import CORS
+
+from basic_chat_bot.v5.bot import graph, graph_builder, validate_human_response
+from common.checkpoint import CompactSerializer, ProcessLocalSqliteSaver
+from common.interrupts import HumanReviewQueue, InterruptStore, add_review_routes
+
+load_dotenv()
+
+app = Flask(__name__)
+CORS(app)
+
+INTERRUPTS_DB = os.getenv("INTERRUPTS_DB")
+
+## With INTERRUPTS_DB the checkpoints go in the same SQLite file as the queue: paused threads survive a
+## restart and hold no memory while they wait. Without it both stay in this process.
+if INTERRUPTS_DB:
+    graph = graph_builder.compile(checkpointer=ProcessLocalSqliteSaver(INTERRUPTS_DB, serde=CompactSerializer()))
+
+## Paused threads wait in the store, not on a request thread; reviewers answer them over HTTP
+reviews = HumanReviewQueue("v5", graph, InterruptStore(INTERRUPTS_DB or ":memory:"), validate=validate_human_response)
+add_review_routes(app, "/v5", reviews)
+
+@app.route("/v5", methods=["GET"])
+def test():
+    return "OK"
@@ -65,6 +65,8 @@ def chatbot(state: State):
 from langgraph.graph import StateGraph, START
 from langgraph.prebuilt import ToolNode, tools_condition
 from langgraph.checkpoint.memory import MemorySaver
+from common.checkpoint import CompactSerializer
+from common.streaming import chat_turn
 
 ## graph builder
 graph_builder = StateGraph(State)
@@ -79,7 +81,7 @@ graph_builder.add_edge(START, "chatbot")
 graph_builder.add_conditional_edges("chatbot", tools_condition)
 graph_builder.add_edge("tools", "chatbot")
 
-memory = MemorySaver()
+memory = MemorySaver(serde=CompactSerializer())
 graph = graph_builder.compile(checkpointer=memory)
 
 def get_graph_state(graph, config):
@@ -96,26 +98,15 @@ def get_human_command(name: str, birthday: str):
 
     return Command(resume={"name": name, "birthday": birthday})
 
-def stream_graph_updates(graph, user_input: str, config): 
+## `human_assistance` reads "correct" (yes/no) or the corrected "name" / "birthday"
+def validate_human_response(value):
 
-    events = graph.stream(
-        {"messages": [{"role": "user", "content": user_input}]},
-        config,
-        stream_mode="values"
-    )
+    if not isinstance(value, dict) or not ({"correct", "name", "birthday"} & value.keys()):
+        raise ValueError('Expected {"correct": "yes"} or {"name": ..., "birthday": ...}')
+    if any(not isinstance(value[key], str) for key in ("correct", "name", "birthday") if key in value):
+        raise ValueError("correct, name and birthday must be strings")
+
+## The interrupt payload ({"question", "name", "birthday"}) is printed by the runner before asking
+def stream_graph_updates(graph, user_input: str, config): 
 
-    for event in events:
-        if "messages" in event:
-            adt_kw = dict(event["messages"][-1].additional_kwargs)
-            if 'tool_calls' in adt_kw:
-                if adt_kw['tool_calls'][0]['function']['name'] == 'human_assistance':
-                    ai_message = adt_kw['tool_calls'][0]['function']['arguments']
-
-                    name = input("Name: ")
-                    birthday = input("Birthday: ")
-                    events = graph.stream(get_human_command(name, birthday), config, stream_mode="values")
-                    for event in events:
-                        if "messages" in event:
-                            print(f"Assistant: {event['messages'][-1].content}")
-            else:
-                print(f"Assistant: {event['messages'][-1].content}")
\ No newline at end of file
+    return chat_turn(graph, user_input, config, resume=lambda payload: get_human_command(input("Name: "), input("Birthday: ")))
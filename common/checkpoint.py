@@ -0,0 +1,348 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+import ormsgpack
+from langchain_core.messages import AIMessage, AIMessageChunk, ChatMessage, FunctionMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+class EvictingMemorySaver(MemorySaver):
+    """
+    In-memory checkpointer that doesn't grow forever.
+
+    - Threads idle for longer than `ttl_seconds` are evicted.
+    - At most `max_threads` threads are kept; the least recently used one is evicted first.
+    - With `compact=True` only the latest checkpoint (plus its pending writes and the channel
+      blobs it references) is kept per thread, so history/time-travel is traded for memory.
+    """
+
+    def __init__(self, *, ttl_seconds: float = 30 * 60, max_threads: int = 1000, compact: bool = True, sweep_interval: float = 30, serde=None):
+        super().__init__(serde=serde)
+        self.ttl_seconds = ttl_seconds
+        self.max_threads = max_threads
+        self.compact = compact
+        self.sweep_interval = sweep_interval
+
+        self.lock = threading.RLock()
+        self.last_seen = OrderedDict() # thread_id -> last access (monotonic), oldest first
+        self.write_keys = defaultdict(set) # thread_id -> keys into self.writes
+        self.blob_keys = defaultdict(set) # thread_id -> keys into self.blobs
+        self.last_sweep = time.monotonic()
+        self.counters = {"evicted_ttl": 0, "evicted_lru": 0, "compacted_checkpoints": 0}
+
+    # --- BaseCheckpointSaver ---
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        with self.lock:
+            result = super().get_tuple(config)
+            if result is None and not any(self.storage.get(thread_id, {}).values()):
+                # MemorySaver's defaultdict creates an empty entry on lookup; don't keep it around
+                self.storage.pop(thread_id, None)
+            else:
+                self._touch(thread_id)
+            return result
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        with self.lock:
+            items = [*super().list(config, filter=filter, before=before, limit=limit)]
+        yield from items
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self.lock:
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+            self.blob_keys[thread_id].update((thread_id, checkpoint_ns, k, v) for k, v in new_versions.items())
+            if self.compact:
+                self._compact(thread_id, checkpoint_ns, checkpoint)
+            self._touch(thread_id)
+            self._maybe_evict()
+            return next_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self.lock:
+            super().put_writes(config, writes, task_id, task_path)
+            self.write_keys[thread_id].add((thread_id, checkpoint_ns, config["configurable"]["checkpoint_id"]))
+            self._touch(thread_id)
+
+    # --- Eviction / compaction ---
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Drop every checkpoint, write and blob stored for a thread."""
+        with self.lock:
+            self.storage.pop(thread_id, None)
+            for key in self.write_keys.pop(thread_id, ()):
+                self.writes.pop(key, None)
+            for key in self.blob_keys.pop(thread_id, ()):
+                self.blobs.pop(key, None)
+            self.last_seen.pop(thread_id, None)
+
+    def sweep(self) -> int:
+        """Evict threads idle for longer than the TTL, then enforce the LRU cap. Returns the number evicted."""
+        evicted = 0
+        with self.lock:
+            self.last_sweep = now = time.monotonic()
+            while self.last_seen:
+                thread_id, seen = next(iter(self.last_seen.items()))
+                if now - seen < self.ttl_seconds:
+                    break
+                self.delete_thread(thread_id)
+                self.counters["evicted_ttl"] += 1
+                evicted += 1
+
+            while len(self.last_seen) > self.max_threads:
+                thread_id = next(iter(self.last_seen))
+                self.delete_thread(thread_id)
+                self.counters["evicted_lru"] += 1
+                evicted += 1
+        return evicted
+
+    def _touch(self, thread_id: str) -> None:
+        self.last_seen[thread_id] = time.monotonic()
+        self.last_seen.move_to_end(thread_id)
+
+    def _maybe_evict(self) -> None:
+        if len(self.last_seen) > self.max_threads or time.monotonic() - self.last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def _compact(self, thread_id: str, checkpoint_ns: str, checkpoint) -> None:
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        stale = [checkpoint_id for checkpoint_id in checkpoints if checkpoint_id != checkpoint["id"]]
+        for checkpoint_id in stale:
+            del checkpoints[checkpoint_id]
+            key = (thread_id, checkpoint_ns, checkpoint_id)
+            self.writes.pop(key, None)
+            self.write_keys[thread_id].discard(key)
+        self.counters["compacted_checkpoints"] += len(stale)
+
+        # Keep only the blob versions the latest checkpoint still points at
+        versions = checkpoint["channel_versions"]
+        blob_keys = self.blob_keys[thread_id]
+        for key in [key for key in blob_keys if key[1] == checkpoint_ns and versions.get(key[2]) != key[3]]:
+            self.blobs.pop(key, None)
+            blob_keys.discard(key)
+
+    # --- Gauges ---
+
+    def stats(self) -> dict:
+        """Memory-usage gauges and eviction counters."""
+        with self.lock:
+            checkpoints = checkpoint_bytes = 0
+            for namespaces in self.storage.values():
+                for saved in namespaces.values():
+                    checkpoints += len(saved)
+                    for checkpoint, metadata, _ in saved.values():
+                        checkpoint_bytes += len(checkpoint[1]) + len(metadata[1])
+
+            writes = write_bytes = 0
+            for pending in self.writes.values():
+                writes += len(pending)
+                write_bytes += sum(len(value[1]) for _, _, value, _ in pending.values())
+
+            blob_bytes = sum(len(value[1]) for value in self.blobs.values())
+
+            return {
+                "threads": len(self.last_seen),
+                "checkpoints": checkpoints,
+                "pending_writes": writes,
+                "blobs": len(self.blobs),
+                "checkpoint_bytes": checkpoint_bytes,
+                "write_bytes": write_bytes,
+                "blob_bytes": blob_bytes,
+                "total_bytes": checkpoint_bytes + write_bytes + blob_bytes,
+                **self.counters
+            }
+
+class ProcessLocalSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver on a database file, for checkpoints that must outlive the process (e.g. threads paused
+    at an interrupt). The connection is opened on first use in each process, so workers forked from a
+    preloaded app don't share one.
+    """
+
+    def __init__(self, path: str, *, serde=None):
+        super().__init__(None, serde=serde)
+        self.path = path
+        self.pid = None # process that opened `conn`
+
+    @contextmanager
+    def cursor(self, transaction: bool = True):
+        with self.lock:
+            if self.conn is None or self.pid != os.getpid():
+                self.conn = sqlite3.connect(self.path, check_same_thread=False)
+                self.pid = os.getpid()
+                self.is_setup = False
+        with super().cursor(transaction) as cur:
+            yield cur
+
+# --- Compact serialization ---
+
+## Wire codes; append only, existing checkpoints depend on the positions
+MESSAGE_CLASSES = (HumanMessage, AIMessage, ToolMessage, SystemMessage, AIMessageChunk, ChatMessage, FunctionMessage)
+MESSAGE_FIELDS = ("id", "name", "additional_kwargs", "response_metadata", "tool_calls", "invalid_tool_calls", "usage_metadata", "tool_call_id", "artifact", "status", "role", "example", "tool_call_chunks")
+MESSAGE_CODES = {cls: code for code, cls in enumerate(MESSAGE_CLASSES)}
+FIELD_CODES = {field: code for code, field in enumerate(MESSAGE_FIELDS)}
+
+## String values under these keys repeat across a conversation (tool and model names, roles)
+INTERNED_KEYS = frozenset({"name", "type", "role", "model_name", "finish_reason", "system_fingerprint", "tool_call_id"})
+
+EXT_STRING, EXT_MESSAGE, EXT_TOOL_CALL, EXT_TUPLE, EXT_FALLBACK = 1, 2, 3, 4, 5
+FORMAT_VERSION = 1
+
+class _CompactEncoder:
+    """One dumps_typed call: walks the value into msgpack-native data, collecting the string table."""
+
+    def __init__(self, serde: "CompactSerializer"):
+        self.serde = serde
+        self.strings = {}
+
+    def intern(self, value: str) -> ormsgpack.Ext:
+        index = self.strings.setdefault(value, len(self.strings))
+        return ormsgpack.Ext(EXT_STRING, index.to_bytes(1 if index < 0x100 else 2 if index < 0x10000 else 4, "big"))
+
+    def walk(self, value):
+        kind = type(value)
+        if value is None or kind in (str, bool, float, bytes):
+            return value
+        if kind is int:
+            return value if -2 ** 63 <= value < 2 ** 64 else self.fallback(value)
+        if kind is list:
+            return [self.walk(item) for item in value]
+        if kind is dict and all(type(key) is str for key in value):
+            return {key: self.intern(item) if key in INTERNED_KEYS and type(item) is str else self.walk(item) for key, item in value.items()}
+        if kind is tuple:
+            return ormsgpack.Ext(EXT_TUPLE, ormsgpack.packb([self.walk(item) for item in value]))
+        if kind in MESSAGE_CODES:
+            message = self.message(value)
+            if message is not None:
+                return message
+        return self.fallback(value)
+
+    def message(self, message):
+        """[class, content, field, value, ...] with only the fields that differ from their defaults."""
+        if message.__pydantic_extra__:
+            return None
+        defaults = self.serde.defaults(type(message))
+        encoded = [MESSAGE_CODES[type(message)], self.walk(message.content)]
+        for field, value in message.__dict__.items():
+            if field in ("content", "type") or value == defaults.get(field):
+                continue
+            if field not in FIELD_CODES:
+                return None # a field this format doesn't know: let the fallback keep it
+            if field == "tool_calls":
+                value = [self.tool_call(call) for call in value]
+            elif field in ("name", "tool_call_id") and type(value) is str:
+                value = self.intern(value)
+            else:
+                value = self.walk(value)
+            encoded += [FIELD_CODES[field], value]
+        return ormsgpack.Ext(EXT_MESSAGE, ormsgpack.packb(encoded))
+
+    def tool_call(self, call):
+        if type(call) is not dict or call.keys() != {"name", "args", "id", "type"} or call["type"] != "tool_call":
+            return self.walk(call)
+        call_id = self.intern(call["id"]) if type(call["id"]) is str else call["id"] # repeated by the ToolMessage answering it
+        return ormsgpack.Ext(EXT_TOOL_CALL, ormsgpack.packb([self.intern(call["name"]), self.walk(call["args"]), call_id]))
+
+    def fallback(self, value) -> ormsgpack.Ext:
+        return ormsgpack.Ext(EXT_FALLBACK, ormsgpack.packb(list(self.serde.fallback.dumps_typed(value))))
+
+class CompactSerializer:
+    """
+    Checkpoint serializer that stores conversations in far fewer bytes than the default one.
+
+    - Messages are positional msgpack records holding only the fields that differ from their defaults,
+      so empty `additional_kwargs`/`response_metadata`, class paths and field names aren't repeated
+      in every message.
+    - Tool and model names, roles and tool-call ids are interned into a per-value string table (a
+      tool-call id appears in both the AI message and the tool result).
+    - Values above `min_compress_bytes` are compressed with zlib or zstd (needs `zstandard`); raw
+      search-result JSON in tool messages compresses well.
+
+    Anything else (datetimes, pydantic models, Send, ...) goes through LangGraph's JsonPlusSerializer
+    inside the same payload, and checkpoints written by it still load. Round trips are exact.
+
+    Nearly all of the saving comes from compression: bench_checkpoint has `compression=None` only
+    about 1.3x smaller than JsonPlusSerializer and slower to encode and decode, against about 6x with zlib.
+    """
+
+    def __init__(self, compression: str = "zlib", level: int = None, min_compress_bytes: int = 512):
+        if compression not in (None, "zlib", "zstd"):
+            raise ValueError(f"Unknown compression {compression!r}")
+        if compression == "zstd":
+            import zstandard # optional dependency
+            self.zstandard = zstandard
+        self.compression = compression
+        self.level = level if level is not None else (3 if compression == "zstd" else 6)
+        self.min_compress_bytes = min_compress_bytes
+        self.fallback = JsonPlusSerializer()
+        self.local = threading.local() # zstd (de)compressors aren't thread-safe
+        self.field_defaults = {}
+
+    def defaults(self, cls) -> dict:
+        defaults = self.field_defaults.get(cls)
+        if defaults is None:
+            defaults = self.field_defaults[cls] = {name: field.get_default(call_default_factory=True) for name, field in cls.model_fields.items()}
+        return defaults
+
+    # --- SerializerProtocol ---
+
+    def dumps(self, obj) -> bytes:
+        return self.fallback.dumps(obj)
+
+    def loads(self, data: bytes):
+        return self.fallback.loads(data)
+
+    def dumps_typed(self, obj) -> tuple:
+        encoder = _CompactEncoder(self)
+        tree = ormsgpack.packb(encoder.walk(obj))
+        data = ormsgpack.packb([FORMAT_VERSION, list(encoder.strings), tree])
+        if self.compression is None or len(data) < self.min_compress_bytes:
+            return "compact", data
+        if self.compression == "zstd":
+            return "compact+zstd", self._zstd("compressor").compress(data)
+        return "compact+zlib", zlib.compress(data, self.level)
+
+    def loads_typed(self, data: tuple):
+        kind, payload = data
+        if not kind.startswith("compact"):
+            return self.fallback.loads_typed(data)
+        if kind == "compact+zstd":
+            payload = self._zstd("decompressor").decompress(payload)
+        elif kind == "compact+zlib":
+            payload = zlib.decompress(payload)
+
+        _, strings, tree = ormsgpack.unpackb(payload)
+
+        def ext_hook(code: int, data: bytes):
+            if code == EXT_STRING:
+                return strings[int.from_bytes(data, "big")]
+            value = ormsgpack.unpackb(data, ext_hook=ext_hook)
+            if code == EXT_MESSAGE:
+                fields = {MESSAGE_FIELDS[value[i]]: value[i + 1] for i in range(2, len(value), 2)}
+                return MESSAGE_CLASSES[value[0]].model_construct(content=value[1], **fields) # stored values were already validated
+            if code == EXT_TOOL_CALL:
+                return {"name": value[0], "args": value[1], "id": value[2], "type": "tool_call"}
+            if code == EXT_TUPLE:
+                return tuple(value)
+            if code == EXT_FALLBACK:
+                return self.fallback.loads_typed(tuple(value))
+            raise ValueError(f"Unknown extension type {code} in checkpoint")
+
+        return ormsgpack.unpackb(tree, ext_hook=ext_hook)
+
+    def _zstd(self, kind: str):
+        codec = getattr(self.local, kind, None)
+        if codec is None:
+            codec = self.zstandard.ZstdCompressor(level=self.level) if kind == "compressor" else self.zstandard.ZstdDecompressor()
+            setattr(self.local, kind, codec)
+        return codec
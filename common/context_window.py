@@ -0,0 +1,137 @@
+"""
+Bounded, prompt-cache-friendly context for long conversations.
+
+Prompts are laid out as
+
+    static system prefix | rolling summary of older turns | recent turns, append-only
+
+The provider caches prompt prefixes, so everything up to the newest message is a cache hit until the
+summary moves. The summary is refreshed by a background worker once the recent turns outgrow
+`max_recent_tokens`: it folds the older turns into the summary, leaving about `keep_recent_tokens`
+verbatim. The graph node adopts a finished summary by writing `summary` / `summarized` (number of
+leading messages it covers) to the thread's state; the checkpoint keeps the full history.
+`budget_tokens` caps summary + recent turns per call in case the worker falls behind.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+def estimate_tokens(message) -> int:
+    """~4 characters per token, like the rate limiter's estimate; tool calls count too."""
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    tool_calls = json.dumps(message.tool_calls) if isinstance(message, AIMessage) and message.tool_calls else ""
+    return (len(content) + len(tool_calls)) // 4 + 4
+
+def count_tokens(messages: list) -> int:
+    return sum(estimate_tokens(message) for message in messages)
+
+def cut_to_fit(messages: list, budget: int) -> int:
+    """
+    Index of the first message to keep so messages[index:] fits `budget`. Cuts only before a user message,
+    so a tool call is never separated from its results; the latest turn is always kept.
+    """
+    starts = [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+    if not starts:
+        return 0
+    for start in starts:
+        if count_tokens(messages[start:]) <= budget:
+            return start
+    return starts[-1]
+
+def render_transcript(messages: list, max_chars: int = 1000) -> str:
+    lines = []
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+        if message.type == "tool":
+            lines.append(f"Search result: {content[:max_chars]}")
+        elif content:
+            lines.append(f"{'User' if message.type == 'human' else 'Assistant'}: {content}")
+    return "\n".join(lines)
+
+class RollingSummary:
+
+    def __init__(self, summarize, max_recent_tokens: int = 2000, keep_recent_tokens: int = 800, budget_tokens: int = 3000, max_workers: int = 2, max_threads: int = 1000):
+        self.summarize = summarize # (thread_id, previous summary, messages to fold in) -> new summary
+        self.max_recent_tokens = max_recent_tokens
+        self.keep_recent_tokens = keep_recent_tokens
+        self.budget_tokens = budget_tokens
+        self.max_threads = max_threads
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summary") # threads start on first submit, i.e. after fork
+        self.lock = threading.Lock()
+        self.running = set() # thread_ids with a summary job in flight
+        self.ready = OrderedDict() # thread_id -> (summary, summarized) not yet adopted by the thread's state
+        self.stats = {"summaries": 0, "failed": 0, "trimmed_calls": 0, "summary_s": 0.0}
+
+    def current(self, thread_id: str, values: dict) -> tuple:
+        """(summary, summarized) for the thread: a finished background summary wins over the state's."""
+        summary, summarized = values.get("summary") or "", values.get("summarized") or 0
+        with self.lock:
+            ready = self.ready.get(thread_id)
+            if ready is not None and ready[1] <= summarized:
+                self.ready.pop(thread_id) # already in the state
+                ready = None
+        return ready or (summary, summarized)
+
+    def window(self, thread_id: str, values: dict) -> tuple:
+        """(summary, summarized, recent messages for this call), within `budget_tokens`."""
+        summary, summarized = self.current(thread_id, values)
+        recent = values["messages"][summarized:]
+        budget = self.budget_tokens - len(summary) // 4
+        if count_tokens(recent) > budget:
+            recent = recent[cut_to_fit(recent, budget):]
+            with self.lock:
+                self.stats["trimmed_calls"] += 1
+        return summary, summarized, recent
+
+    def schedule(self, thread_id: str, values: dict):
+        """Start folding older turns into the summary once the recent ones outgrow `max_recent_tokens`."""
+        summary, summarized = self.current(thread_id, values)
+        recent = values["messages"][summarized:]
+        if count_tokens(recent) <= self.max_recent_tokens:
+            return
+        cut = cut_to_fit(recent, self.keep_recent_tokens)
+        if cut == 0:
+            return
+        with self.lock:
+            if thread_id in self.running:
+                return
+            self.running.add(thread_id)
+        self.executor.submit(self._run, thread_id, summary, recent[:cut], summarized + cut)
+
+    def _run(self, thread_id: str, summary: str, messages: list, summarized: int):
+        start = time.perf_counter()
+        try:
+            new_summary = self.summarize(thread_id, summary, messages)
+        except Exception as e:
+            print(f"Summary for {thread_id} failed: {type(e).__name__}: {e}")
+            new_summary = None
+
+        with self.lock:
+            self.running.discard(thread_id)
+            if new_summary is None:
+                self.stats["failed"] += 1
+                return
+            self.ready.pop(thread_id, None)
+            self.ready[thread_id] = (new_summary, summarized)
+            while len(self.ready) > self.max_threads:
+                self.ready.popitem(last=False)
+            self.stats["summaries"] += 1
+            self.stats["summary_s"] += time.perf_counter() - start
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            summaries = self.stats["summaries"]
+            return {
+                "running": len(self.running),
+                "ready_not_adopted": len(self.ready),
+                "avg_summary_s": self.stats["summary_s"] / summaries if summaries else 0.0,
+                **{key: value for key, value in self.stats.items() if key != "summary_s"}
+            }
+
+def summary_message(summary: str) -> list:
+    """The summary as a message after the static prefix (none until there is one)."""
+    return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] if summary else []
@@ -0,0 +1,162 @@
+import contextvars
+import queue
+import threading
+import time
+from collections import deque
+
+from langchain_core.messages import AIMessage, message_chunk_to_message
+
+from common.rate_limit import CancelScope, cancellable
+
+class HedgePolicy:
+    """
+    When to fire the backup request: a fixed `threshold_s`, or (if None) the p`percentile` of the
+    primary's recent time-to-first-token, falling back to `default_threshold_s` until `min_samples`.
+    """
+
+    def __init__(self, threshold_s: float = None, percentile: float = 95, window: int = 200, min_samples: int = 20, default_threshold_s: float = 1.5):
+        self.threshold_s = threshold_s
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_threshold_s = default_threshold_s
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def observe(self, ttft_s: float):
+        with self.lock:
+            self.samples.append(ttft_s)
+
+    def threshold(self) -> float:
+        if self.threshold_s is not None:
+            return self.threshold_s
+        with self.lock:
+            samples = sorted(self.samples)
+        if len(samples) < self.min_samples:
+            return self.default_threshold_s
+        return samples[min(len(samples) - 1, int(len(samples) * self.percentile / 100))]
+
+class StreamRunner(threading.Thread):
+    """
+    Streams one model in the background, reporting first token / done / error on a shared queue.
+    `cancel()` shuts down its OpenAI connection from the calling thread (see CancelScope), so a model
+    stalled before its first token stops at once; a cancelled runner reports nothing.
+    """
+
+    def __init__(self, name: str, model, messages, events: queue.Queue, on_first_token=None):
+        super().__init__(daemon=True, name=f"hedge-{name}")
+        self.label = name
+        self.model = model
+        self.messages = messages
+        self.events = events
+        self.on_first_token = on_first_token
+        self.scope = CancelScope()
+        self.context = contextvars.copy_context() # keep LangGraph config / request priority for callbacks
+
+    def run(self):
+        self.context.run(self.stream)
+
+    def cancel(self):
+        self.scope.cancel()
+
+    def stream(self):
+        start = time.monotonic()
+        message = None
+        with cancellable(self.scope):
+            stream = self.model.stream(self.messages)
+            try:
+                for chunk in stream:
+                    if self.scope.cancelled.is_set():
+                        return
+                    if message is None and (chunk.content or getattr(chunk, "tool_call_chunks", None)):
+                        ttft_s = time.monotonic() - start
+                        if self.on_first_token:
+                            self.on_first_token(ttft_s)
+                        self.events.put(("first", self.label, ttft_s))
+                    message = chunk if message is None else message + chunk
+                self.events.put(("done", self.label, message))
+            except Exception as e:
+                if not self.scope.cancelled.is_set(): # a cancelled stream fails on its shut-down connection
+                    self.events.put(("error", self.label, e))
+            finally:
+                stream.close()
+
+class HedgedModel:
+    """
+    `invoke` that hedges a latency-critical call: if `primary` hasn't produced its first token by the
+    policy threshold, `backup` (e.g. a smaller model) is started too; whichever streams a token first
+    wins and the other is cancelled. A primary that fails before the threshold fails over to the backup.
+    """
+
+    def __init__(self, primary, backup, policy: HedgePolicy = None):
+        self.primary = primary
+        self.backup = backup
+        self.policy = policy or HedgePolicy()
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "hedged": 0, "primary_wins": 0, "backup_wins": 0, "failovers": 0, "errors": 0}
+
+    def count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+    def invoke(self, messages):
+        self.count("calls")
+        events = queue.Queue()
+        runners = {"primary": StreamRunner("primary", self.primary, messages, events, on_first_token=self.policy.observe)}
+        runners["primary"].start()
+        hedge_at = time.monotonic() + self.policy.threshold()
+        winner = None
+        error = None
+        finished = set() # runners that reported done or error
+
+        def start_backup():
+            runners["backup"] = StreamRunner("backup", self.backup, messages, events)
+            runners["backup"].start()
+
+        while True:
+            timeout = max(0.0, hedge_at - time.monotonic()) if "backup" not in runners else None
+            try:
+                kind, name, payload = events.get(timeout=timeout)
+            except queue.Empty:
+                self.count("hedged")
+                start_backup()
+                continue
+
+            if kind in ("done", "error"):
+                finished.add(name)
+
+            if kind == "first" and winner is None:
+                winner = name
+                for other, runner in runners.items():
+                    if other != name:
+                        runner.cancel()
+
+            elif kind == "done" and winner in (None, name):
+                # `winner is None`: the model finished without streaming any content
+                for other, runner in runners.items():
+                    if other != name:
+                        runner.cancel()
+                self.count(f"{name}_wins")
+                return message_chunk_to_message(payload) if payload is not None else AIMessage(content="")
+
+            elif kind == "error":
+                error = error or payload
+                if name == "primary" and "backup" not in runners:
+                    self.count("failovers")
+                    start_backup()
+                    continue
+                # Cancelled runners report nothing, but they're only cancelled once there is a winner
+                if winner == name or finished == set(runners):
+                    self.count("errors")
+                    raise error
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+        backups = stats["hedged"] + stats["failovers"]
+        return {
+            **stats,
+            "hedge_rate": stats["hedged"] / stats["calls"] if stats["calls"] else 0.0,
+            "hedge_win_rate": stats["backup_wins"] / backups if backups else 0.0,
+            "threshold_s": self.policy.threshold(),
+            "primary_ttft_samples": len(self.policy.samples)
+        }
@@ -0,0 +1,277 @@
+"""
+Human-in-the-loop over HTTP: pending `interrupt`s in a reviewer queue instead of a blocking `input()`.
+
+A paused conversation costs one checkpoint and one row here, and nothing else: no thread or stack waits
+for the human. When the graph stops at an interrupt the row (thread_id, payload, created time) is written
+to SQLite. Reviewers list the queue, and a resume request runs `Command(resume=...)` against the
+checkpoint on whichever request thread serves it. Each pending interrupt gets an id, and resuming takes
+its row with a conditional delete, so two reviewers can't both answer the same question.
+
+With INTERRUPTS_DB set, the v4/v5 apps keep their checkpoints in the same SQLite file
+(common.checkpoint.ProcessLocalSqliteSaver), so a paused thread survives a restart and waits on disk.
+Without it both are in memory. A row whose checkpoint is gone (or no longer paused) is dropped on resume
+and reported as expired. The SQLite connection is opened on first use in each process, so workers forked
+from a preloaded app don't share one.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from langgraph.types import Command
+
+from common.turns import ThreadTurnQueue
+
+class InterruptConflict(ValueError):
+    """Raised when a thread can't take the request right now, e.g. a new message while it waits for a human."""
+
+class InvalidResume(ValueError):
+    """Raised when a reviewer's answer isn't what the bot's `interrupt()` consumer expects."""
+
+class PendingInterrupt:
+    def __init__(self, thread_id: str, interrupt_id: str, payload, created_at: float):
+        self.thread_id = thread_id
+        self.interrupt_id = interrupt_id
+        self.payload = payload
+        self.created_at = created_at
+
+    def to_dict(self) -> dict:
+        return {"thread_id": self.thread_id, "interrupt_id": self.interrupt_id, "payload": self.payload, "created_at": self.created_at}
+
+class InterruptStore:
+    """Pending interrupts per (graph, thread_id) in SQLite; `path=":memory:"` keeps them in process."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = None
+        self.pid = None # process that opened `connection`
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """This process's connection (lock held); a forked worker opens its own instead of using the parent's."""
+        if self.connection is None or self.pid != os.getpid():
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None) # autocommit, guarded by the lock
+            if self.path != ":memory:":
+                connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("""CREATE TABLE IF NOT EXISTS pending_interrupts (
+                graph TEXT NOT NULL, thread_id TEXT NOT NULL, interrupt_id TEXT NOT NULL,
+                payload TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (graph, thread_id))""")
+            connection.execute("CREATE INDEX IF NOT EXISTS pending_interrupts_age ON pending_interrupts (graph, created_at)")
+            self.connection, self.pid = connection, os.getpid()
+        return self.connection
+
+    def add(self, graph: str, thread_id: str, payload, created_at: float = None) -> PendingInterrupt:
+        pending = PendingInterrupt(thread_id, uuid.uuid4().hex, payload, time.time() if created_at is None else created_at)
+        self.put(graph, pending)
+        return pending
+
+    def put(self, graph: str, pending: PendingInterrupt):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO pending_interrupts VALUES (?, ?, ?, ?, ?)",
+                            (graph, pending.thread_id, pending.interrupt_id, json.dumps(pending.payload, default=str), pending.created_at))
+
+    def get(self, graph: str, thread_id: str):
+        with self.lock:
+            row = self.db.execute("SELECT thread_id, interrupt_id, payload, created_at FROM pending_interrupts WHERE graph = ? AND thread_id = ?",
+                                  (graph, thread_id)).fetchone()
+        return self._pending(row) if row else None
+
+    def take(self, graph: str, thread_id: str, interrupt_id: str):
+        """Remove and return the pending interrupt if it's still the one the reviewer saw; else None."""
+        with self.lock:
+            row = self.db.execute("DELETE FROM pending_interrupts WHERE graph = ? AND thread_id = ? AND interrupt_id = ? "
+                                  "RETURNING thread_id, interrupt_id, payload, created_at", (graph, thread_id, interrupt_id)).fetchone()
+        return self._pending(row) if row else None
+
+    def discard(self, graph: str, thread_id: str):
+        with self.lock:
+            self.db.execute("DELETE FROM pending_interrupts WHERE graph = ? AND thread_id = ?", (graph, thread_id))
+
+    def list(self, graph: str, limit: int = 50, after: float = None) -> list:
+        """Oldest first; pass the last `created_at` seen as `after` for the next page."""
+        with self.lock:
+            rows = self.db.execute("SELECT thread_id, interrupt_id, payload, created_at FROM pending_interrupts "
+                                   "WHERE graph = ? AND created_at > ? ORDER BY created_at LIMIT ?",
+                                   (graph, after if after is not None else float("-inf"), limit)).fetchall()
+        return [self._pending(row) for row in rows]
+
+    def count(self, graph: str) -> tuple:
+        """(pending, oldest created_at or None)."""
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*), MIN(created_at) FROM pending_interrupts WHERE graph = ?", (graph,)).fetchone()
+
+    @staticmethod
+    def _pending(row) -> PendingInterrupt:
+        thread_id, interrupt_id, payload, created_at = row
+        return PendingInterrupt(thread_id, interrupt_id, json.loads(payload), created_at)
+
+class HumanReviewQueue:
+    """
+    Runs a checkpointed graph's turns and parks its interrupts in an InterruptStore until a reviewer
+    resumes them. `name` keeps graphs apart when several share one store; `validate(value)` raises
+    ValueError for answers the bot's interrupt consumer can't use.
+    """
+
+    def __init__(self, name: str, graph, store: InterruptStore, validate=None):
+        self.name = name
+        self.graph = graph
+        self.store = store
+        self.validate = validate
+        self.turns = ThreadTurnQueue() # one run per thread at a time against its checkpoint
+        self.lock = threading.Lock()
+        self.stats = {"turns": 0, "interrupted": 0, "resumed": 0, "stale": 0, "expired": 0, "failed": 0, "wait_s": 0.0}
+
+    def chat(self, thread_id: str, message: str) -> dict:
+        inputs = {"messages": [{"role": "user", "content": message}]}
+
+        def turn():
+            # Checked inside the thread's turn: an earlier turn still heading for its interrupt finishes first
+            if self._paused(thread_id):
+                raise InterruptConflict(f"Thread {thread_id} is waiting for a human reviewer")
+            if self.store.get(self.name, thread_id) is not None:
+                self.store.discard(self.name, thread_id) # left over from before a restart
+                self._count("expired")
+            return self._run(thread_id, inputs)
+
+        return self.turns.run(thread_id, message, turn)
+
+    def resume(self, thread_id: str, interrupt_id: str, value) -> dict:
+        """
+        Answer a pending interrupt: None if there's nothing pending with that id (already answered,
+        or the reviewer's list is out of date). Raises InvalidResume for a malformed answer (the
+        interrupt stays pending) and InterruptConflict if the checkpoint is gone.
+        """
+        if self.validate is not None:
+            try:
+                self.validate(value)
+            except ValueError as e:
+                raise InvalidResume(str(e)) from e
+        pending = self.store.take(self.name, thread_id, interrupt_id)
+        if pending is None:
+            self._count("stale")
+            return None
+
+        def turn():
+            if not self._paused(thread_id):
+                self._count("expired")
+                raise InterruptConflict(f"Thread {thread_id} is no longer paused (checkpoint expired or lost)")
+            with self.lock:
+                self.stats["resumed"] += 1
+                self.stats["wait_s"] += time.time() - pending.created_at
+            return self._run(thread_id, Command(resume=value))
+
+        try:
+            return self.turns.run(thread_id, ("resume", interrupt_id), turn)
+        except InterruptConflict:
+            raise
+        except Exception:
+            self.store.put(self.name, pending) # back in the queue for another try
+            raise
+
+    def pending(self, thread_id: str):
+        return self.store.get(self.name, thread_id)
+
+    def list(self, limit: int = 50, after: float = None) -> list:
+        return self.store.list(self.name, limit, after)
+
+    def _paused(self, thread_id: str) -> bool:
+        state = self.graph.get_state({"configurable": {"thread_id": thread_id}})
+        return any(task.interrupts for task in state.tasks)
+
+    def _run(self, thread_id: str, inputs) -> dict:
+        config = {"configurable": {"thread_id": thread_id}}
+        self._count("turns")
+        interrupts, messages = [], []
+        try:
+            for update in self.graph.stream(inputs, config, stream_mode="updates"):
+                for node, value in update.items():
+                    if node == "__interrupt__":
+                        interrupts.extend(value)
+                    elif isinstance(value, dict):
+                        messages.extend(value.get("messages") or [])
+        except Exception:
+            self._count("failed")
+            raise
+
+        assistant = next((message.content for message in reversed(messages) if message.type == "ai" and message.content), None)
+        if not interrupts:
+            return {"status": "done", "assistant": assistant}
+        self._count("interrupted")
+        pending = self.store.add(self.name, thread_id, interrupts[0].value) # the bots make one tool call at a time
+        return {"status": "interrupted", "assistant": assistant, "interrupt": pending.to_dict()}
+
+    def _count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+    def snapshot(self) -> dict:
+        pending, oldest = self.store.count(self.name)
+        with self.lock:
+            stats = dict(self.stats)
+        wait_s = stats.pop("wait_s")
+        return {
+            "pending": pending,
+            "oldest_pending_s": round(time.time() - oldest, 1) if oldest is not None else 0.0,
+            "avg_review_wait_s": round(wait_s / stats["resumed"], 1) if stats["resumed"] else 0.0,
+            **stats
+        }
+
+def add_review_routes(app, prefix: str, reviews: HumanReviewQueue):
+    """
+    Flask routes under `prefix` (e.g. "/v4"):
+
+        POST {prefix}/chat                            {"thread_id", "message"}
+        GET  {prefix}/interrupts?limit=&after=        pending, oldest first
+        GET  {prefix}/interrupts/<thread_id>
+        POST {prefix}/interrupts/<thread_id>/resume   {"interrupt_id", "resume": <value for interrupt()>}, 400 if invalid
+        GET  {prefix}/interrupt-stats
+    """
+    from flask import jsonify, request
+
+    def chat():
+        data = request.json or {}
+        if not data.get("thread_id"):
+            return jsonify({"error": "Missing thread_id"}), 400
+        try:
+            return jsonify(reviews.chat(data["thread_id"], data.get("message", "")))
+        except InterruptConflict as e:
+            pending = reviews.pending(data["thread_id"])
+            return jsonify({"error": str(e), "interrupt": pending.to_dict() if pending else None}), 409
+
+    def list_interrupts():
+        limit = min(request.args.get("limit", 50, type=int), 500)
+        pending = reviews.list(limit, request.args.get("after", type=float))
+        return jsonify({"interrupts": [item.to_dict() for item in pending], "next_after": pending[-1].created_at if len(pending) == limit else None})
+
+    def get_interrupt(thread_id):
+        pending = reviews.pending(thread_id)
+        if pending is None:
+            return jsonify({"error": f"Nothing pending for thread {thread_id}"}), 404
+        return jsonify(pending.to_dict())
+
+    def resume(thread_id):
+        data = request.json or {}
+        if not data.get("interrupt_id") or "resume" not in data:
+            return jsonify({"error": "Missing interrupt_id or resume"}), 400
+        try:
+            result = reviews.resume(thread_id, data["interrupt_id"], data["resume"])
+        except InvalidResume as e:
+            return jsonify({"error": str(e)}), 400
+        except InterruptConflict as e:
+            return jsonify({"error": str(e)}), 410
+        if result is None:
+            return jsonify({"error": f"Interrupt {data['interrupt_id']} is not pending for thread {thread_id}"}), 409
+        return jsonify(result)
+
+    def stats():
+        return jsonify(reviews.snapshot())
+
+    name = prefix.strip("/").replace("/", "_")
+    app.add_url_rule(f"{prefix}/chat", f"{name}_chat", chat, methods=["POST"])
+    app.add_url_rule(f"{prefix}/interrupts", f"{name}_interrupts", list_interrupts, methods=["GET"])
+    app.add_url_rule(f"{prefix}/interrupts/<thread_id>", f"{name}_interrupt", get_interrupt, methods=["GET"])
+    app.add_url_rule(f"{prefix}/interrupts/<thread_id>/resume", f"{name}_resume", resume, methods=["POST"])
+    app.add_url_rule(f"{prefix}/interrupt-stats", f"{name}_interrupt_stats", stats, methods=["GET"])
@@ -0,0 +1,99 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+class Job:
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.future = None
+        self.queued_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.timed_out = False
+
+    @property
+    def age_s(self) -> float:
+        return time.monotonic() - self.queued_at
+
+class JobQueue:
+    """
+    Runs work off the request thread: `submit` returns a job id immediately, `wait` long-polls for the
+    result. Jobs live in process memory, so the request that polls must reach the worker that submitted
+    (one worker per app, or sticky routing). Finished jobs are dropped after `ttl_seconds`.
+    """
+
+    def __init__(self, max_workers: int = 8, ttl_seconds: float = 300, name: str = "jobs"):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name) # threads start on first submit, i.e. after fork
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.jobs = {} # job_id -> Job
+        self.stats = {"submitted": 0, "started": 0, "completed": 0, "failed": 0, "timeouts": 0, "wait_s": 0.0, "run_s": 0.0, "max_wait_s": 0.0}
+
+    def submit(self, fn, *args) -> str:
+        job = Job(uuid.uuid4().hex)
+        with self.lock:
+            self._sweep()
+            self.jobs[job.id] = job
+            self.stats["submitted"] += 1
+        job.future = self.executor.submit(self._run, job, fn, args)
+        return job.id
+
+    def _run(self, job: Job, fn, args):
+        job.started_at = time.monotonic()
+        wait_s = job.started_at - job.queued_at
+        with self.lock:
+            self.stats["started"] += 1
+            self.stats["wait_s"] += wait_s
+            self.stats["max_wait_s"] = max(self.stats["max_wait_s"], wait_s)
+        try:
+            result = fn(*args)
+        except Exception:
+            self._finish(job, "failed")
+            raise
+        self._finish(job, "completed")
+        return result
+
+    def _finish(self, job: Job, outcome: str):
+        job.finished_at = time.monotonic()
+        with self.lock:
+            self.stats[outcome] += 1
+            self.stats["run_s"] += job.finished_at - job.started_at
+
+    def wait(self, job_id: str, timeout_s: float):
+        """The job once it's done, or still pending after `timeout_s`; None for unknown or expired ids."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        try:
+            job.future.exception(timeout=timeout_s)
+        except FutureTimeout:
+            pass
+        return job
+
+    def mark_timeout(self, job: Job):
+        """The caller gave up on this job (it keeps running; its result is discarded)."""
+        with self.lock:
+            if not job.timed_out:
+                job.timed_out = True
+                self.stats["timeouts"] += 1
+
+    def _sweep(self):
+        now = time.monotonic()
+        expired = [job_id for job_id, job in self.jobs.items() if job.finished_at is not None and now - job.finished_at > self.ttl_seconds]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            jobs = list(self.jobs.values())
+            finished = self.stats["completed"] + self.stats["failed"]
+            return {
+                "queued": sum(job.started_at is None for job in jobs),
+                "running": sum(job.started_at is not None and job.finished_at is None for job in jobs),
+                "oldest_queued_s": max((job.age_s for job in jobs if job.started_at is None), default=0.0),
+                "avg_wait_s": self.stats["wait_s"] / self.stats["started"] if self.stats["started"] else 0.0,
+                "avg_run_s": self.stats["run_s"] / finished if finished else 0.0,
+                **{key: value for key, value in self.stats.items() if key not in ("wait_s", "run_s")}
+            }
@@ -0,0 +1,350 @@
+"""
+Process-wide limiter for outbound OpenAI calls.
+
+Every OpenAI client in the repo is built on `rate_limited_http_client()`, so each HTTP request (including
+the SDK's own retries) goes through one `OpenAILimiter`:
+
+- token buckets for requests-per-minute and tokens-per-minute,
+- a priority queue (lower number first, FIFO within a priority) with optional per-request deadlines,
+- adaptive concurrency (AIMD): the in-flight limit halves on 429s, shrinks when latency exceeds the
+  target and creeps back up on healthy responses. 429s are retried here, honouring `retry-after`.
+- requests made under a `CancelScope` can be cancelled from another thread (the loser of a hedged call).
+
+Budgets are per process: with N server workers, set OPENAI_RPM / OPENAI_TPM to the account limit / N.
+"""
+import contextvars
+import heapq
+import itertools
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Priorities: lower runs first
+REALTIME = 0 # caller is on the phone
+INTERACTIVE = 1 # user waiting on a chat reply
+BATCH = 2 # background work
+
+DEFAULT_COMPLETION_TOKENS = 256
+
+class LimiterTimeout(TimeoutError):
+    """The request's deadline passed while it was waiting for budget."""
+
+class RequestCancelled(Exception):
+    """The request's CancelScope was cancelled (e.g. the losing side of a hedged call)."""
+
+class TokenBucket:
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (requests larger than the bucket wait for a full bucket)."""
+        self.refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float):
+        self.level -= amount
+
+class OpenAILimiter:
+
+    def __init__(self, rpm: float, tpm: float, max_concurrency: int = 16, min_concurrency: int = 1, latency_target_s: float = 20):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_target_s = latency_target_s
+
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.waiters = [] # heap of (priority, seq)
+        self.seq = itertools.count()
+        self.condition = threading.Condition()
+        self.stats = {"requests": 0, "rate_limited": 0, "deadline_exceeded": 0, "slow": 0, "wait_s": 0.0}
+
+    def acquire(self, tokens: float, priority: int = INTERACTIVE, deadline: float = None, cancelled: threading.Event = None):
+        """Block until this request is at the head of the queue and budget/concurrency allow it."""
+        queued_at = time.monotonic()
+        ticket = (priority, next(self.seq))
+        with self.condition:
+            heapq.heappush(self.waiters, ticket)
+            try:
+                while True:
+                    if cancelled is not None and cancelled.is_set():
+                        raise RequestCancelled("Cancelled while waiting for OpenAI budget")
+                    now = time.monotonic()
+                    wait = self._wait_time(tokens, now) if self.waiters[0] == ticket else None
+                    if wait == 0:
+                        heapq.heappop(self.waiters)
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        self.in_flight += 1
+                        self.stats["requests"] += 1
+                        self.stats["wait_s"] += now - queued_at
+                        return
+                    if deadline is not None:
+                        if now >= deadline:
+                            self.stats["deadline_exceeded"] += 1
+                            raise LimiterTimeout(f"Waited {now - queued_at:.2f}s for OpenAI budget")
+                        wait = deadline - now if wait is None else min(wait, deadline - now)
+                    self.condition.wait(wait)
+            finally:
+                if ticket in self.waiters:
+                    self.waiters.remove(ticket)
+                    heapq.heapify(self.waiters)
+                # Whoever is at the head now may be able to go
+                self.condition.notify_all()
+
+    def release(self, latency_s: float, rate_limited: bool = False, retry_after: float = None):
+        """Return the concurrency slot and adapt the limit to how the request went."""
+        with self.condition:
+            self.in_flight -= 1
+            if rate_limited:
+                self.stats["rate_limited"] += 1
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                self.paused_until = max(self.paused_until, time.monotonic() + (retry_after or 1.0))
+            elif latency_s > self.latency_target_s:
+                self.stats["slow"] += 1
+                self.limit = max(self.min_concurrency, self.limit - 1)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+    def wake(self):
+        """Let waiters re-check their state, e.g. after one of them was cancelled."""
+        with self.condition:
+            self.condition.notify_all()
+
+    def _wait_time(self, tokens: float, now: float):
+        """0 if the head request can go now, seconds to wait for budget, or None to wait for a release."""
+        if self.in_flight >= int(self.limit):
+            return None
+        return max(self.paused_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now), 0.0)
+
+    def snapshot(self) -> dict:
+        with self.condition:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            requests = self.stats["requests"]
+            return {
+                "concurrency_limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "queued": len(self.waiters),
+                "requests_available": int(self.requests.level),
+                "tokens_available": int(self.tokens.level),
+                "paused_s": max(0.0, self.paused_until - now),
+                "avg_wait_s": self.stats["wait_s"] / requests if requests else 0.0,
+                **{key: value for key, value in self.stats.items() if key != "wait_s"}
+            }
+
+openai_limiter = OpenAILimiter(
+    rpm=float(os.getenv("OPENAI_RPM", 500)),
+    tpm=float(os.getenv("OPENAI_TPM", 30000)),
+    max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", 16))
+)
+
+# --- Per-call priority / deadline ---
+
+request_priority_var = contextvars.ContextVar("request_priority", default=(INTERACTIVE, None))
+
+@contextmanager
+def request_priority(priority: int, timeout_s: float = None):
+    """OpenAI calls made inside this block queue with `priority` and give up after `timeout_s` of waiting."""
+    deadline = time.monotonic() + timeout_s if timeout_s is not None else None
+    token = request_priority_var.set((priority, deadline))
+    try:
+        yield
+    finally:
+        request_priority_var.reset(token)
+
+# --- Cancellation from another thread ---
+
+class CancelScope:
+    """
+    Cancels the OpenAI requests made under `cancellable(scope)` from any thread: a request waiting for
+    budget gives up, and an open response has its connection shut down, so a read blocked on a stalled
+    stream returns at once and the concurrency slot is freed. A request still waiting for response
+    headers is closed as soon as they arrive.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+        self.callbacks = {}
+        self.ids = itertools.count()
+
+    def on_cancel(self, callback):
+        """Run `callback` on cancel (now, if already cancelled); returns a function that unregisters it."""
+        with self.lock:
+            if not self.cancelled.is_set():
+                key = next(self.ids)
+                self.callbacks[key] = callback
+                return lambda: self._remove(key)
+        callback()
+        return lambda: None
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled.set()
+            callbacks, self.callbacks = list(self.callbacks.values()), {}
+        for callback in callbacks:
+            callback()
+
+    def _remove(self, key):
+        with self.lock:
+            self.callbacks.pop(key, None)
+
+cancel_scope_var = contextvars.ContextVar("cancel_scope", default=None)
+
+@contextmanager
+def cancellable(scope: CancelScope):
+    """OpenAI calls made inside this block stop when `scope.cancel()` is called."""
+    token = cancel_scope_var.set(scope)
+    try:
+        yield
+    finally:
+        cancel_scope_var.reset(token)
+
+def shutdown_connection(response: httpx.Response):
+    """Shut down the socket under `response`; a read blocked on it in another thread fails at once."""
+    network_stream = response.extensions.get("network_stream")
+    sock = network_stream.get_extra_info("socket") if network_stream is not None else None
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass # already closed
+
+# --- httpx plumbing ---
+
+def estimate_tokens(request: httpx.Request) -> int:
+    """~4 characters per prompt token plus the completion budget; 0 for requests without a body."""
+    if not request.content:
+        return 0
+    try:
+        body = json.loads(request.content)
+    except ValueError:
+        return len(request.content) // 4
+    completion = body.get("max_completion_tokens") or body.get("max_tokens") or DEFAULT_COMPLETION_TOKENS
+    return len(request.content) // 4 + completion
+
+def parse_retry_after(response: httpx.Response):
+    for header in ("retry-after-ms", "retry-after"):
+        value = response.headers.get(header)
+        if value:
+            try:
+                return float(value) / (1000 if header == "retry-after-ms" else 1)
+            except ValueError:
+                pass
+    return None
+
+class ReleasingStream(httpx.SyncByteStream):
+    """Holds the concurrency slot until a (possibly streamed) response body is closed."""
+
+    def __init__(self, stream, release):
+        self.stream = stream
+        self.release = release
+        self.released = False
+
+    def __iter__(self):
+        yield from self.stream
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            if not self.released:
+                self.released = True
+                self.release()
+
+## Describe the body as it came off the wire; a rebuilt response carries the decoded body instead
+WIRE_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding"})
+
+class RateLimitedTransport(httpx.BaseTransport):
+
+    def __init__(self, limiter: OpenAILimiter, transport: httpx.BaseTransport = None, max_attempts: int = 4):
+        self.limiter = limiter
+        self.transport = transport or httpx.HTTPTransport()
+        self.max_attempts = max_attempts
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        priority, deadline = request_priority_var.get()
+        scope = cancel_scope_var.get()
+        tokens = estimate_tokens(request)
+
+        for attempt in range(self.max_attempts):
+            remove = scope.on_cancel(self.limiter.wake) if scope is not None else None
+            try:
+                self.limiter.acquire(tokens, priority, deadline, scope.cancelled if scope is not None else None)
+            except LimiterTimeout as e:
+                return local_rate_limit_response(request, str(e))
+            finally:
+                if remove is not None:
+                    remove()
+
+            start = time.monotonic()
+            try:
+                response = self.transport.handle_request(request)
+            except Exception:
+                self.limiter.release(time.monotonic() - start)
+                raise
+            latency_s = time.monotonic() - start
+
+            if response.status_code == 429:
+                response.read()
+                response.close()
+                self.limiter.release(latency_s, rate_limited=True, retry_after=parse_retry_after(response))
+                if attempt + 1 < self.max_attempts:
+                    continue # the next acquire waits out the pause
+                # Out of attempts: hand the 429 to the SDK and tell it not to retry on top of us
+                headers = {key: value for key, value in response.headers.items() if key.lower() not in WIRE_HEADERS}
+                return httpx.Response(429, headers={**headers, "x-should-retry": "false"}, content=response.content, request=request)
+
+            if scope is not None and scope.cancelled.is_set():
+                response.close()
+                self.limiter.release(latency_s)
+                raise RequestCancelled("Cancelled while waiting for response headers")
+
+            if response.is_closed:
+                # Body already in memory, nothing left to stream
+                self.limiter.release(latency_s)
+            elif scope is None:
+                response.stream = ReleasingStream(response.stream, lambda: self.limiter.release(latency_s))
+            else:
+                remove = scope.on_cancel(lambda: shutdown_connection(response))
+
+                def release(latency_s=latency_s, remove=remove):
+                    remove()
+                    self.limiter.release(latency_s)
+
+                response.stream = ReleasingStream(response.stream, release)
+            return response
+
+    def close(self):
+        self.transport.close()
+
+def local_rate_limit_response(request: httpx.Request, message: str) -> httpx.Response:
+    body = {"error": {"message": f"Local rate limiter: {message}", "type": "local_rate_limit", "code": "deadline_exceeded"}}
+    return httpx.Response(429, headers={"x-should-retry": "false"}, json=body, request=request)
+
+def rate_limited_http_client(limiter: OpenAILimiter = openai_limiter) -> httpx.Client:
+    """httpx client for OpenAI SDK / ChatOpenAI instances; all of them share `limiter`."""
+    return httpx.Client(transport=RateLimitedTransport(limiter), timeout=httpx.Timeout(600, connect=5))
@@ -0,0 +1,363 @@
+"""
+Record conversations against a graph, then replay them offline to measure latency.
+
+Recording runs each turn live and captures every HTTP exchange it makes: LLM calls through the OpenAI
+SDK / ChatOpenAI (httpx), and tools and mock APIs through `requests`. These are captured at the
+innermost transport, so the rate limiter and SDK retries above it behave as in production. One JSONL
+line is written per turn: the graph input, the exchanges (request, response, elapsed time), the turn
+latency and per-node timings.
+
+Replay runs the same inputs through any graph (the same one after a change, or another version) with
+the recorded responses substituted for the network. A request is matched to a recorded exchange by
+method, URL and body, falling back to the next unused exchange for the same endpoint. With
+`--latency recorded` each substituted call takes as long as it did live; with `none` the numbers are
+pure graph overhead. The report gives per-node and per-turn latency distributions, and
+`--baseline` fails on regressions against an earlier report.
+
+Run:
+    python -m common.replay record  --graph customer_support.urgent_booking_changes.v2.graph:agent --inputs customer_support/urgent_booking_changes/v2/conversations.jsonl --out recordings/booking_v2.jsonl
+    python -m common.replay replay  --graph customer_support.urgent_booking_changes.v2.graph:agent --recording recordings/booking_v2.jsonl --repeat 20 --report after.json [--baseline before.json]
+
+Inputs are JSONL, one conversation per line: {"conversation": "...", "turns": [<graph input>, ...]}.
+"""
+import argparse
+import base64
+import hashlib
+import importlib
+import json
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import httpx
+import requests
+from langchain_core.callbacks import BaseCallbackHandler
+
+## Response headers that describe the wire encoding rather than the (already decoded) body
+DROPPED_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "connection"})
+
+class ReplayMiss(LookupError):
+    """Raised when a replayed turn makes a request the recording has no response for."""
+
+# --- HTTP capture ---
+
+def body_digest(body: bytes) -> str:
+    """JSON bodies are compared with sorted keys, so dict ordering doesn't cause misses."""
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True).encode()
+    except (ValueError, UnicodeDecodeError):
+        pass
+    return hashlib.sha1(body or b"").hexdigest()
+
+def encode_body(content: bytes) -> dict:
+    try:
+        return {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body": base64.b64encode(content).decode(), "encoding": "base64"}
+
+def decode_body(exchange: dict) -> bytes:
+    if exchange.get("encoding") == "base64":
+        return base64.b64decode(exchange["body"])
+    return exchange["body"].encode("utf-8")
+
+def endpoint(url: str) -> str:
+    return str(url).split("?")[0]
+
+class Session:
+    """Exchanges of one turn: appended while recording, consumed while replaying."""
+
+    def __init__(self, exchanges: list = None, latency: str = "none"):
+        self.recording = exchanges is None
+        self.exchanges = [] if exchanges is None else exchanges
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.by_key = defaultdict(deque)
+        self.by_endpoint = defaultdict(deque)
+        for index, exchange in enumerate(self.exchanges):
+            self.by_key[(exchange["method"], exchange["url"], exchange["request_digest"])].append(index)
+            self.by_endpoint[(exchange["method"], endpoint(exchange["url"]))].append(index)
+        self.used = set()
+        self.stats = {"exact": 0, "fallback": 0}
+
+    def record(self, method: str, url: str, body: bytes, status: int, headers: dict, content: bytes, elapsed_s: float):
+        exchange = {
+            "method": method,
+            "url": url,
+            "request_digest": body_digest(body),
+            "request": encode_body(body or b"")["body"] if body and len(body) < 100_000 else None, # for reading the file
+            "status": status,
+            "headers": {key: value for key, value in headers.items() if key.lower() not in DROPPED_HEADERS},
+            "elapsed_s": round(elapsed_s, 6),
+            **encode_body(content)
+        }
+        with self.lock:
+            self.exchanges.append(exchange)
+
+    def take(self, method: str, url: str, body: bytes) -> dict:
+        with self.lock:
+            for queue, kind in ((self.by_key[(method, url, body_digest(body))], "exact"), (self.by_endpoint[(method, endpoint(url))], "fallback")):
+                while queue and queue[0] in self.used:
+                    queue.popleft()
+                if queue:
+                    index = queue.popleft()
+                    self.used.add(index)
+                    self.stats[kind] += 1
+                    exchange = self.exchanges[index]
+                    break
+            else:
+                raise ReplayMiss(f"No recorded response for {method} {url}")
+        if self.latency == "recorded":
+            time.sleep(exchange["elapsed_s"])
+        return exchange
+
+_active = None # the Session requests are routed to, or None for a normal live call
+_patch_lock = threading.Lock()
+
+@contextmanager
+def capture(session: Session):
+    """Route every httpx / requests call made in the process to `session` (record or replay)."""
+    global _active
+    with _patch_lock:
+        originals = (httpx.HTTPTransport.handle_request, httpx.AsyncHTTPTransport.handle_async_request, requests.adapters.HTTPAdapter.send)
+        httpx.HTTPTransport.handle_request = _httpx_handle(originals[0])
+        httpx.AsyncHTTPTransport.handle_async_request = _httpx_handle_async(originals[1])
+        requests.adapters.HTTPAdapter.send = _requests_send(originals[2])
+        _active = session
+    try:
+        yield session
+    finally:
+        with _patch_lock:
+            _active = None
+            httpx.HTTPTransport.handle_request, httpx.AsyncHTTPTransport.handle_async_request, requests.adapters.HTTPAdapter.send = originals
+
+def decoded_headers(headers) -> list:
+    return [(key, value) for key, value in headers.multi_items() if key.lower() not in DROPPED_HEADERS]
+
+def _httpx_response(request: httpx.Request, exchange: dict) -> httpx.Response:
+    return httpx.Response(exchange["status"], headers=exchange["headers"], content=decode_body(exchange), request=request)
+
+def _httpx_handle(original):
+    def handle_request(transport, request: httpx.Request) -> httpx.Response:
+        session = _active
+        if session is None:
+            return original(transport, request)
+        body = request.read()
+        if not session.recording:
+            return _httpx_response(request, session.take(request.method, str(request.url), body))
+        start = time.perf_counter()
+        response = original(transport, request)
+        content = response.read() # streams are recorded whole; replay hands them back in one piece
+        response.close()
+        session.record(request.method, str(request.url), body, response.status_code, dict(response.headers), content, time.perf_counter() - start)
+        return httpx.Response(response.status_code, headers=decoded_headers(response.headers), content=content, request=request, extensions=response.extensions)
+    return handle_request
+
+def _httpx_handle_async(original):
+    async def handle_async_request(transport, request: httpx.Request) -> httpx.Response:
+        session = _active
+        if session is None:
+            return await original(transport, request)
+        body = await request.aread()
+        if not session.recording:
+            return _httpx_response(request, session.take(request.method, str(request.url), body))
+        start = time.perf_counter()
+        response = await original(transport, request)
+        content = await response.aread()
+        await response.aclose()
+        session.record(request.method, str(request.url), body, response.status_code, dict(response.headers), content, time.perf_counter() - start)
+        return httpx.Response(response.status_code, headers=decoded_headers(response.headers), content=content, request=request, extensions=response.extensions)
+    return handle_async_request
+
+def _requests_send(original):
+    def send(adapter, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        session = _active
+        if session is None:
+            return original(adapter, request, **kwargs)
+        body = request.body.encode() if isinstance(request.body, str) else (request.body or b"")
+        if session.recording:
+            start = time.perf_counter()
+            response = original(adapter, request, **kwargs)
+            session.record(request.method, request.url, body, response.status_code, dict(response.headers), response.content, time.perf_counter() - start)
+            return response
+
+        exchange = session.take(request.method, request.url, body)
+        response = requests.Response()
+        response.status_code = exchange["status"]
+        response.headers = requests.structures.CaseInsensitiveDict(exchange["headers"])
+        response._content = decode_body(exchange)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url, response.request, response.reason = request.url, request, ""
+        return response
+    return send
+
+# --- timing ---
+
+class NodeTimer(BaseCallbackHandler):
+    """Wall time of every graph node run (LangGraph reports each node as a chain named after it)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = {}
+        self.timings = [] # (node, seconds)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        if node is not None and kwargs.get("name") == node:
+            self.started[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def _finish(self, run_id):
+        started = self.started.pop(run_id, None)
+        if started is not None:
+            with self.lock:
+                self.timings.append((started[0], time.perf_counter() - started[1]))
+
+def run_turn(graph, graph_input, thread_id: str) -> tuple:
+    """(turn seconds, [(node, seconds)], error or None)"""
+    timer = NodeTimer()
+    config = {"callbacks": [timer], "configurable": {"thread_id": thread_id}}
+    start = time.perf_counter()
+    error = None
+    try:
+        graph.invoke(graph_input, config)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return time.perf_counter() - start, timer.timings, error
+
+# --- record / replay ---
+
+def load_graph(spec: str):
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr or "agent")
+
+def read_jsonl(path: str) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def record(graph_spec: str, inputs_path: str, out_path: str):
+    graph = load_graph(graph_spec)
+    with open(out_path, "w") as out:
+        for conversation in read_jsonl(inputs_path):
+            thread_id = f"record-{conversation['conversation']}-{uuid.uuid4().hex[:8]}"
+            for turn, graph_input in enumerate(conversation["turns"]):
+                with capture(Session()) as session:
+                    latency_s, timings, error = run_turn(graph, graph_input, thread_id)
+                out.write(json.dumps({
+                    "conversation": conversation["conversation"],
+                    "turn": turn,
+                    "graph": graph_spec,
+                    "input": graph_input,
+                    "latency_s": latency_s,
+                    "nodes": [{"node": node, "seconds": seconds} for node, seconds in timings],
+                    "error": error,
+                    "exchanges": session.exchanges
+                }) + "\n")
+                print(f"{conversation['conversation']} turn {turn}: {latency_s:.2f}s, {len(session.exchanges)} HTTP calls{f', error {error}' if error else ''}")
+
+def replay(graph_spec: str, recording_path: str, repeat: int = 1, latency: str = "none") -> dict:
+    graph = load_graph(graph_spec)
+    turns = read_jsonl(recording_path)
+    conversations = defaultdict(list)
+    for turn in turns:
+        conversations[turn["conversation"]].append(turn)
+
+    turn_s, node_s, errors = [], defaultdict(list), []
+    matches = {"exact": 0, "fallback": 0}
+    for iteration in range(repeat):
+        for name, recorded in conversations.items():
+            thread_id = f"replay-{name}-{iteration}-{uuid.uuid4().hex[:8]}" # fresh checkpoint thread each time
+            for turn in sorted(recorded, key=lambda turn: turn["turn"]):
+                with capture(Session(turn["exchanges"], latency)) as session:
+                    latency_s, timings, error = run_turn(graph, turn["input"], thread_id)
+                turn_s.append(latency_s)
+                for node, seconds in timings:
+                    node_s[node].append(seconds)
+                for kind, count in session.stats.items():
+                    matches[kind] += count
+                if error:
+                    errors.append(f"{name} turn {turn['turn']}: {error}")
+
+    return {
+        "graph": graph_spec,
+        "recording": recording_path,
+        "repeat": repeat,
+        "latency": latency,
+        "turns": distribution(turn_s),
+        "nodes": {node: distribution(samples) for node, samples in sorted(node_s.items())},
+        "matches": matches,
+        "errors": errors[:20]
+    }
+
+def distribution(samples: list) -> dict:
+    ordered = sorted(samples)
+    at = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": at(0.5) * 1000,
+        "p95_ms": at(0.95) * 1000,
+        "p99_ms": at(0.99) * 1000,
+        "max_ms": ordered[-1] * 1000
+    } if ordered else {"count": 0}
+
+def regressions(report: dict, baseline: dict, threshold: float, min_ms: float = 0.5) -> list:
+    """Rows whose p50 or p95 grew more than `threshold` (relative) and `min_ms` (absolute) over the baseline."""
+    rows = [("turn", report["turns"], baseline["turns"])]
+    rows += [(f"node {node}", stats, baseline["nodes"][node]) for node, stats in report["nodes"].items() if node in baseline["nodes"]]
+    found = []
+    for label, now, before in rows:
+        for key in ("p50_ms", "p95_ms"):
+            if key in now and key in before and now[key] - before[key] > max(min_ms, threshold * before[key]):
+                found.append(f"{label} {key}: {before[key]:.2f} -> {now[key]:.2f}")
+    return found
+
+def print_report(report: dict):
+    print(f"{'':28}{'count':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for label, stats in [("turn", report["turns"])] + [(f"  {node}", stats) for node, stats in report["nodes"].items()]:
+        if stats["count"]:
+            print(f"{label:28}{stats['count']:>7}{stats['mean_ms']:>10.2f}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    print(f"responses matched exactly: {report['matches']['exact']}, by endpoint: {report['matches']['fallback']}")
+    for error in report["errors"]:
+        print(f"error: {error}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record")
+    record_parser.add_argument("--graph", required=True, help="module:attribute of the compiled graph")
+    record_parser.add_argument("--inputs", required=True)
+    record_parser.add_argument("--out", required=True)
+    replay_parser = commands.add_parser("replay")
+    replay_parser.add_argument("--graph", required=True)
+    replay_parser.add_argument("--recording", required=True)
+    replay_parser.add_argument("--repeat", type=int, default=10)
+    replay_parser.add_argument("--latency", choices=["none", "recorded"], default="none")
+    replay_parser.add_argument("--report", help="write the report JSON here")
+    replay_parser.add_argument("--baseline", help="report JSON to compare against")
+    replay_parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.graph, args.inputs, args.out)
+        sys.exit(0)
+
+    report = replay(args.graph, args.recording, args.repeat, args.latency)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report, json.load(f), args.threshold)
+        for line in found:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if found else 0)
@@ -0,0 +1,297 @@
+import contextvars
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage, message_chunk_to_message
+
+def normalize_transcript(text: str) -> str:
+    """Case, punctuation and spacing differ between partial and final transcripts; the words don't."""
+    return " ".join(re.sub(r"[^\w\s']", " ", text or "").lower().split())
+
+class Speculation(threading.Thread):
+    """Streams `model` on a prompt built from a partial transcript, in the background; cancellable."""
+
+    def __init__(self, model, prompt: list, transcript: str, config: dict = None):
+        super().__init__(daemon=True, name="speculation")
+        self.model = model
+        self.prompt = prompt
+        self.config = config
+        self.transcript = transcript
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.cancelled = threading.Event()
+        self.context = contextvars.copy_context() # keep the caller's request priority
+
+    def run(self):
+        self.context.run(self.stream)
+
+    def stream(self):
+        message = None
+        stream = self.model.stream(self.prompt, config=self.config)
+        try:
+            for chunk in stream:
+                if self.cancelled.is_set():
+                    return
+                message = chunk if message is None else message + chunk
+            self.result = message_chunk_to_message(message) if message is not None else AIMessage(content="")
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished_at = time.monotonic()
+            stream.close()
+
+class SpeculativePrefetcher:
+    """
+    Starts the first LLM call of a voice turn while the caller is still talking.
+
+    Twilio's Gather reports partial transcripts (`partialResultCallback`); once the stable part has
+    `min_words` and stops changing (no unstable tail, or the same text `stable_partials` times in a row) a
+    `Speculation` runs on it. When the final transcript arrives the graph node calls `take`: a matching
+    speculation is reused, a diverged one is cancelled and the node calls the model as usual. Only the model
+    call is speculated, so nothing reaches the checkpoint until the real turn runs.
+    """
+
+    def __init__(self, model, build_prompt, min_words: int = 3, stable_partials: int = 2, max_per_turn: int = 3, max_threads: int = 1000):
+        self.model = model
+        self.build_prompt = build_prompt # (thread_id, transcript) -> messages for the model
+        self.min_words = min_words
+        self.stable_partials = stable_partials
+        self.max_per_turn = max_per_turn
+        self.max_threads = max_threads
+        self.lock = threading.Lock()
+        self.turns = OrderedDict() # thread_id -> {"sequence", "candidate", "seen", "started", "speculation"}
+        self.stats = {"partials": 0, "speculations": 0, "hits": 0, "misses": 0, "cancelled": 0, "errors": 0, "saved_s": 0.0}
+
+    def on_partial(self, thread_id: str, stable: str, unstable: str = "", sequence: int = None):
+        """Feed one partial-result callback; may start (or restart) a speculation for the thread."""
+        candidate = normalize_transcript(stable)
+        with self.lock:
+            self.stats["partials"] += 1
+            turn = self.turns.pop(thread_id, None) or {"sequence": -1, "candidate": None, "seen": 0, "started": 0, "speculation": None}
+            self.turns[thread_id] = turn
+            while len(self.turns) > self.max_threads:
+                _, evicted = self.turns.popitem(last=False)
+                self._cancel(evicted)
+
+            # Callbacks can arrive out of order
+            if sequence is not None:
+                if sequence <= turn["sequence"]:
+                    return
+                turn["sequence"] = sequence
+
+            turn["seen"] = turn["seen"] + 1 if candidate == turn["candidate"] else 1
+            turn["candidate"] = candidate
+            speculation = turn["speculation"]
+            settled = not normalize_transcript(unstable) or turn["seen"] >= self.stable_partials
+            if (len(candidate.split()) < self.min_words or not settled
+                    or (speculation is not None and speculation.transcript == candidate)
+                    or turn["started"] >= self.max_per_turn):
+                return
+
+            self._cancel(turn)
+            turn["started"] += 1
+            self.stats["speculations"] += 1
+
+        # Built outside the lock: reads the thread's checkpoint
+        config = {"metadata": {"thread_id": thread_id, "langgraph_node": "speculation"}} # usage attribution
+        speculation = Speculation(self.model, self.build_prompt(thread_id, stable), candidate, config)
+        with self.lock:
+            if self.turns.get(thread_id) is not turn or turn["candidate"] != candidate:
+                self.stats["cancelled"] += 1
+                return # a newer partial got here first
+            turn["speculation"] = speculation
+        speculation.start()
+
+    def take(self, thread_id: str, prompt: list, timeout_s: float = None):
+        """
+        The speculated response for this exact prompt (history + final transcript), waiting for it to finish,
+        or None. Ends the thread's turn either way.
+        """
+        taken_at = time.monotonic()
+        with self.lock:
+            turn = self.turns.pop(thread_id, None)
+        speculation = turn and turn["speculation"]
+        if speculation is None:
+            return None
+
+        final = normalize_transcript(prompt[-1].content if prompt else "")
+        if final != speculation.transcript or len(prompt) != len(speculation.prompt):
+            speculation.cancelled.set()
+            self._count("misses")
+            return None
+
+        speculation.join(timeout_s)
+        if speculation.is_alive() or speculation.error is not None or speculation.result is None:
+            speculation.cancelled.set()
+            self._count("errors")
+            return None
+
+        # Without speculation the call would have started at `taken_at`
+        saved_s = min(speculation.finished_at, taken_at) - speculation.started_at
+        with self.lock:
+            self.stats["hits"] += 1
+            self.stats["saved_s"] += max(0.0, saved_s)
+        return speculation.result
+
+    def discard(self, thread_id: str):
+        with self.lock:
+            turn = self.turns.pop(thread_id, None)
+            if turn:
+                self._cancel(turn)
+
+    def _cancel(self, turn: dict):
+        if turn["speculation"] is not None:
+            turn["speculation"].cancelled.set()
+            turn["speculation"] = None
+            self.stats["cancelled"] += 1
+
+    def _count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+            tracked = len(self.turns)
+        resolved = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "tracked_threads": tracked,
+            "hit_rate": stats["hits"] / resolved if resolved else 0.0,
+            "avg_saved_s": stats["saved_s"] / stats["hits"] if stats["hits"] else 0.0
+        }
+
+# --- Search prefetch ---
+
+## Questions that need up-to-date data: the model will almost certainly call the search tool for these
+REALTIME_INTENT = re.compile(
+    r"\b(weather|forecast|temperature|rain(ing)?|snow(ing)?|humid(ity)?|news|headlines?|latest|breaking|"
+    r"today|tonight|tomorrow|yesterday|right now|currently|this (week|weekend|morning|evening)|"
+    r"scores?|who won|match|game|stocks?|share price|price of|exchange rate|bitcoin|traffic|flight status|election|"
+    r"open now|what time)\b",
+    re.I
+)
+
+STOP_WORDS = frozenset(
+    "a an the is are was were be been what what's whats who how when where which will would could can do does did "
+    "i me my you your it its of in on at for to from and or about like please tell give find search look up there "
+    "any some much many right now".split()
+)
+
+## The filters the model tends to add to those searches
+NEWS_INTENT = re.compile(r"\b(news|headlines?|breaking|election|who won|scores?)\b", re.I)
+FINANCE_INTENT = re.compile(r"\b(stocks?|share price|exchange rate|bitcoin|crypto|market)\b", re.I)
+DAY_INTENT = re.compile(r"\b(today|tonight|right now|currently|latest|breaking|this (morning|evening))\b", re.I)
+WEEK_INTENT = re.compile(r"\bthis (week|weekend)\b", re.I)
+
+def is_realtime_query(text: str) -> bool:
+    return bool(text) and REALTIME_INTENT.search(text) is not None
+
+def realtime_search_args(text: str) -> dict:
+    """Search filters the model would likely send for this question (topic, time_range)."""
+    args = {}
+    if NEWS_INTENT.search(text):
+        args["topic"] = "news"
+    elif FINANCE_INTENT.search(text):
+        args["topic"] = "finance"
+    if DAY_INTENT.search(text):
+        args["time_range"] = "day"
+    elif WEEK_INTENT.search(text):
+        args["time_range"] = "week"
+    return args
+
+def content_words(text: str) -> set:
+    return {word for word in normalize_transcript(text).split() if word not in STOP_WORDS}
+
+class SearchPrefetcher:
+    """
+    Runs a web search for a real-time question concurrently with the first LLM call of the turn.
+
+    `start` searches for the user's words, with the topic/time range the question implies
+    (`realtime_search_args`); when the model then calls the search tool, `take` hands back the prefetched
+    result if the model's query is close enough (at least `min_overlap` of its content words appear in the
+    prefetched one) and it asked for no hard filter such as domains or dates. Topic, time range and depth
+    only re-rank results for the same question, so they don't disqualify a prefetch; hits where they
+    differed from the prefetch are counted in `soft_mismatches`. Otherwise the caller runs the model's
+    own search.
+    """
+
+    ## Tool arguments that only tune a search for the same question; a prefetch stands in for any value
+    SOFT_ARGS = frozenset({"topic", "time_range", "search_depth"})
+    ## Values of the other arguments that leave the search as is; any other value (domains, dates, images) narrows it
+    DEFAULTS = {"include_images": (False, None), "include_domains": ([], None), "exclude_domains": ([], None)}
+
+    def __init__(self, search, min_overlap: float = 0.5, max_workers: int = 4, max_threads: int = 1000):
+        self.search = search # (query, args) -> result
+        self.min_overlap = min_overlap
+        self.max_threads = max_threads
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search-prefetch")
+        self.lock = threading.Lock()
+        self.pending = OrderedDict() # thread_id -> (query, args, started_at, Future)
+        self.stats = {"prefetches": 0, "hits": 0, "misses": 0, "unused": 0, "errors": 0, "soft_mismatches": 0, "saved_s": 0.0}
+
+    def start(self, thread_id: str, query: str, args: dict = None):
+        args = args or {}
+        future = self.executor.submit(self._run, query, args)
+        with self.lock:
+            self.stats["prefetches"] += 1
+            if self.pending.pop(thread_id, None) is not None:
+                self.stats["unused"] += 1
+            self.pending[thread_id] = (query, args, time.monotonic(), future)
+            while len(self.pending) > self.max_threads:
+                self.pending.popitem(last=False)
+                self.stats["unused"] += 1
+
+    def _run(self, query: str, args: dict):
+        result = self.search(query, args)
+        return result, time.monotonic()
+
+    def take(self, thread_id: str, args: dict, timeout_s: float = None):
+        """Prefetched result for the model's search `args`, or None if there's no usable one."""
+        taken_at = time.monotonic()
+        with self.lock:
+            entry = self.pending.pop(thread_id, None)
+        if entry is None:
+            return None
+        query, prefetched_args, started_at, future = entry
+
+        narrowed = any(value and value not in self.DEFAULTS.get(key, ()) for key, value in args.items() if key != "query" and key not in self.SOFT_ARGS)
+        wanted = content_words(args.get("query", ""))
+        overlap = len(wanted & content_words(query)) / len(wanted) if wanted else 0.0
+        if narrowed or overlap < self.min_overlap:
+            self._count("misses")
+            return None
+
+        try:
+            result, finished_at = future.result(timeout=timeout_s)
+        except Exception: # includes timing out
+            self._count("errors")
+            return None
+
+        with self.lock:
+            self.stats["hits"] += 1
+            if any(args.get(key) != prefetched_args.get(key) for key in ("topic", "time_range")):
+                self.stats["soft_mismatches"] += 1
+            self.stats["saved_s"] += max(0.0, min(finished_at, taken_at) - started_at)
+        return result
+
+    def _count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+            pending = len(self.pending)
+        resolved = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "pending": pending,
+            "hit_rate": stats["hits"] / resolved if resolved else 0.0,
+            "avg_saved_s": stats["saved_s"] / stats["hits"] if stats["hits"] else 0.0
+        }
@@ -0,0 +1,180 @@
+"""
+Token-streaming console runner for the chatbot graphs.
+
+Streams with stream_mode=["messages", "updates"]: "messages" delivers model tokens as they arrive,
+"updates" delivers each node's finished output, which is where tool calls (parsed `tool_calls`, not the
+provider's raw `additional_kwargs`), tool results and interrupts show up. Every turn ends with its
+time-to-first-token and generation rate.
+
+Run: python -m common.streaming basic_chat_bot.v4.bot [--thread-id 1]
+"""
+import argparse
+import importlib
+import inspect
+import sys
+import time
+import uuid
+
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+from langgraph.types import Command
+
+QUIT = ("quit", "exit", "q")
+
+def node_messages(update) -> list:
+    """Messages in a node's update; ToolNode returns a list of updates when tools return Commands."""
+    updates = update if isinstance(update, list) else [update]
+    messages = []
+    for item in updates:
+        if isinstance(item, Command):
+            item = item.update
+        if isinstance(item, dict):
+            messages.extend(item.get("messages") or [])
+    return messages
+
+class ConsolePrinter:
+    """Prints tokens inline and everything else as a bracketed event line."""
+
+    def __init__(self, out=sys.stdout, preview_chars: int = 200):
+        self.out = out
+        self.preview_chars = preview_chars
+        self.streaming = False # mid-line in an assistant reply
+
+    def token(self, text: str):
+        if not self.streaming:
+            self.out.write("Assistant: ")
+            self.streaming = True
+        self.out.write(text)
+        self.out.flush()
+
+    def event(self, kind: str, text: str):
+        self.end_line()
+        print(f"[{kind}] {text}", file=self.out)
+
+    def end_line(self):
+        if self.streaming:
+            self.out.write("\n")
+            self.streaming = False
+
+    def tool_call(self, call: dict):
+        args = ", ".join(f"{key}={value!r}" for key, value in call["args"].items())
+        self.event("tool call", f"{call['name']}({args})")
+
+    def tool_result(self, message: ToolMessage):
+        content = str(message.content)
+        preview = content if len(content) <= self.preview_chars else content[:self.preview_chars] + "..."
+        self.event("tool result", f"{message.name or message.tool_call_id}: {preview}")
+
+    def interrupt(self, value):
+        self.event("interrupt", repr(value))
+
+    def turn_stats(self, stats: dict):
+        if stats["ttft_s"] is None:
+            self.event("stats", f"no tokens | {stats['total_s']:.2f}s")
+            return
+        rate = f"{stats['tokens_per_s']:.1f} tok/s" if stats["tokens_per_s"] is not None else "- tok/s"
+        self.event("stats", f"ttft {stats['ttft_s']:.2f}s | {stats['tokens']} tokens | {rate} | {stats['total_s']:.2f}s")
+
+def stream_turn(graph, inputs, config: dict = None, printer: ConsolePrinter = None) -> tuple:
+    """
+    Run one graph invocation (user input or resume Command), printing as it streams.
+
+    Returns (interrupts, stats); stats has ttft_s (first token, text or tool-call arguments), tokens
+    (provider usage when reported, else chunks), tokens_per_s from first to last token (None for a
+    single chunk) and total_s.
+    """
+    printer = printer or ConsolePrinter()
+    start = time.perf_counter()
+    first = last = None
+    chunks = usage_tokens = 0
+    streamed = set() # ids of messages already shown token by token
+    interrupts = []
+
+    for mode, data in graph.stream(inputs, config, stream_mode=["messages", "updates"]):
+        if mode == "messages":
+            chunk, _ = data
+            if not isinstance(chunk, AIMessageChunk):
+                continue # tool results and inputs come through "updates"
+            if chunk.usage_metadata:
+                usage_tokens += chunk.usage_metadata.get("output_tokens", 0)
+            if not chunk.content and not chunk.tool_call_chunks:
+                continue
+            last = time.perf_counter()
+            first = first or last
+            chunks += 1
+            streamed.add(chunk.id)
+            if isinstance(chunk.content, str) and chunk.content:
+                printer.token(chunk.content)
+            continue
+
+        for node, update in data.items():
+            if node == "__interrupt__":
+                for item in update:
+                    printer.interrupt(item.value)
+                    interrupts.append(item)
+                continue
+            for message in node_messages(update):
+                if isinstance(message, AIMessage):
+                    if message.id not in streamed and isinstance(message.content, str) and message.content:
+                        printer.token(message.content) # a model that doesn't stream
+                    printer.end_line()
+                    for call in message.tool_calls:
+                        printer.tool_call(call)
+                elif isinstance(message, ToolMessage):
+                    printer.tool_result(message)
+
+    printer.end_line()
+    tokens = usage_tokens or chunks
+    generation_s = (last - first) if first is not None else 0.0
+    stats = {
+        "ttft_s": first - start if first is not None else None,
+        "tokens": tokens,
+        "tokens_per_s": tokens / generation_s if chunks > 1 and generation_s > 0 else None, # one chunk has no rate
+        "total_s": time.perf_counter() - start
+    }
+    return interrupts, stats
+
+def chat_turn(graph, user_input: str, config: dict = None, resume=None, printer: ConsolePrinter = None) -> list:
+    """
+    One user turn, including any interrupts: `resume(value)` returns the Command that continues the
+    graph (e.g. after asking a human). Without `resume` the turn stops at the first interrupt.
+    Returns the stats of every invocation in the turn.
+    """
+    printer = printer or ConsolePrinter()
+    inputs = {"messages": [{"role": "user", "content": user_input}]}
+    turns = []
+    while inputs is not None:
+        interrupts, stats = stream_turn(graph, inputs, config, printer)
+        printer.turn_stats(stats)
+        turns.append(stats)
+        inputs = resume(interrupts[0].value) if interrupts and resume else None
+    return turns
+
+def prompt_resume(get_human_command):
+    """A `resume` that asks for each parameter of the bot's `get_human_command` on the console."""
+    names = list(inspect.signature(get_human_command).parameters)
+    return lambda value: get_human_command(*(input(f"{name.replace('_', ' ').capitalize()}: ") for name in names))
+
+def chat_loop(graph, config: dict = None, resume=None):
+    printer = ConsolePrinter()
+    while True:
+        user_input = input("User: ")
+        if user_input.lower() in QUIT:
+            print("Goodbye!")
+            break
+        chat_turn(graph, user_input, config, resume, printer)
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat with a bot module's `graph`, streaming tokens.")
+    parser.add_argument("module", help="e.g. basic_chat_bot.v4.bot")
+    parser.add_argument("--thread-id", default=None, help="checkpointed graphs only (default: a new thread)")
+    args = parser.parse_args()
+
+    bot = importlib.import_module(args.module)
+    config = None
+    if bot.graph.checkpointer is not None:
+        config = {"configurable": {"thread_id": args.thread_id or uuid.uuid4().hex}}
+    get_human_command = getattr(bot, "get_human_command", None)
+    chat_loop(bot.graph, config, prompt_resume(get_human_command) if get_human_command else None)
+
+if __name__ == "__main__":
+    main()
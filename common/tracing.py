@@ -0,0 +1,174 @@
+import contextvars
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+class Span:
+    def __init__(self, trace_id: str, name: str, parent_id: str = None, attributes: dict = None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes or {}
+        self.thread_id = threading.get_ident()
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+class Run:
+    """All spans of one graph invocation, sharing a trace id."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = secrets.token_hex(16)
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self.lock:
+            self.spans.append(span)
+
+    def to_chrome_trace(self) -> dict:
+        """Chrome trace-event format (chrome://tracing, Perfetto, speedscope)."""
+        events = []
+        for span in self.spans:
+            events.append({
+                "name": span.name,
+                "cat": self.name,
+                "ph": "X",
+                "ts": span.start_ns / 1000,
+                "dur": (span.end_ns - span.start_ns) / 1000,
+                "pid": os.getpid(),
+                "tid": span.thread_id,
+                "args": {
+                    "trace_id": self.trace_id,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    **span.attributes,
+                    **({"error": span.error} if span.error else {})
+                }
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_otlp(self) -> dict:
+        """OpenTelemetry OTLP/JSON export (ExportTraceServiceRequest)."""
+        def attribute(key, value):
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        spans = []
+        for span in self.spans:
+            spans.append({
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": 1, # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [attribute(key, value) for key, value in span.attributes.items()],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+            })
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [attribute("service.name", self.name)]},
+                "scopeSpans": [{"scope": {"name": "ai-agents-demos"}, "spans": spans}]
+            }]
+        }
+
+class Tracer:
+    """
+    Opt-in span recorder for LangGraph runs.
+
+    `traced(graph, name)` opens a root span per invoke/stream, `wrap(name, node)` opens a child span per
+    node execution and `span(name)` can nest further spans inside a node. Finished runs are kept in
+    `recent` and, if `trace_dir` is set, written there as Chrome-trace or OTLP JSON.
+    """
+
+    def __init__(self, enabled: bool = False, trace_dir: str = None, trace_format: str = "chrome", keep: int = 50):
+        self.enabled = enabled
+        self.trace_dir = trace_dir
+        self.trace_format = trace_format
+        self.recent = deque(maxlen=keep)
+        self.current_run = contextvars.ContextVar("current_run", default=None)
+        self.current_span = contextvars.ContextVar("current_span", default=None)
+
+    @contextmanager
+    def run(self, name: str):
+        run = Run(name)
+        run_token = self.current_run.set(run)
+        try:
+            with self.span(name):
+                yield run
+        finally:
+            self.current_run.reset(run_token)
+            self.recent.append(run)
+            if self.trace_dir:
+                self.export(run)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        run = self.current_run.get()
+        if run is None:
+            # Not inside a traced run: nothing to attach the span to
+            yield None
+            return
+
+        parent = self.current_span.get()
+        span = Span(run.trace_id, name, parent.span_id if parent else None, attributes)
+        span_token = self.current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            self.current_span.reset(span_token)
+            run.add(span)
+
+    def wrap(self, name: str, node):
+        """Wrap a graph node so each execution is recorded as a span."""
+        @functools.wraps(node)
+        def wrapper(state):
+            with self.span(name, **{"langgraph.node": name}):
+                return node(state)
+        return wrapper
+
+    def traced(self, graph, name: str):
+        return TracedGraph(graph, self, name)
+
+    def export(self, run: Run) -> str:
+        os.makedirs(self.trace_dir, exist_ok=True)
+        payload = run.to_otlp() if self.trace_format == "otlp" else run.to_chrome_trace()
+        path = os.path.join(self.trace_dir, f"{run.name}-{int(time.time())}-{run.trace_id[:8]}.json")
+        with open(path, "w") as f:
+            json.dump(payload, f)
+        return path
+
+class TracedGraph:
+    """Compiled graph proxy that records one run per invoke/stream call."""
+
+    def __init__(self, graph, tracer: Tracer, name: str):
+        self.graph = graph
+        self.tracer = tracer
+        self.name = name
+
+    def invoke(self, *args, **kwargs):
+        with self.tracer.run(self.name):
+            return self.graph.invoke(*args, **kwargs)
+
+    def stream(self, *args, **kwargs):
+        with self.tracer.run(self.name):
+            yield from self.graph.stream(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self.graph, attr)
@@ -0,0 +1,184 @@
+import re
+
+# --- Numbers to words ---
+
+ONES = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten", "eleven", "twelve",
+        "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen"]
+TENS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+SCALES = [(10**12, "trillion"), (10**9, "billion"), (10**6, "million"), (1000, "thousand")]
+ORDINALS = {"one": "first", "two": "second", "three": "third", "five": "fifth", "eight": "eighth", "nine": "ninth", "twelve": "twelfth"}
+LIST_ORDINALS = ["First", "Second", "Third", "Fourth", "Fifth", "Sixth", "Seventh", "Eighth", "Ninth", "Tenth"]
+
+def number_to_words(n: int) -> str:
+    if n < 0:
+        return "minus " + number_to_words(-n)
+    if n < 20:
+        return ONES[n]
+    if n < 100:
+        return TENS[n // 10] + ("" if n % 10 == 0 else " " + ONES[n % 10])
+    if n < 1000:
+        rest = n % 100
+        return ONES[n // 100] + " hundred" + ("" if rest == 0 else " " + number_to_words(rest))
+    for scale, name in SCALES:
+        if n >= scale:
+            rest = n % scale
+            return number_to_words(n // scale) + " " + name + ("" if rest == 0 else " " + number_to_words(rest))
+
+def ordinal_to_words(n: int) -> str:
+    words = number_to_words(n)
+    head, _, last = words.rpartition(" ")
+    if last in ORDINALS:
+        last = ORDINALS[last]
+    elif last.endswith("y"):
+        last = last[:-1] + "ieth"
+    else:
+        last += "th"
+    return f"{head} {last}" if head else last
+
+def digits_to_words(digits: str) -> str:
+    return " ".join(ONES[int(d)] for d in digits)
+
+def decimal_to_words(text: str) -> str:
+    whole, _, fraction = text.replace(",", "").partition(".")
+    words = number_to_words(int(whole or 0))
+    if fraction:
+        words += " point " + digits_to_words(fraction)
+    return words
+
+# --- Markdown / abbreviation rules (compiled once) ---
+
+CODE_BLOCK = re.compile(r"```.*?(```|$)", re.DOTALL)
+INLINE_CODE = re.compile(r"`([^`]*)`")
+IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+URL = re.compile(r"https?://\S+")
+EMPHASIS = re.compile(r"(\*\*|\*|~~)(?=\S)(.+?)(?<=\S)\1")
+UNDERSCORE_EMPHASIS = re.compile(r"(?<!\w)(__|_)(?=\S)(.+?)(?<=\S)\1(?!\w)") # not inside snake_case_names
+HEADING = re.compile(r"^\s{0,3}#{1,6}\s*(.*?)\s*#*\s*$")
+BULLET = re.compile(r"^\s*[-*+•]\s+(.*)$")
+NUMBERED = re.compile(r"^\s*(\d+)[.)]\s+(.*)$")
+QUOTE = re.compile(r"^\s*>\s?")
+RULE = re.compile(r"^\s*([-*_]\s*){3,}$")
+TABLE_DIVIDER = re.compile(r"^\s*\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$")
+
+ABBREVIATIONS = [
+    (re.compile(r"\be\.g\.", re.I), "for example"),
+    (re.compile(r"\bi\.e\.", re.I), "that is"),
+    (re.compile(r"\betc\."), "et cetera"),
+    (re.compile(r"\bvs\.?(?=\s)", re.I), "versus"),
+    (re.compile(r"\bapprox\.", re.I), "approximately"),
+    (re.compile(r"\bDr\.(?=\s)"), "Doctor"),
+    (re.compile(r"\bMr\.(?=\s)"), "Mister"),
+    (re.compile(r"\bMrs\.(?=\s)"), "Missus"),
+    (re.compile(r"\bNo\.(?=\s*\d)"), "number"),
+    (re.compile(r"\bhrs?\b"), "hours"),
+    (re.compile(r"\bmins?\b"), "minutes"),
+    (re.compile(r"\b24/7\b"), "twenty four seven"),
+    (re.compile(r"\s*&\s*"), " and "),
+    (re.compile(r"\band\s*/\s*or\b", re.I), "and or"),
+    (re.compile(r"\s*/\s*(?=(year|yr|month|week|day|night|hour|visit|person|member)s?\b)", re.I), " per "),
+    (re.compile(r"\s*/\s*(?=[A-Za-z])"), " or "),
+]
+
+IDENTIFIER = re.compile(r"\b([A-Za-z]+)-(\d{3,})\b") # e.g. CIG-2553, but not COVID-19
+PHONE = re.compile(r"(?<!\w)\+?\d{1,4}(?:-\d{2,4}){2,}\b")
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+CURRENCY_SCALES = {"k": "thousand", "m": "million", "b": "billion", "bn": "billion", "thousand": "thousand", "million": "million", "billion": "billion", "trillion": "trillion"}
+
+SLASH_DATE = re.compile(r"(?<![\w/])(\d{1,2})/(\d{1,2})/(\d{4}|\d{2})(?![\w/])") # US month/day/year
+ISO_DATE = re.compile(r"(?<![\w-])(\d{4})-(\d{2})-(\d{2})(?![\w-])")
+VERSION = re.compile(r"(?<![\w.])([vV]?)(\d+(?:\.\d+){2,})(?!\w|\.\d)") # 1.2.3, v2.0.1
+SCALED_CURRENCY = re.compile(r"([+-]?)\$(\d[\d,]*(?:\.\d+)?)\s?(thousand|million|billion|trillion|bn|[kmb])\b", re.I)
+CURRENCY = re.compile(r"([+-]?)\$(\d[\d,]*)(?:\.(\d{1,2}))?")
+PERCENT = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s?%")
+ORDINAL_NUMBER = re.compile(r"\b(\d+)(st|nd|rd|th)\b")
+NUMBER = re.compile(r"(?<![\w.])(\d{1,3}(?:,\d{3})+|\d+)(\.\d+)?(?![\w])")
+
+def currency_to_words(match) -> str:
+    sign, dollars, cents = match.groups()
+    amount = int(dollars.replace(",", ""))
+    words = ("minus " if sign == "-" else "plus " if sign == "+" else "") + number_to_words(amount) + (" dollar" if amount == 1 else " dollars")
+    if cents and int(cents):
+        cents = int(cents.ljust(2, "0"))
+        words += f" and {number_to_words(cents)} cent" + ("" if cents == 1 else "s")
+    return words
+
+def scaled_currency_to_words(match) -> str:
+    sign, amount, scale = match.groups()
+    return ("minus " if sign == "-" else "plus " if sign == "+" else "") + decimal_to_words(amount) + f" {CURRENCY_SCALES[scale.lower()]} dollars"
+
+def year_to_words(year: int) -> str:
+    if year < 100:
+        year += 2000
+    if 2000 <= year < 2010 or year % 1000 < 10:
+        return number_to_words(year) # two thousand five
+    high, low = divmod(year, 100)
+    return number_to_words(high) + (" hundred" if low == 0 else " oh " + ONES[low] if low < 10 else " " + number_to_words(low))
+
+def date_to_words(year: int, month: int, day: int, parts: tuple, separator: str) -> str:
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return f" {separator} ".join(number_to_words(int(part)) for part in parts) # not a date: read the numbers
+    return f"{MONTHS[month - 1]} {ordinal_to_words(day)}, {year_to_words(year)}"
+
+def plain_number_to_words(match) -> str:
+    whole, fraction = match.groups()
+    # Long digit runs and leading zeros are identifiers (policy / phone numbers): read digit by digit
+    if "," not in whole and (len(whole) >= 7 or (len(whole) > 1 and whole.startswith("0"))):
+        return digits_to_words(whole)
+    return decimal_to_words(whole + (fraction or ""))
+
+def expand_numbers(text: str) -> str:
+    # Dates and versions first: their separators would otherwise be read as phone dashes / decimal points
+    text = SLASH_DATE.sub(lambda m: date_to_words(int(m.group(3)), int(m.group(1)), int(m.group(2)), m.groups(), "slash"), text)
+    text = ISO_DATE.sub(lambda m: date_to_words(int(m.group(1)), int(m.group(2)), int(m.group(3)), m.groups(), "dash"), text)
+    text = VERSION.sub(lambda m: ("version " if m.group(1) else "") + " point ".join(number_to_words(int(part)) for part in m.group(2).split(".")), text)
+    text = IDENTIFIER.sub(lambda m: f"{m.group(1)} {digits_to_words(m.group(2))}", text)
+    text = PHONE.sub(lambda m: ", ".join(digits_to_words(group) for group in m.group(0).lstrip("+").split("-")), text)
+    text = SCALED_CURRENCY.sub(scaled_currency_to_words, text)
+    text = CURRENCY.sub(currency_to_words, text)
+    text = PERCENT.sub(lambda m: decimal_to_words(m.group(1)) + " percent", text)
+    text = ORDINAL_NUMBER.sub(lambda m: ordinal_to_words(int(m.group(1))), text)
+    return NUMBER.sub(plain_number_to_words, text)
+
+def sentence(text: str) -> str:
+    text = text.strip()
+    if text and text[-1] not in ".!?:;":
+        text += "."
+    return text
+
+def markdown_to_speech(markdown: str) -> str:
+    """Turn a markdown answer into plain text a TTS engine can read aloud."""
+    text = CODE_BLOCK.sub(" ", markdown)
+    text = IMAGE.sub(r"\1", text)
+    text = LINK.sub(r"\1", text)
+    text = URL.sub("the link in the chat", text)
+    text = INLINE_CODE.sub(r"\1", text)
+    for _ in range(2): # nested emphasis, e.g. ***bold italic***
+        text = EMPHASIS.sub(r"\2", text)
+        text = UNDERSCORE_EMPHASIS.sub(r"\2", text)
+
+    sentences = []
+    for line in text.splitlines():
+        if not line.strip() or RULE.match(line) or TABLE_DIVIDER.match(line):
+            continue
+        line = QUOTE.sub("", line)
+
+        if heading := HEADING.match(line):
+            sentences.append(sentence(heading.group(1)))
+        elif numbered := NUMBERED.match(line):
+            index = int(numbered.group(1))
+            prefix = LIST_ORDINALS[index - 1] if 0 < index <= len(LIST_ORDINALS) else f"Number {index}"
+            sentences.append(sentence(f"{prefix}, {numbered.group(2)}"))
+        elif bullet := BULLET.match(line):
+            sentences.append(sentence(bullet.group(1)))
+        elif line.strip().startswith("|"):
+            cells = [cell.strip() for cell in line.strip().strip("|").split("|")]
+            sentences.append(sentence(", ".join(cell for cell in cells if cell)))
+        else:
+            sentences.append(sentence(line))
+
+    text = " ".join(s for s in sentences if s)
+    for pattern, replacement in ABBREVIATIONS:
+        text = pattern.sub(replacement, text)
+    text = expand_numbers(text)
+    return re.sub(r"\s+", " ", text).strip()
@@ -0,0 +1,89 @@
+import threading
+import time
+from concurrent.futures import Future
+
+class ThreadState:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.next_ticket = 0
+        self.serving = 0
+
+    @property
+    def depth(self) -> int:
+        """Turns queued or running for this thread."""
+        return self.next_ticket - self.serving
+
+class ThreadTurnQueue:
+    """
+    Serializes conversation turns per thread_id, in arrival order, and coalesces exact duplicates.
+
+    Two turns for the same thread never run concurrently against its checkpoint. A request whose
+    (thread_id, message) is already queued or running doesn't run again: it waits for the in-flight
+    turn and gets the same result (clients retrying on timeout don't pay for a second LLM call).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.threads = {} # thread_id -> ThreadState, dropped once idle
+        self.in_flight = {} # (thread_id, message) -> Future
+        self.stats = {"turns": 0, "coalesced": 0, "failed": 0, "max_depth": 0, "wait_s": 0.0}
+
+    def run(self, thread_id: str, message: str, turn):
+        """Run `turn()` for this thread once all earlier turns finished; duplicates share the result."""
+        key = (thread_id, message)
+        with self.lock:
+            future = self.in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self.in_flight[key] = Future()
+                state = self.threads.setdefault(thread_id, ThreadState())
+                with state.condition:
+                    ticket = state.next_ticket
+                    state.next_ticket += 1
+                    self.stats["max_depth"] = max(self.stats["max_depth"], state.depth)
+            else:
+                self.stats["coalesced"] += 1
+
+        if owner:
+            self._execute(thread_id, key, state, ticket, future, turn)
+        return future.result()
+
+    def _execute(self, thread_id, key, state, ticket, future, turn):
+        queued_at = time.perf_counter()
+        with state.condition:
+            state.condition.wait_for(lambda: state.serving == ticket)
+        wait_s = time.perf_counter() - queued_at
+
+        try:
+            future.set_result(turn())
+        except Exception as e:
+            future.set_exception(e)
+            with self.lock:
+                self.stats["failed"] += 1
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+                self.stats["turns"] += 1
+                self.stats["wait_s"] += wait_s
+                with state.condition:
+                    state.serving += 1
+                    state.condition.notify_all()
+                    if state.depth == 0:
+                        self.threads.pop(thread_id, None)
+
+    def snapshot(self) -> dict:
+        """Queue depth gauges and coalescing counters."""
+        with self.lock:
+            depths = [state.depth for state in self.threads.values()]
+            turns = self.stats["turns"]
+            return {
+                "active_threads": len(depths),
+                "queued_turns": sum(depths),
+                "deepest_queue": max(depths, default=0),
+                "in_flight_messages": len(self.in_flight),
+                "turns": turns,
+                "coalesced": self.stats["coalesced"],
+                "failed": self.stats["failed"],
+                "max_depth": self.stats["max_depth"],
+                "avg_wait_s": self.stats["wait_s"] / turns if turns else 0.0
+            }
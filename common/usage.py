@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+import openai
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+
+load_dotenv()
+
+## USD per 1M tokens (prompt, completion). Approximate list prices, used for estimates only.
+PRICES_PER_MILLION = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-3.5-turbo": (0.50, 1.50)
+}
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of a call; unknown models cost 0."""
+    # Longest prefix wins so dated snapshots ("gpt-4o-2024-08-06") and "gpt-4o-mini" resolve correctly
+    for name in sorted(PRICES_PER_MILLION, key=len, reverse=True):
+        if model and model.startswith(name):
+            prompt_price, completion_price = PRICES_PER_MILLION[name]
+            return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+    return 0.0
+
+def empty_totals() -> dict:
+    return {"calls": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "latency_s": 0.0, "cost_usd": 0.0}
+
+def add_to_totals(totals: dict, record: dict):
+    totals["calls"] += 1
+    for key in ("prompt_tokens", "cached_prompt_tokens", "completion_tokens", "total_tokens", "latency_s", "cost_usd"):
+        totals[key] += record[key]
+
+class UsageTracker:
+    """
+    Collects per-call token usage and latency, aggregated in memory by model, graph node and
+    thread (thread_id / Twilio call_sid), optionally appending every call to a JSONL file.
+    """
+
+    def __init__(self, jsonl_path: str = None, max_threads: int = 10000):
+        self.jsonl_path = jsonl_path
+        self.max_threads = max_threads
+        self.lock = threading.Lock()
+        self.totals = empty_totals()
+        self.by_model = defaultdict(empty_totals)
+        self.by_node = defaultdict(empty_totals)
+        self.by_thread = OrderedDict() # LRU-capped so per-thread totals can't grow forever
+
+    def record(self, *, model: str, prompt_tokens: int, completion_tokens: int, latency_s: float, thread_id: str = None, node: str = None, cached_prompt_tokens: int = 0) -> dict:
+        record = {
+            "ts": time.time(),
+            "thread_id": thread_id,
+            "node": node,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "cached_prompt_tokens": cached_prompt_tokens, # prompt prefix served from the provider's prompt cache
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "latency_s": latency_s,
+            "cost_usd": estimate_cost(model, prompt_tokens, completion_tokens)
+        }
+
+        with self.lock:
+            add_to_totals(self.totals, record)
+            add_to_totals(self.by_model[model or "unknown"], record)
+            add_to_totals(self.by_node[node or "unknown"], record)
+            if thread_id is not None:
+                thread_totals = self.by_thread.pop(thread_id, None) or empty_totals()
+                add_to_totals(thread_totals, record)
+                self.by_thread[thread_id] = thread_totals
+                while len(self.by_thread) > self.max_threads:
+                    self.by_thread.popitem(last=False)
+
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+
+        return record
+
+    def thread_usage(self, thread_id: str) -> dict:
+        with self.lock:
+            return dict(self.by_thread.get(thread_id) or empty_totals())
+
+    def snapshot(self, top_threads: int = 20) -> dict:
+        """Aggregates for the metrics endpoint; only the `top_threads` most expensive threads are listed."""
+        with self.lock:
+            threads = sorted(self.by_thread.items(), key=lambda item: item[1]["total_tokens"], reverse=True)
+            return {
+                "totals": dict(self.totals),
+                "by_model": {key: dict(value) for key, value in self.by_model.items()},
+                "by_node": {key: dict(value) for key, value in self.by_node.items()},
+                "tracked_threads": len(self.by_thread),
+                "top_threads": {key: dict(value) for key, value in threads[:top_threads]}
+            }
+
+usage_tracker = UsageTracker(jsonl_path=os.getenv("LLM_USAGE_LOG"))
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback that feeds every chat model call into a UsageTracker.
+    Inside a LangGraph run the callback metadata carries `thread_id` and `langgraph_node`.
+    """
+
+    def __init__(self, tracker: UsageTracker):
+        self.tracker = tracker
+        self.runs = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self.runs[run_id] = (time.perf_counter(), metadata or {})
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self.runs[run_id] = (time.perf_counter(), metadata or {})
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.runs.pop(run_id, None)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self.runs.pop(run_id, None)
+        if started is None:
+            return
+        start, metadata = started
+
+        prompt_tokens = completion_tokens = cached_prompt_tokens = 0
+        llm_output = response.llm_output or {}
+        message = getattr(response.generations[0][0], "message", None) if response.generations and response.generations[0] else None
+        if message is not None and message.usage_metadata:
+            prompt_tokens = message.usage_metadata.get("input_tokens", 0)
+            completion_tokens = message.usage_metadata.get("output_tokens", 0)
+            cached_prompt_tokens = (message.usage_metadata.get("input_token_details") or {}).get("cache_read") or 0
+        elif token_usage := llm_output.get("token_usage"):
+            prompt_tokens = token_usage.get("prompt_tokens", 0)
+            completion_tokens = token_usage.get("completion_tokens", 0)
+            cached_prompt_tokens = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+
+        self.tracker.record(
+            model=llm_output.get("model_name") or metadata.get("ls_model_name"),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency_s=time.perf_counter() - start,
+            thread_id=metadata.get("thread_id"),
+            node=metadata.get("langgraph_node"),
+            cached_prompt_tokens=cached_prompt_tokens
+        )
+
+usage_callback = UsageCallbackHandler(usage_tracker)
+
+def current_graph_context() -> tuple:
+    """(thread_id, node) of the LangGraph run we're executing in, if any."""
+    try:
+        from langgraph.config import get_config
+        config = get_config()
+    except (ImportError, RuntimeError):
+        return None, None
+    metadata = config.get("metadata", {})
+    thread_id = config.get("configurable", {}).get("thread_id", metadata.get("thread_id"))
+    return thread_id, metadata.get("langgraph_node")
+
+def create_chat_completion(**kwargs):
+    """`openai.chat.completions.create` that records usage for raw OpenAI SDK calls."""
+    start = time.perf_counter()
+    response = openai.chat.completions.create(**kwargs)
+    latency_s = time.perf_counter() - start
+
+    thread_id, node = current_graph_context()
+    usage = response.usage
+    usage_tracker.record(
+        model=response.model or kwargs.get("model"),
+        prompt_tokens=usage.prompt_tokens if usage else 0,
+        completion_tokens=usage.completion_tokens if usage else 0,
+        latency_s=latency_s,
+        thread_id=thread_id,
+        node=node,
+        cached_prompt_tokens=(usage.prompt_tokens_details.cached_tokens or 0) if usage and usage.prompt_tokens_details else 0
+    )
+    return response
@@ -3,26 +3,29 @@ import requests
 from customer_support.urgent_booking_changes.v1.state import AgentState
 hosted_url = "http://localhost:8000"
 
+## Nodes return only the keys they change; LangGraph merges the delta into the state.
+
 # ---- Node 1: Parse User Input ----
-def parse_input(state: AgentState) -> AgentState:
+def parse_input(state: AgentState) -> dict:
   """Extract booking ID/intent from natural language."""
   text = state["user_input"].lower()
-  state["intent"] = "cancel_booking" if "cancel" in text else "unknown"
-  state["booking_id"] = "BOOKING123" # Mock extraction (use LLM in production)
-  return state
+  return {
+    "intent": "cancel_booking" if "cancel" in text else "unknown",
+    "booking_id": "BOOKING123" # Mock extraction (use LLM in production)
+  }
 
 # ---- Node 2: Authenticate ----
-def authenticate(state: AgentState) -> AgentState:
+def authenticate(state: AgentState) -> dict:
   """Validate API key against mock system."""
   if state.get("api_key") != "SECRET_KEY_123":
-    state["error"] = "Invalid API key"
-  return state
+    return {"error": "Invalid API key"}
+  return {}
 
 # ---- Node 3: Fetch Booking Details ----
-def fetch_booking(state: AgentState) -> AgentState:
+def fetch_booking(state: AgentState) -> dict:
   """Call mock API to retrieve booking data."""
   if state.get("error"):
-    return state # Skip if auth failed
+    return {} # Skip if auth failed
   
   booking_id = state["booking_id"]
   response = requests.get(
@@ -30,21 +33,19 @@ def fetch_booking(state: AgentState) -> AgentState:
       headers={"api-key": state["api_key"]}
   )
   if response.status_code == 200:
-    state["booking_details"] = response.json()
-  else:
-    state["error"] = response.json()["detail"]
-  return state
+    return {"booking_details": response.json()}
+  return {"error": response.json()["detail"]}
 
 # ---- Node 4: Confirm Action ----
-def confirm_action(state: AgentState) -> AgentState:
+def confirm_action(state: AgentState) -> dict:
   """Seek user confirmation (mock UI interaction)."""
   if not state.get("error"):
     print(f"PROMPT: Cancel booking {state['booking_id']}? [yes/no]")
-    state["confirmation"] = True # Simulate user input "yes"
-  return state
+    return {"confirmation": True} # Simulate user input "yes"
+  return {}
 
 # ---- Node 5: Process Cancellation ----
-def process_cancellation(state: AgentState) -> AgentState:
+def process_cancellation(state: AgentState) -> dict:
   """Execute cancellation via mock API."""
   if state.get("confirmation") and not state.get("error"):
     response = requests.post(
@@ -52,12 +53,12 @@ def process_cancellation(state: AgentState) -> AgentState:
         headers={"api-key": state["api_key"]}
     )
     if response.status_code != 200:
-      state["error"] = "Cancellation failed"
-  return state
+      return {"error": "Cancellation failed"}
+  return {}
 
 # ---- Node 6: Error Handler ----
-def handle_error(state: AgentState) -> AgentState:
+def handle_error(state: AgentState) -> dict:
   """Route errors to escalation or retry."""
   if state.get("error"):
     print(f"ERROR: {state['error']} - Escalating to human agent.")
-  return state
\ No newline at end of file
+  return {}
@@ -0,0 +1,124 @@
+"""
+Ranking of rebooking alternatives.
+
+Candidates are every departure in a window around the wanted date on the booked route, on the other
+routes from the same origin and in the other cabins, gathered from the inventory as flat NumPy columns.
+Scoring is one vectorized pass over those columns, so the cost grows with array length rather than
+Python-level work per option:
+
+    cost = price weight x fare difference + delay weight x days moved + route/cabin change penalty
+           + a penalty for departures too close to today to rebook safely
+
+Loyalty tier shifts the weights: higher tiers care more about the date and less about price, and get a
+discount on upgrades. Infeasible candidates (too few seats, already departed, the sold-out original) get
+an infinite cost, and the top N come out of an `argpartition`.
+"""
+import zlib
+from datetime import date, timedelta
+
+import numpy as np
+
+from customer_support.urgent_booking_changes.v2.inventory import DEFAULT_CABIN
+
+DATE, DESTINATION, CLASS = "date", "destination", "class"
+KINDS = (DATE, DESTINATION, CLASS)
+
+## Mock fares: a base per cabin, scaled per route and by demand (fewer seats left, fewer days out)
+BASE_FARES = {DEFAULT_CABIN: 450.0, "Business": 2400.0}
+CABIN_CAPACITY = {DEFAULT_CABIN: 180, "Business": 30}
+
+PRICE_WEIGHT = 1 / 100 # cost per $100 of fare difference
+DELAY_WEIGHT = 1.0 # cost per day moved
+ROUTE_CHANGE_COST = 6.0
+CABIN_CHANGE_COST = 2.0
+MIN_LEAD_DAYS = 2 # departures sooner than this are hard to rebook onto
+SHORT_LEAD_COST = 3.0
+LOYALTY_UPGRADE_DISCOUNT = 0.1 # per tier, on the fare difference of a cabin upgrade
+
+def route_factor(route: str) -> float:
+    """Stable per-route fare multiplier in [0.7, 1.3)."""
+    return 0.7 + (zlib.crc32(route.encode()) % 600) / 1000
+
+def fares(route: str, cabin: str, days: np.ndarray, seats: np.ndarray, today: int) -> np.ndarray:
+    capacity = CABIN_CAPACITY.get(cabin, 180)
+    load = 1 - np.minimum(seats, capacity) / capacity
+    soon = (days - today) < 14
+    return BASE_FARES.get(cabin, BASE_FARES[DEFAULT_CABIN]) * route_factor(route) * (1 + 0.8 * load) * (1 + 0.5 * soon)
+
+def gather_candidates(inventory, route: str, cabin: str, wanted: date, today: date, window_days: int = 30) -> dict:
+    """Columns for every departure within `window_days` of `wanted` on the route's alternatives."""
+    first, last = max(wanted - timedelta(days=window_days), today), wanted + timedelta(days=window_days)
+    options = [(other, cabin) for other in inventory.routes_from(route.split("-")[0])]
+    options += [(route, other) for other in BASE_FARES if other != cabin and inventory.has_route(route, other)]
+
+    columns = {"route": [], "cabin": [], "day": [], "seats": [], "fare": []}
+    routes, cabins = [], []
+    for other_route, other_cabin in options:
+        days, seats = inventory.window(other_route, first, last, other_cabin)
+        if not days:
+            continue
+        days = np.frombuffer(days, dtype=np.dtype("l")) # views over the array copies
+        seats = np.frombuffer(seats, dtype=np.dtype("l"))
+        columns["route"].append(np.full(len(days), len(routes), dtype=np.int32))
+        columns["cabin"].append(np.full(len(days), len(cabins), dtype=np.int32))
+        columns["day"].append(days)
+        columns["seats"].append(seats)
+        columns["fare"].append(fares(other_route, other_cabin, days, seats, today.toordinal()))
+        routes.append(other_route)
+        cabins.append(other_cabin)
+
+    if not routes:
+        return {"routes": [], "cabins": [], **{key: np.empty(0) for key in columns}}
+    return {"routes": routes, "cabins": cabins, **{key: np.concatenate(values) for key, values in columns.items()}}
+
+def score_candidates(candidates: dict, route: str, cabin: str, wanted: date, today: date, seats: int, current_fare: float, loyalty_tier: int = 0) -> tuple:
+    """(cost per candidate, lower is better and inf = not bookable; fare difference after loyalty discounts)."""
+    route_changed = np.array([other != route for other in candidates["routes"]])[candidates["route"]]
+    upgraded = np.array([other != cabin for other in candidates["cabins"]])[candidates["cabin"]]
+    days = candidates["day"]
+    lead = days - today.toordinal()
+    delay = np.abs(days - wanted.toordinal())
+
+    price_diff = candidates["fare"] - current_fare
+    price_diff = np.where(upgraded, price_diff * max(0.0, 1 - LOYALTY_UPGRADE_DISCOUNT * loyalty_tier), price_diff)
+    cost = (
+        PRICE_WEIGHT / (1 + 0.5 * loyalty_tier) * price_diff
+        + DELAY_WEIGHT * (1 + 0.25 * loyalty_tier) * delay
+        + ROUTE_CHANGE_COST * route_changed
+        + CABIN_CHANGE_COST * upgraded
+        + SHORT_LEAD_COST * (lead < MIN_LEAD_DAYS)
+    )
+    infeasible = (candidates["seats"] < seats) | (lead < 0) | ((delay == 0) & ~route_changed & ~upgraded)
+    return np.where(infeasible, np.inf, cost), price_diff
+
+def top_n(cost: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the `n` cheapest finite costs, cheapest first."""
+    n = min(n, int(np.isfinite(cost).sum()))
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+    best = np.argpartition(cost, n - 1)[:n]
+    return best[np.argsort(cost[best], kind="stable")]
+
+def rank_alternatives(inventory, route: str, cabin: str, wanted: date, booked: date, seats: int = 1, loyalty_tier: int = 0, n: int = 5, today: date = None, window_days: int = 30) -> list:
+    """The top `n` alternatives as dicts: kind, route, cabin, date, price_diff, score."""
+    today = today or date.today()
+    candidates = gather_candidates(inventory, route, cabin, wanted, today, window_days)
+    if not candidates["routes"]:
+        return []
+    booked_day = np.array([(booked or wanted).toordinal()])
+    current_fare = float(fares(route, cabin, booked_day, np.array([inventory.seats_left(route, booked or wanted, cabin)]), today.toordinal())[0])
+    cost, price_diff = score_candidates(candidates, route, cabin, wanted, today, seats, current_fare, loyalty_tier)
+
+    ranked = []
+    for index in top_n(cost, n):
+        other_route = candidates["routes"][candidates["route"][index]]
+        other_cabin = candidates["cabins"][candidates["cabin"][index]]
+        ranked.append({
+            "kind": DESTINATION if other_route != route else CLASS if other_cabin != cabin else DATE,
+            "route": other_route,
+            "cabin": other_cabin,
+            "date": date.fromordinal(int(candidates["day"][index])).isoformat(),
+            "price_diff": round(float(price_diff[index])),
+            "score": round(float(cost[index]), 2)
+        })
+    return ranked
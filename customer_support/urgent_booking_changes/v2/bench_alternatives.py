@@ -0,0 +1,82 @@
+"""
+Benchmark alternative ranking as the candidate set grows: the vectorized scorer (score_candidates +
+top_n) against the same formula evaluated per candidate in Python and sorted, then end to end
+(rank_alternatives, inventory reads included) for an origin with many routes.
+
+Run: python -m customer_support.urgent_booking_changes.v2.bench_alternatives [--sizes 100 1000 10000 100000]
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from customer_support.urgent_booking_changes.v2 import alternatives as alt
+from customer_support.urgent_booking_changes.v2.alternatives import rank_alternatives, score_candidates, top_n
+from customer_support.urgent_booking_changes.v2.inventory import DEFAULT_CABIN, mock_inventory
+
+TODAY = date(2025, 1, 1)
+WANTED = TODAY + timedelta(days=20)
+
+def synthetic_candidates(size: int, rng: np.random.Generator) -> dict:
+    routes = [f"NYC-{i:03d}" for i in range(50)]
+    return {
+        "routes": routes,
+        "cabins": [DEFAULT_CABIN, "Business"],
+        "route": rng.integers(0, len(routes), size).astype(np.int32),
+        "cabin": rng.integers(0, 2, size).astype(np.int32),
+        "day": WANTED.toordinal() + rng.integers(-30, 31, size),
+        "seats": rng.integers(0, 180, size),
+        "fare": rng.uniform(300, 3000, size)
+    }
+
+def python_ranking(candidates: dict, route: str, cabin: str, seats: int, current_fare: float, loyalty_tier: int, n: int) -> list:
+    """The same cost, one candidate at a time."""
+    today, wanted = TODAY.toordinal(), WANTED.toordinal()
+    scored = []
+    for index in range(len(candidates["day"])):
+        route_changed = candidates["routes"][candidates["route"][index]] != route
+        upgraded = candidates["cabins"][candidates["cabin"][index]] != cabin
+        day = int(candidates["day"][index])
+        lead, delay = day - today, abs(day - wanted)
+        if candidates["seats"][index] < seats or lead < 0 or (delay == 0 and not route_changed and not upgraded):
+            continue
+        price_diff = float(candidates["fare"][index]) - current_fare
+        if upgraded:
+            price_diff *= max(0.0, 1 - alt.LOYALTY_UPGRADE_DISCOUNT * loyalty_tier)
+        cost = (alt.PRICE_WEIGHT / (1 + 0.5 * loyalty_tier) * price_diff + alt.DELAY_WEIGHT * (1 + 0.25 * loyalty_tier) * delay
+                + alt.ROUTE_CHANGE_COST * route_changed + alt.CABIN_CHANGE_COST * upgraded + alt.SHORT_LEAD_COST * (lead < alt.MIN_LEAD_DAYS))
+        scored.append((cost, index))
+    return [index for _, index in sorted(scored)[:n]]
+
+def timed(fn, repeat: int) -> float:
+    """Milliseconds per call (best of `repeat`)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--routes", type=int, default=200, help="routes from one origin for the end-to-end run")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'candidates':>12}{'vectorized ms':>15}{'python ms':>12}{'speedup':>10}")
+    for size in args.sizes:
+        candidates = synthetic_candidates(size, rng)
+        vectorized = lambda: top_n(score_candidates(candidates, "NYC-000", DEFAULT_CABIN, WANTED, TODAY, 2, 900.0, 2)[0], 5)
+        python = lambda: python_ranking(candidates, "NYC-000", DEFAULT_CABIN, 2, 900.0, 2, 5)
+        assert list(vectorized()) == python(), "rankings differ"
+        vectorized_ms, python_ms = timed(vectorized, 5), timed(python, 1 if size > 10_000 else 3)
+        print(f"{size:>12,}{vectorized_ms:>15.3f}{python_ms:>12.2f}{python_ms / vectorized_ms:>10.0f}x")
+
+    inventory = mock_inventory([f"NYC-{i:03d}" for i in range(args.routes)], TODAY, 120, cabins={DEFAULT_CABIN: 180, "Business": 30})
+    end_to_end = timed(lambda: rank_alternatives(inventory, "NYC-000", DEFAULT_CABIN, WANTED, WANTED, seats=2, loyalty_tier=2, today=TODAY), 5)
+    print(f"\nrank_alternatives from an origin with {args.routes} routes (inventory reads included): {end_to_end:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark the seat inventory at airline scale: availability, nearest-available-date and hold/release
+latency per call, against a linear scan over per-route flight lists (what a list-of-dicts store does).
+
+Defaults model a mid-size carrier: 2,000 routes x 2 cabins x 365 daily departures (~1.5M flights).
+
+Run: python -m customer_support.urgent_booking_changes.v2.bench_inventory [--routes 2000] [--days 365]
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from customer_support.urgent_booking_changes.v2.inventory import mock_inventory
+
+START = date(2025, 1, 1)
+
+def timed(fn, queries: list) -> float:
+    """Microseconds per call."""
+    start = time.perf_counter()
+    for query in queries:
+        fn(*query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--routes", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--queries", type=int, default=100_000)
+    args = parser.parse_args()
+
+    routes = [f"R{i:05d}" for i in range(args.routes)]
+    start = time.perf_counter()
+    inventory = mock_inventory(routes, START, args.days, cabins={"Economy": 180, "Business": 30})
+    print(f"loaded {inventory.snapshot()['departures']:,} departures in {time.perf_counter() - start:.1f}s")
+
+    # Baseline: per-route list of {"date", "seats"} scanned front to back
+    flights = {
+        route: [{"date": date.fromordinal(day), "seats": seats} for day, seats in zip(table.days, table.seats)]
+        for (route, cabin), table in inventory.routes.items() if cabin == "Economy"
+    }
+
+    def scan_available(route, day, seats):
+        return any(flight["date"] == day and flight["seats"] >= seats for flight in flights[route])
+
+    def scan_nearest(route, day, seats):
+        candidates = [flight["date"] for flight in flights[route] if flight["date"] != day and flight["seats"] >= seats and abs((flight["date"] - day).days) <= 30]
+        return sorted(candidates, key=lambda other: (abs((other - day).days), other))[:2]
+
+    def hold_release(route, day, seats):
+        try:
+            inventory.release(inventory.hold(route, day, seats))
+        except ValueError:
+            pass
+
+    rng = random.Random(1)
+    queries = [(rng.choice(routes), START + timedelta(days=rng.randrange(args.days)), rng.randint(1, 4)) for _ in range(args.queries)]
+    baseline = queries[:max(1, args.queries // 100)] # the scan is too slow for the full set
+
+    print(f"{'operation':<24}{'indexed us/call':>16}{'linear scan us/call':>22}")
+    print(f"{'is_available':<24}{timed(inventory.is_available, queries):>16.2f}{timed(scan_available, baseline):>22.1f}")
+    print(f"{'nearest_available':<24}{timed(inventory.nearest_available, queries):>16.2f}{timed(scan_nearest, baseline):>22.1f}")
+    print(f"{'hold + release':<24}{timed(hold_release, queries):>16.2f}{'-':>22}")
+
+if __name__ == "__main__":
+    main()
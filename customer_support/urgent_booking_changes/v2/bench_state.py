@@ -0,0 +1,80 @@
+"""
+Benchmark per-step state merge/serialization cost on the reschedule/alternatives loop.
+
+"before" replays the loop with nodes returning the whole AgentState (the old behaviour),
+"after" with the delta-returning nodes. Each step merges the node output into the state
+and serializes it the way the checkpointer stores channel writes.
+
+Run: python -m customer_support.urgent_booking_changes.v2.bench_state
+"""
+import contextlib
+import io
+import time
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from customer_support.urgent_booking_changes.v2.nodes import check_availability, suggest_alternatives, handle_alternative_choice
+
+LOOP = [check_availability, suggest_alternatives, handle_alternative_choice]
+ITERATIONS = 2000
+
+serde = JsonPlusSerializer()
+
+def initial_state() -> dict:
+    return {
+        "user_input": "Please move my flight BOOKING123 to the 25th",
+        "api_key": "SECRET_KEY_123",
+        "intent": "reschedule_booking",
+        "booking_id": "BOOKING123",
+        "new_date": "2024-10-25",
+        "booking_details": {
+            "user_id": "USER456",
+            "status": "confirmed",
+            "flight": "NYC-LON 2024-10-20",
+            "date": "2024-10-20",
+            "passengers": [{"name": f"Passenger {i}", "seat": f"{i}A"} for i in range(4)]
+        }
+    }
+
+def full_state(node):
+    """Emulate the old nodes, which returned a copy of the entire state."""
+    def wrapper(state: dict) -> dict:
+        return {**state, **node(state)}
+    return wrapper
+
+def run(nodes) -> dict:
+    state = initial_state()
+    merge_time = serialize_time = 0.0
+    written = steps = 0
+
+    for _ in range(ITERATIONS):
+        for node in nodes:
+            update = node(state)
+
+            start = time.perf_counter()
+            for key, value in update.items():
+                state[key] = value
+            merge_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            for key, value in update.items():
+                written += len(serde.dumps_typed(value)[1])
+            serialize_time += time.perf_counter() - start
+
+            steps += 1
+
+    return {
+        "merge_us": merge_time / steps * 1e6,
+        "serialize_us": serialize_time / steps * 1e6,
+        "bytes": written / steps
+    }
+
+if __name__ == "__main__":
+    # suggest_alternatives prints the suggestions on every call
+    with contextlib.redirect_stdout(io.StringIO()):
+        before = run([full_state(node) for node in LOOP])
+        after = run(LOOP)
+
+    print(f"{'':8}{'merge (us/step)':>18}{'serialize (us/step)':>22}{'bytes/step':>14}")
+    for label, result in (("before", before), ("after", after)):
+        print(f"{label:8}{result['merge_us']:>18.2f}{result['serialize_us']:>22.2f}{result['bytes']:>14.0f}")
@@ -0,0 +1,98 @@
+"""
+Load test for the escalation ticket queue at 100k open tickets.
+
+Bulk-ingests the backlog, then measures per-call latency (p50/p99) of single intake, live ETA lookups
+and agent claim + ack with the queue at full depth, and checks that claims come out in
+(priority, SLA deadline) order. --http runs the same calls through the mock server's endpoints with
+FastAPI's TestClient (needs the mock server importable, i.e. ngrok configured).
+
+Run: python -m customer_support.urgent_booking_changes.v2.bench_tickets [--open 100000] [--agents 50] [--http]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from customer_support.urgent_booking_changes.v2.tickets import TicketQueue
+
+def percentiles(samples: list) -> str:
+    samples = sorted(samples)
+    return f"p50 {statistics.median(samples) * 1e6:8.1f} us   p99 {samples[int(len(samples) * 0.99)] * 1e6:8.1f} us"
+
+def timed_calls(fn, count: int) -> list:
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def ticket(rng: random.Random, i: int) -> tuple:
+    return {"booking_id": f"BOOKING{i}", "escalation_reason": "complex_case"}, rng.choices([1, 2, 3], weights=[1, 3, 6])[0]
+
+def run_direct(args):
+    rng = random.Random(0)
+    queue = TicketQueue()
+    now = time.time()
+
+    # Arrivals spread over the last two hours, so deadlines interleave across priorities
+    start = time.perf_counter()
+    for batch in range(0, args.open, args.batch):
+        items = [ticket(rng, i) for i in range(batch, min(batch + args.batch, args.open))]
+        queue.create_many(items, now=now - 7200 + 7200 * batch / args.open)
+    print(f"bulk intake   {args.open:,} tickets in {time.perf_counter() - start:.2f}s ({args.open / (time.perf_counter() - start):,.0f}/s)")
+
+    created = []
+    print(f"create        {percentiles(timed_calls(lambda i: created.append(queue.create(*ticket(rng, i))), args.calls))}")
+    print(f"eta lookup    {percentiles(timed_calls(lambda i: queue.eta_minutes(rng.choice(created)), args.calls))}")
+
+    agents = [f"agent-{i}" for i in range(args.agents)]
+    order = []
+    def claim_and_ack(i):
+        agent = agents[i % len(agents)]
+        found = queue.claim(agent)
+        order.append((found.priority, found.deadline))
+        queue.ack(found.id, agent, now=found.claimed_at + rng.uniform(300, 900)) # 5-15 minutes of handling
+    print(f"claim + ack   {percentiles(timed_calls(claim_and_ack, args.calls))}")
+    assert order == sorted(order), "claims out of (priority, deadline) order"
+
+    snapshot = queue.snapshot()
+    print(f"open after    {sum(snapshot['open'].values()):,} by priority {snapshot['open']}, {snapshot['active_agents']} agents, "
+          f"new priority-3 ETA {queue.eta_minutes(priority=3)} min")
+
+def run_http(args):
+    from fastapi.testclient import TestClient
+    from customer_support.urgent_booking_changes.v2.mock_server import app
+
+    rng = random.Random(0)
+    client = TestClient(app)
+    headers = {"api-key": "SECRET_KEY_123"}
+    start = time.perf_counter()
+    for batch in range(0, args.open, args.batch):
+        items = [{**data, "priority": priority} for data, priority in (ticket(rng, i) for i in range(batch, min(batch + args.batch, args.open)))]
+        client.post("/tickets/bulk", json=items, headers=headers).raise_for_status()
+    print(f"POST /tickets/bulk  {args.open:,} tickets in {time.perf_counter() - start:.2f}s")
+
+    ids = []
+    def create(i):
+        data, priority = ticket(rng, i)
+        ids.append(client.post("/tickets", json={**data, "priority": priority}, headers=headers).json()["ticket_id"])
+    print(f"POST /tickets       {percentiles(timed_calls(create, args.calls))}")
+    print(f"GET /tickets/{{id}}   {percentiles(timed_calls(lambda i: client.get(f'/tickets/{rng.choice(ids)}', headers=headers), args.calls))}")
+
+    def claim_and_ack(i):
+        agent = f"agent-{i % args.agents}"
+        found = client.post("/tickets/claim", params={"agent_id": agent}, headers=headers).json()
+        client.post(f"/tickets/{found['ticket_id']}/ack", params={"agent_id": agent}, headers=headers).raise_for_status()
+    print(f"claim + ack         {percentiles(timed_calls(claim_and_ack, args.calls))}")
+    print(client.get("/tickets/stats").json())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--open", type=int, default=100_000, help="open tickets to load")
+    parser.add_argument("--batch", type=int, default=1000, help="tickets per bulk request")
+    parser.add_argument("--calls", type=int, default=5000, help="timed calls per operation")
+    parser.add_argument("--agents", type=int, default=50)
+    parser.add_argument("--http", action="store_true", help="go through the mock server's endpoints")
+    args = parser.parse_args()
+    run_http(args) if args.http else run_direct(args)
@@ -1,5 +1,8 @@
+import os
+
 from langgraph.graph import StateGraph, END
-from customer_support.urgent_booking_changes.v1.state import AgentState
+from customer_support.urgent_booking_changes.v2.state import AgentState, checked
+from common.tracing import Tracer
 from customer_support.urgent_booking_changes.v1.graph import PARSE_INPUT, AUTHENTICATE, FETCH_BOOKING, CONFIRM_ACTION, PROCESS_CANCELLATION, ERROR_HANDLER
 from customer_support.urgent_booking_changes.v1.nodes import parse_input, authenticate, fetch_booking, confirm_action, process_cancellation, handle_error
 from customer_support.urgent_booking_changes.v2.nodes import llm_parse_input, check_availability, process_rescheduling, suggest_alternatives, handle_alternative_choice, route_alternative_selection, general_enquiry_handler, escalate_to_human
@@ -20,20 +23,27 @@ ROUTE_AVAILABILITY = "route_availability"
 CONFIRM_RESCHEDULE = "confirm_reschedule"
 ROUTE_ALTERNATIVE_SELECTION = "route_alternative_selection"
 
+# Intents produced by the parsers
+CANCEL_BOOKING = "cancel_booking"
+
 def route_intent(state: AgentState) -> str:
     """Conditional edge: Route based on intent."""
     if state.get("error"):
         return ERROR_HANDLER
     intent = state.get("intent")
-    if intent == PROCESS_CANCELLATION:
-        return PROCESS_CANCELLATION
-    elif intent == RESCHEDULE_BOOKING:
-        return CHECK_AVAILABILITY
+    if intent in (CANCEL_BOOKING, RESCHEDULE_BOOKING):
+        return FETCH_BOOKING # both need the booking's flight, date and passengers
     else:
         return GENERAL_ENQUIRY_HANDLER
 
+def route_booking(state: AgentState) -> str:
+    """Conditional edge: after fetching the booking, cancel or check seats for the new date."""
+    if state.get("intent") != RESCHEDULE_BOOKING:
+        return CONFIRM_ACTION
+    return ERROR_HANDLER if state.get("error") else CHECK_AVAILABILITY
+
 def route_availability(state: AgentState) -> str:
-    return PROCESS_RESCHEDULING if state["is_available"] else SUGGEST_ALTERNATIVES
+    return CONFIRM_RESCHEDULE if state["is_available"] else SUGGEST_ALTERNATIVES
 
 nodes = {
     # Core Flow
@@ -60,7 +70,19 @@ nodes = {
     GENERAL_ENQUIRY_HANDLER: general_enquiry_handler
 }
 
+## Opt-in node tracing: set TRACE_BOOKING_AGENT=1 to record a span per node and write each run to TRACE_DIR
+## as Chrome-trace JSON (or OTLP JSON with TRACE_FORMAT=otlp).
+tracer = Tracer(
+    enabled=os.getenv("TRACE_BOOKING_AGENT") == "1",
+    trace_dir=os.getenv("TRACE_DIR", "traces"),
+    trace_format=os.getenv("TRACE_FORMAT", "chrome")
+)
+
+## Every node returns a delta; `checked` rejects keys outside the AgentState schema.
 for name, node in nodes.items():
+    node = checked(node)
+    if tracer.enabled:
+        node = tracer.wrap(name, node)
     builder.add_node(name, node)
 
 # Core Flow
@@ -73,14 +95,21 @@ builder.add_conditional_edges(
     route_intent,
     {
         FETCH_BOOKING: FETCH_BOOKING,
-        CHECK_AVAILABILITY: CHECK_AVAILABILITY,
         GENERAL_ENQUIRY_HANDLER: GENERAL_ENQUIRY_HANDLER,
         ERROR_HANDLER: ERROR_HANDLER
     }
 )
+builder.add_conditional_edges(
+    FETCH_BOOKING,
+    route_booking,
+    {
+        CONFIRM_ACTION: CONFIRM_ACTION,
+        CHECK_AVAILABILITY: CHECK_AVAILABILITY,
+        ERROR_HANDLER: ERROR_HANDLER
+    }
+)
 
 # Cancellation Path
-builder.add_edge(FETCH_BOOKING, CONFIRM_ACTION)
 builder.add_edge(CONFIRM_ACTION, PROCESS_CANCELLATION)
 builder.add_edge(PROCESS_CANCELLATION, ERROR_HANDLER)
 
@@ -112,4 +141,7 @@ builder.add_edge(GENERAL_ENQUIRY_HANDLER, END)
 builder.add_edge(ESCALATE_TO_HUMAN, END)
 builder.add_edge(ERROR_HANDLER, END)
 
-agent = builder.compile()
\ No newline at end of file
+agent = builder.compile()
+
+if tracer.enabled:
+    agent = tracer.traced(agent, "booking_agent_v2")
\ No newline at end of file
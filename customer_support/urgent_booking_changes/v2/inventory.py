@@ -0,0 +1,205 @@
+"""
+Seat inventory for the v2 rescheduling path.
+
+Each (route, cabin) keeps two parallel arrays: departure dates as sorted day ordinals and seats left on
+each. Lookups bisect the date array, so availability is O(log n) per query and the nearest-date search
+walks outward from the bisect point. Holds take seats out of the arrays right away and give them back on
+`release` or when they expire (checked lazily on every call), so two conversations can't both be told
+the last seat is theirs.
+"""
+import bisect
+import heapq
+import random
+import threading
+import time
+import uuid
+from array import array
+from datetime import date, timedelta
+
+DEFAULT_CABIN = "Economy"
+
+class NotAvailable(ValueError):
+    """Raised when a hold asks for more seats than the flight has left."""
+
+class Hold:
+    def __init__(self, hold_id: str, route: str, cabin: str, day: int, seats: int, expires_at: float):
+        self.id = hold_id
+        self.route = route
+        self.cabin = cabin
+        self.day = day
+        self.seats = seats
+        self.expires_at = expires_at
+
+class RouteInventory:
+    """Sorted departure days (date ordinals) and the seats left on each."""
+
+    def __init__(self):
+        self.days = array("l")
+        self.seats = array("l")
+
+    def add(self, day: int, seats: int):
+        index = bisect.bisect_left(self.days, day)
+        if index < len(self.days) and self.days[index] == day:
+            self.seats[index] = seats
+        else:
+            self.days.insert(index, day)
+            self.seats.insert(index, seats)
+
+    def index(self, day: int) -> int:
+        """Position of `day`, or -1 when there's no departure that day."""
+        index = bisect.bisect_left(self.days, day)
+        return index if index < len(self.days) and self.days[index] == day else -1
+
+    def seats_left(self, day: int) -> int:
+        index = self.index(day)
+        return self.seats[index] if index >= 0 else 0
+
+    def nearest(self, day: int, seats: int, limit: int, max_days: int) -> list:
+        """Up to `limit` departure days other than `day` with `seats` free, closest first (earlier wins ties)."""
+        days, free = self.days, self.seats
+        lo, hi = bisect.bisect_left(days, day) - 1, bisect.bisect_right(days, day)
+        found = []
+        while len(found) < limit:
+            before = day - days[lo] if lo >= 0 else None
+            after = days[hi] - day if hi < len(days) else None
+            if before is None and after is None:
+                break
+            if after is None or (before is not None and before <= after):
+                if before > max_days:
+                    break
+                if free[lo] >= seats:
+                    found.append(days[lo])
+                lo -= 1
+            else:
+                if after > max_days:
+                    break
+                if free[hi] >= seats:
+                    found.append(days[hi])
+                hi += 1
+        return found
+
+class Inventory:
+
+    def __init__(self, hold_ttl_seconds: float = 600):
+        self.hold_ttl_seconds = hold_ttl_seconds
+        self.lock = threading.Lock()
+        self.routes = {} # (route, cabin) -> RouteInventory
+        self.origins = {} # origin -> routes leaving it, e.g. "NYC" -> {"NYC-LON", "NYC-PAR"}
+        self.holds = {} # hold_id -> Hold
+        self.expiries = [] # heap of (expires_at, hold_id)
+        self.stats = {"queries": 0, "holds": 0, "released": 0, "expired": 0, "confirmed": 0, "rejected": 0}
+
+    def add_flights(self, route: str, departures: dict, cabin: str = DEFAULT_CABIN):
+        """Load {date: seats} for a route; replaces the seat count of dates already loaded."""
+        with self.lock:
+            inventory = self.routes.setdefault((route, cabin), RouteInventory())
+            self.origins.setdefault(route.split("-")[0], set()).add(route)
+            for day, seats in departures.items():
+                inventory.add(day.toordinal(), seats)
+
+    def has_route(self, route: str, cabin: str = DEFAULT_CABIN) -> bool:
+        return (route, cabin) in self.routes
+
+    def routes_from(self, origin: str) -> list:
+        return sorted(self.origins.get(origin, ()))
+
+    def window(self, route: str, first: date, last: date, cabin: str = DEFAULT_CABIN) -> tuple:
+        """(day ordinals, seats left) for departures from `first` to `last` inclusive, as array copies."""
+        with self.lock:
+            self._expire()
+            inventory = self.routes.get((route, cabin))
+            if inventory is None:
+                return array("l"), array("l")
+            lo = bisect.bisect_left(inventory.days, first.toordinal())
+            hi = bisect.bisect_right(inventory.days, last.toordinal())
+            return inventory.days[lo:hi], inventory.seats[lo:hi]
+
+    def seats_left(self, route: str, day: date, cabin: str = DEFAULT_CABIN) -> int:
+        with self.lock:
+            self._expire()
+            self.stats["queries"] += 1
+            inventory = self.routes.get((route, cabin))
+            return inventory.seats_left(day.toordinal()) if inventory else 0
+
+    def is_available(self, route: str, day: date, seats: int = 1, cabin: str = DEFAULT_CABIN) -> bool:
+        return self.seats_left(route, day, cabin) >= seats
+
+    def nearest_available(self, route: str, day: date, seats: int = 1, cabin: str = DEFAULT_CABIN, limit: int = 2, max_days: int = 30) -> list:
+        """Other departure dates within `max_days` of `day` with enough seats, closest first."""
+        with self.lock:
+            self._expire()
+            self.stats["queries"] += 1
+            inventory = self.routes.get((route, cabin))
+            found = inventory.nearest(day.toordinal(), seats, limit, max_days) if inventory else []
+        return [date.fromordinal(day) for day in found]
+
+    def hold(self, route: str, day: date, seats: int = 1, cabin: str = DEFAULT_CABIN) -> str:
+        """Take `seats` out of inventory until `confirm`, `release` or expiry; returns the hold id."""
+        with self.lock:
+            self._expire()
+            inventory = self.routes.get((route, cabin))
+            index = inventory.index(day.toordinal()) if inventory else -1
+            if index < 0 or inventory.seats[index] < seats:
+                self.stats["rejected"] += 1
+                raise NotAvailable(f"{route} {cabin} on {day.isoformat()} has fewer than {seats} seats left")
+            inventory.seats[index] -= seats
+            hold = Hold(uuid.uuid4().hex, route, cabin, day.toordinal(), seats, time.monotonic() + self.hold_ttl_seconds)
+            self.holds[hold.id] = hold
+            heapq.heappush(self.expiries, (hold.expires_at, hold.id))
+            self.stats["holds"] += 1
+            return hold.id
+
+    def release(self, hold_id: str) -> bool:
+        """Give the held seats back; False if the hold was already confirmed, released or expired."""
+        with self.lock:
+            self._expire()
+            hold = self.holds.pop(hold_id, None)
+            if hold is None:
+                return False
+            self._restore(hold)
+            self.stats["released"] += 1
+            return True
+
+    def confirm(self, hold_id: str) -> bool:
+        """Make the hold permanent (the seats are sold); False if it already expired."""
+        with self.lock:
+            self._expire()
+            if self.holds.pop(hold_id, None) is None:
+                return False
+            self.stats["confirmed"] += 1
+            return True
+
+    def _restore(self, hold: Hold):
+        inventory = self.routes[(hold.route, hold.cabin)]
+        inventory.seats[inventory.index(hold.day)] += hold.seats
+
+    def _expire(self):
+        now = time.monotonic()
+        while self.expiries and self.expiries[0][0] <= now:
+            _, hold_id = heapq.heappop(self.expiries)
+            hold = self.holds.pop(hold_id, None)
+            if hold is not None: # else confirmed or released already
+                self._restore(hold)
+                self.stats["expired"] += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "routes": len(self.routes),
+                "departures": sum(len(inventory.days) for inventory in self.routes.values()),
+                "active_holds": len(self.holds),
+                **self.stats
+            }
+
+def mock_inventory(routes: list, start: date, days: int, cabins: dict = None, sold_out_rate: float = 0.15, seed: int = 0) -> Inventory:
+    """A daily departure per route and cabin over `days`, with random load factors and some sold-out days."""
+    rng = random.Random(seed)
+    cabins = cabins or {DEFAULT_CABIN: 180}
+    inventory = Inventory()
+    for route in routes:
+        for cabin, capacity in cabins.items():
+            inventory.add_flights(route, {
+                start + timedelta(days=offset): 0 if rng.random() < sold_out_rate else rng.randint(1, capacity)
+                for offset in range(days)
+            }, cabin)
+    return inventory
@@ -1,5 +1,7 @@
-from fastapi import HTTPException, Header
+from fastapi import HTTPException, Header, Body, Response
 from customer_support.urgent_booking_changes.v1.mock_server import app, mock_bookings, AgentRequest
+from customer_support.urgent_booking_changes.v2.tickets import TicketQueue, TicketError, UnknownTicket
+from common.usage import usage_tracker
 
 @app.post("/bookings/{booking_id}/reschedule")
 def reschedule_booking(booking_id: str, new_date: str, api_key: str = Header(...)):
@@ -20,4 +22,64 @@ def agent_invoke(request: AgentRequest, api_key: str = Header(...)):
   from customer_support.urgent_booking_changes.v2.graph import agent
   result = agent.invoke(initial_state)
 
-  return {"message": str(result)}
\ No newline at end of file
+  return {"message": str(result)}
+
+@app.get("/usage")
+def usage():
+  return usage_tracker.snapshot()
+
+@app.get("/inventory")
+def inventory_stats():
+  from customer_support.urgent_booking_changes.v2.nodes import inventory
+  return inventory.snapshot()
+
+# --- Escalation tickets ---
+ticket_queue = TicketQueue()
+
+def _ticket_view(ticket) -> dict:
+  return {**ticket.to_dict(), "position": ticket_queue.ahead_of(ticket) if ticket.status == "open" else 0, "eta_minutes": ticket_queue.eta_minutes(ticket)}
+
+def _ticket_call(fn, *args):
+  try:
+    return fn(*args)
+  except UnknownTicket as e:
+    raise HTTPException(status_code=404, detail=str(e))
+  except TicketError as e:
+    raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/tickets", status_code=201)
+def create_ticket(ticket: dict = Body(...), api_key: str = Header(...)):
+  created = ticket_queue.create(ticket, ticket.get("priority", 3))
+  return _ticket_view(created)
+
+@app.post("/tickets/bulk", status_code=201)
+def create_tickets(tickets: list[dict] = Body(...), api_key: str = Header(...)):
+  created = ticket_queue.create_many([(ticket, ticket.get("priority", 3)) for ticket in tickets])
+  return {"count": len(created), "ticket_ids": [ticket.id for ticket in created]}
+
+@app.get("/tickets/stats")
+def ticket_stats():
+  return ticket_queue.snapshot()
+
+@app.post("/tickets/claim")
+def claim_ticket(agent_id: str, api_key: str = Header(...)):
+  ticket = ticket_queue.claim(agent_id)
+  if ticket is None:
+    return Response(status_code=204)
+  return ticket.to_dict()
+
+@app.get("/tickets/{ticket_id}")
+def get_ticket(ticket_id: str, api_key: str = Header(...)):
+  return _ticket_view(_ticket_call(ticket_queue.get, ticket_id))
+
+@app.post("/tickets/{ticket_id}/ack")
+def ack_ticket(ticket_id: str, agent_id: str, api_key: str = Header(...)):
+  return _ticket_call(ticket_queue.ack, ticket_id, agent_id).to_dict()
+
+@app.post("/tickets/{ticket_id}/release")
+def release_ticket(ticket_id: str, agent_id: str, api_key: str = Header(...)):
+  return _ticket_view(_ticket_call(ticket_queue.release, ticket_id, agent_id))
+
+@app.post("/tickets/{ticket_id}/cancel")
+def cancel_ticket(ticket_id: str, api_key: str = Header(...)):
+  return _ticket_call(ticket_queue.cancel, ticket_id).to_dict()
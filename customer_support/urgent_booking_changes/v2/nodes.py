@@ -3,17 +3,24 @@ from dotenv import load_dotenv
 import os
 import json
 import requests
-from customer_support.urgent_booking_changes.v1.state import AgentState
+from datetime import date
+from customer_support.urgent_booking_changes.v2.state import AgentState, bounded_entities
+from customer_support.urgent_booking_changes.v2.inventory import DEFAULT_CABIN, NotAvailable, mock_inventory
+from customer_support.urgent_booking_changes.v2.alternatives import DATE, DESTINATION, CLASS, rank_alternatives
+from customer_support.urgent_booking_changes.v2.tickets import SLA_MINUTES
 from customer_support.urgent_booking_changes.v1.nodes import hosted_url
+from common.usage import create_chat_completion
+from common.rate_limit import rate_limited_http_client
 
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_SECRET")
+openai.http_client = rate_limited_http_client()
 
-def llm_parse_input(state: AgentState) -> AgentState:
+def llm_parse_input(state: AgentState) -> dict:
     """Use  LLM to extract intent/entities."""
     user_input = state["user_input"]
 
-    response = openai.chat.completions.create(
+    response = create_chat_completion(
         model="gpt-3.5-turbo",
         messages=[
             {
@@ -33,17 +40,37 @@ Return JSON only.
     )
 
     parsed = json.loads(response.choices[0].message.content)
-    state.update(parsed)
-    return state
+    return bounded_entities(parsed)
+
+## Mock seat inventory: a daily departure per route from the mock bookings' dates until a year from now
+inventory = mock_inventory(
+    routes=["NYC-LON", "NYC-PAR", "NYC-AMS", "NYC-MAD", "NYC-ROM", "LON-PAR", "LON-AMS"],
+    start=date(2024, 10, 1),
+    days=(date.today() - date(2024, 10, 1)).days + 365,
+    cabins={DEFAULT_CABIN: 180, "Business": 30}
+)
+
+MAX_ALTERNATIVES = 5
 
 # Rescheduling nodes
-def check_availability(state: AgentState) -> AgentState:
-    """Mock flight/hotel availability check."""
-    state["is_available"] = True
-    return state
+def check_availability(state: AgentState) -> dict:
+    """Check seats on the requested date and hold them until the reschedule is confirmed."""
+    if state.get("hold_id"):
+        inventory.release(state["hold_id"]) # an earlier pass of the alternatives loop held another date
+
+    route, cabin, seats, _ = _requested_flight(state)
+    new_date = _parse_date(state.get("new_date"))
+    if route is None or new_date is None:
+        return {"is_available": False, "hold_id": None}
+    try:
+        hold_id = inventory.hold(route, new_date, seats, cabin)
+    except NotAvailable:
+        return {"is_available": False, "hold_id": None}
+    return {"is_available": True, "hold_id": hold_id}
 
-def process_rescheduling(state: AgentState) -> AgentState:
+def process_rescheduling(state: AgentState) -> dict:
     """Call reschedule API."""
+    hold_id = state.get("hold_id")
     if state.get("confirmation") and state["is_available"]:
         response = requests.post(
             f"{hosted_url}/bookings/{state['booking_id']}/reschedule",
@@ -51,75 +78,81 @@ def process_rescheduling(state: AgentState) -> AgentState:
             json={"new_date": state["new_date"]}
         )
         if response.status_code != 200:
-            state["error"] = "Rescheduling failed"
-    return state
-
-def suggest_alternatives(state: AgentState) -> AgentState:
+            if hold_id:
+                inventory.release(hold_id)
+            return {"error": "Rescheduling failed", "hold_id": None}
+        if hold_id:
+            inventory.confirm(hold_id)
+        return {"hold_id": None}
+    if hold_id:
+        inventory.release(hold_id)
+        return {"hold_id": None}
+    return {}
+
+def suggest_alternatives(state: AgentState) -> dict:
     """Propose alternative options when original request isn't feasible."""
-    booking_details = state.get("booking_details", {})
-
-    # Mock alternatives database/API call
-    state["alternatives"] = {
-        "date_options": [
-            booking_details.get("date", "") + " +2 days",
-            booking_details.get("date", "") + " +5 days"
-        ],
+    route, cabin, seats, booked_date = _requested_flight(state)
+    wanted = _parse_date(state.get("new_date")) or booked_date
+    ranked = []
+    if route is not None and wanted is not None:
+        loyalty_tier = (state.get("user_profile") or {}).get("loyalty_tier", 0)
+        ranked = rank_alternatives(inventory, route, cabin, wanted, booked_date, seats, loyalty_tier, n=MAX_ALTERNATIVES)
+
+    # Per-kind views of the ranking, best first
+    alternatives = {
+        "ranked": ranked,
+        "date_options": [option["date"] for option in ranked if option["kind"] == DATE],
         "destination_options": [
-            {"route": "NYC-LON -> NYC-PAR", "price_diff": -150},
-            {"route": "NYC-LON -> NYC-AMS", "price_diff": -75}
+            {"route": f"{route} -> {option['route']}", "date": option["date"], "price_diff": option["price_diff"]}
+            for option in ranked if option["kind"] == DESTINATION
         ],
-        "class_upgrade": {
-            "available": True,
-            "new_class": "Business",
-            "price_diff": +300
-        }
+        "class_upgrade": next((
+            {"available": True, "new_class": option["cabin"], "date": option["date"], "price_diff": option["price_diff"]}
+            for option in ranked if option["kind"] == CLASS
+        ), {"available": False})
     }
 
     # General natural language suggestions
     suggestions = [
-        "Alternative dates available:",
-        *state["alternatives"]["date_options"],
-        "\nAlternative destinations:",
-        *[f"{opt['route']} (${opt['price_diff']})" for opt in state["alternatives"]["destination_options"]],
-        "\nClass upgrade available: Business (+$300)"
+        f"{option['route']} {option['cabin']} on {option['date']} ({'+' if option['price_diff'] >= 0 else '-'}${abs(option['price_diff'])})"
+        for option in ranked
     ]
 
     # For production: Integrate with chat interface
-    print("\nSUGGESTIONS:\n" + "\n-".join(suggestions))
+    print("\nSUGGESTIONS:\n-" + "\n-".join(suggestions or ["No alternatives available"]))
 
-    # Simulate user choice (mock - would by UI input in production)
-    state["selected_alternative"] = "date" # Can be 'date', 'destination', 'class', or None
+    # Simulate user choice (mock - would by UI input in production): the best-ranked option
+    selected_alternative = ranked[0]["kind"] if ranked else None # Can be 'date', 'destination', 'class', or None
 
-    return state
+    return {"alternatives": alternatives, "selected_alternative": selected_alternative}
 
 # Modified conditional edges
 def route_alternative_selection(state: AgentState) -> str:
-    from customer_support.urgent_booking_changes.v2.graph import PROCESS_RESCHEDULING, ESCALATE_TO_HUMAN
+    from customer_support.urgent_booking_changes.v2.graph import HANDLE_ALTERNATIVE_CHOICE, ESCALATE_TO_HUMAN
 
     if state.get("selected_alternative"):
-        return PROCESS_RESCHEDULING
+        return HANDLE_ALTERNATIVE_CHOICE
     return ESCALATE_TO_HUMAN
 
-def handle_alternative_choice(state: AgentState) -> str:
-    """Process user's selected alternative"""
+def handle_alternative_choice(state: AgentState) -> dict:
+    """Process user's selected alternative: apply the best-ranked option of that kind"""
     selected = state["selected_alternative"]
-    alternatives = state["alternatives"]
-
-    if selected == "date":
-        state["new_date"] = alternatives["date_options"][0] # Take first alternative date
-    elif selected == "destination":
-        new_route = alternatives["destination_options"][0]["route"]
-        state["destination"] = new_route.split("-> ")[-1]
-    elif selected == "class":
-        state["booking_class"] = alternatives["class_upgrade"]["new_class"]
-    
-    return state
-
-def general_enquiry_handler(state: AgentState) -> AgentState:
+    option = next((option for option in state["alternatives"].get("ranked", []) if option["kind"] == selected), None)
+    if option is None:
+        return {}
+
+    update = {"new_date": option["date"]}
+    if selected == DESTINATION:
+        update["destination"] = option["route"]
+    elif selected == CLASS:
+        update["booking_class"] = option["cabin"]
+    return update
+
+def general_enquiry_handler(state: AgentState) -> dict:
     """Handle non-urgent general inquiries using knowledge base"""
     try:
         # Use LLM to generate response from knowledge base
-        response = openai.chat.completions.create(
+        response = create_chat_completion(
             model="gpt-3.5-turbo",
             messages=[
                 {
@@ -137,16 +170,36 @@ If unsure, direct user to help center.
             ]
         )
 
-        state["response"] = response.choices[0].message.content
-        state["sources"] = _find_knowledge_sources(state["user_input"])
+        return {
+            "response": response.choices[0].message.content,
+            "sources": _find_knowledge_sources(state["user_input"])
+        }
 
     except Exception as e:
-        state["error"] = f"Enquiry handling failed: {str(e)}"
-        state["response"] = DEFAULT_FALLBACK_RESPONSE
-    
-    return state
+        return {
+            "error": f"Enquiry handling failed: {str(e)}",
+            "response": DEFAULT_FALLBACK_RESPONSE
+        }
 
 # Helper functions
+def _parse_date(value) -> date:
+    """ISO date (the parser's format), or None for missing or free-form values."""
+    try:
+        return date.fromisoformat(str(value)[:10]) if value else None
+    except ValueError:
+        return None
+
+def _requested_flight(state) -> tuple:
+    """(route, cabin, seats, booked date) for the booking, with the destination/class the user switched to."""
+    booking_details = state.get("booking_details") or {}
+    route, _, booked = booking_details.get("flight", "").partition(" ")
+    cabin = state.get("booking_class") or DEFAULT_CABIN
+    if state.get("destination") and inventory.has_route(state["destination"], cabin):
+        route = state["destination"]
+    seats = len(booking_details.get("passengers") or []) or 1
+    booked_date = _parse_date(booking_details.get("date") or booked)
+    return (route if inventory.has_route(route, cabin) else None), cabin, seats, booked_date
+
 def _find_knowledge_sources(query: str) -> list:
     """Retrieve relevant knowledge base articles"""
     # Vector similarity search implementation
@@ -164,7 +217,7 @@ I'm unable to answer that precisely.
 Please visit our Help Center or contact support.
 """
 
-def escalate_to_human(state: AgentState) -> AgentState:
+def escalate_to_human(state: AgentState) -> dict:
     """Transfer complex cases to human agents with proper context packaging."""
     # Create escalation ticket
     ticket_data = {
@@ -188,15 +241,19 @@ def escalate_to_human(state: AgentState) -> AgentState:
         json=ticket_data
     )
 
+    update = {}
     if response.status_code == 201:
-        state["escalation_ticket_id"] = response.json()["ticket_id"]
-        state["human_eta"] = _calculate_sla_eta(state)
+        ticket = response.json()
+        update["escalation_ticket_id"] = ticket["ticket_id"]
+        update["priority"] = ticket_data["priority"]
+        # Live ETA from the ticket queue's depth; the SLA is the upper bound when the server doesn't say
+        update["human_eta"] = ticket.get("eta_minutes") or _calculate_sla_eta({**state, **update})
     else:
-        state["error"] = f"Escalation failed: {response.text}"
+        update["error"] = f"Escalation failed: {response.text}"
     
     # Generate human-readable message
-    state["response_message"] = _format_escalation_message(state)
-    return state
+    update["response_message"] = _format_escalation_message({**state, **update})
+    return update
 
 def _determine_escalation_reason(state) -> str:
     """Classify escalation reason for routing"""
@@ -254,10 +311,5 @@ def _get_user_profile(state):
     ).json()
 
 def _calculate_sla_eta(state) -> int:
-    """Calculate expected response time based on priority"""
-    sla_matrix = {
-        1: 15, # Urgent: Departure within 48h
-        2: 60, # High-value customer
-        3: 240 # Standard
-    }
-    return sla_matrix.get(state.get("priority", 3), 240)
\ No newline at end of file
+    """Calculate expected response time based on priority (the ticket queue's SLA)"""
+    return SLA_MINUTES.get(state.get("priority", 3), SLA_MINUTES[3])
\ No newline at end of file
@@ -0,0 +1,61 @@
+from typing import Optional
+
+from customer_support.urgent_booking_changes.v1.state import AgentState as BaseAgentState
+
+class AgentState(BaseAgentState, total=False):
+    # Entities extracted by the LLM parser
+    new_date: Optional[str]
+    destination: Optional[str]
+
+    # Rescheduling / alternatives loop
+    is_available: Optional[bool]
+    hold_id: Optional[str] # seats held on new_date until the reschedule is confirmed
+    alternatives: Optional[dict]
+    selected_alternative: Optional[str]
+    booking_class: Optional[str]
+
+    # General enquiry
+    response: Optional[str]
+    sources: Optional[list]
+
+    # Escalation
+    user_id: Optional[str]
+    priority: Optional[int]
+    escalation_ticket_id: Optional[str]
+    human_eta: Optional[int]
+    response_message: Optional[str]
+
+STATE_KEYS = frozenset(AgentState.__annotations__)
+
+## The LLM parser may only fill these keys, and each value is capped so a chatty model can't bloat the state.
+LLM_ENTITY_KEYS = ("intent", "booking_id", "new_date", "destination")
+MAX_ENTITY_LENGTH = 128
+
+class InvalidStateUpdate(ValueError):
+    """Raised when a node returns keys outside of the AgentState schema."""
+
+def validate_update(update: dict) -> dict:
+    """Reject state updates carrying keys the schema doesn't declare."""
+    unknown = set(update) - STATE_KEYS
+    if unknown:
+        raise InvalidStateUpdate(f"Unknown state keys: {sorted(unknown)}")
+    return update
+
+def checked(node):
+    """Wrap a node so every delta it returns is validated against the schema."""
+    def wrapper(state: AgentState) -> dict:
+        return validate_update(node(state) or {})
+
+    wrapper.__name__ = getattr(node, "__name__", "node")
+    wrapper.__doc__ = node.__doc__
+    return wrapper
+
+def bounded_entities(parsed: dict) -> dict:
+    """Keep only the whitelisted LLM entities, dropping empty values and truncating long strings."""
+    entities = {}
+    for key in LLM_ENTITY_KEYS:
+        value = parsed.get(key)
+        if value is None or value == "":
+            continue
+        entities[key] = str(value)[:MAX_ENTITY_LENGTH]
+    return entities
@@ -0,0 +1,235 @@
+"""
+Escalation tickets for the mock server: a priority queue with SLA-aware dispatch.
+
+Open tickets sit in a heap keyed by (priority, SLA deadline, arrival), so `claim` hands an agent the most
+urgent ticket in O(log n): priority 1 before 2 before 3, and within a priority the deadline that expires
+first. Tickets leaving the queue some other way (cancelled) are skipped when they surface (lazy deletion).
+
+The live ETA of an open ticket is the number of tickets ahead of it divided by the agents working the
+queue, times the average handling time. Each priority keeps its open deadlines in a sorted array, so
+"tickets ahead" is a few counts plus one bisect rather than a scan of the heap.
+"""
+import bisect
+import heapq
+import itertools
+import math
+import threading
+import time
+import uuid
+from array import array
+
+## Minutes to first response per priority (1: departure within 48h, 2: high-value customer, 3: standard)
+SLA_MINUTES = {1: 15, 2: 60, 3: 240}
+
+OPEN, CLAIMED, RESOLVED, CANCELLED = "open", "claimed", "resolved", "cancelled"
+
+## Fields the queue owns; a client payload can't set them (dropped at intake)
+RESERVED_FIELDS = frozenset({"ticket_id", "priority", "status", "agent_id", "sla_deadline", "created_at", "claimed_at", "resolved_at", "position", "eta_minutes"})
+
+BULK_INDEX_THRESHOLD = 64 # larger batches re-sort the deadline index once instead of inserting one by one
+
+class TicketError(ValueError):
+    """Raised for invalid state transitions, e.g. acking a ticket another agent claimed."""
+
+class UnknownTicket(TicketError):
+    """Raised for ticket ids that don't exist (or were resolved long ago)."""
+
+class Ticket:
+    def __init__(self, ticket_id: str, priority: int, created_at: float, deadline: float, data: dict):
+        self.id = ticket_id
+        self.priority = priority
+        self.created_at = created_at
+        self.deadline = deadline
+        self.data = data
+        self.status = OPEN
+        self.agent_id = None
+        self.claimed_at = None
+        self.resolved_at = None
+
+    def to_dict(self) -> dict:
+        return {
+            **self.data,
+            "ticket_id": self.id,
+            "priority": self.priority,
+            "status": self.status,
+            "agent_id": self.agent_id,
+            "sla_deadline": self.deadline,
+            "created_at": self.created_at,
+            "claimed_at": self.claimed_at,
+            "resolved_at": self.resolved_at
+        }
+
+class TicketQueue:
+
+    def __init__(self, default_handle_minutes: float = 10, agent_timeout_seconds: float = 900, max_resolved: int = 100_000):
+        self.default_handle_minutes = default_handle_minutes
+        self.agent_timeout_seconds = agent_timeout_seconds # an agent counts as working the queue this long after its last claim/ack
+        self.max_resolved = max_resolved
+        self.lock = threading.Lock()
+        self.heap = [] # (priority, deadline, sequence, ticket_id)
+        self.sequence = itertools.count()
+        self.tickets = {} # ticket_id -> Ticket (open, claimed, and the latest resolved)
+        self.resolved = [] # ids in resolution order, trimmed to max_resolved
+        self.deadlines = {priority: array("d") for priority in SLA_MINUTES} # open deadlines per priority, sorted
+        self.agents = {} # agent_id -> last seen
+        self.handle_s = None # moving average of claim -> resolve
+        self.stats = {"created": 0, "claimed": 0, "resolved": 0, "cancelled": 0, "released": 0, "sla_breached": 0}
+
+    # --- intake ---
+
+    def create(self, data: dict, priority: int = 3, now: float = None) -> Ticket:
+        return self.create_many([(data, priority)], now)[0]
+
+    def create_many(self, items: list, now: float = None) -> list:
+        """Bulk intake of (data, priority) pairs under one lock; the heap is rebuilt once if that's cheaper."""
+        now = time.time() if now is None else now
+        tickets = []
+        for data, priority in items:
+            priority = priority if priority in SLA_MINUTES else max(SLA_MINUTES)
+            data = {key: value for key, value in data.items() if key not in RESERVED_FIELDS}
+            tickets.append(Ticket(uuid.uuid4().hex, priority, now, now + SLA_MINUTES[priority] * 60, data))
+
+        with self.lock:
+            entries = [(ticket.priority, ticket.deadline, next(self.sequence), ticket.id) for ticket in tickets]
+            if len(entries) > len(self.heap):
+                self.heap.extend(entries)
+                heapq.heapify(self.heap) # O(n) instead of O(k log n)
+            else:
+                for entry in entries:
+                    heapq.heappush(self.heap, entry)
+            for ticket in tickets:
+                self.tickets[ticket.id] = ticket
+            if len(tickets) > BULK_INDEX_THRESHOLD:
+                for priority in self.deadlines:
+                    added = [ticket.deadline for ticket in tickets if ticket.priority == priority]
+                    if added:
+                        self.deadlines[priority] = array("d", sorted(itertools.chain(self.deadlines[priority], added)))
+            else:
+                for ticket in tickets:
+                    self._index(ticket)
+            self.stats["created"] += len(tickets)
+        return tickets
+
+    # --- dispatch ---
+
+    def claim(self, agent_id: str, now: float = None):
+        """Assign the most urgent open ticket to `agent_id`; None when the queue is empty."""
+        now = time.time() if now is None else now
+        with self.lock:
+            self.agents[agent_id] = now
+            while self.heap:
+                _, _, _, ticket_id = heapq.heappop(self.heap)
+                ticket = self.tickets.get(ticket_id)
+                if ticket is None or ticket.status != OPEN:
+                    continue # cancelled while queued
+                self._unindex(ticket)
+                ticket.status, ticket.agent_id, ticket.claimed_at = CLAIMED, agent_id, now
+                self.stats["claimed"] += 1
+                if now > ticket.deadline:
+                    self.stats["sla_breached"] += 1
+                return ticket
+            return None
+
+    def ack(self, ticket_id: str, agent_id: str, now: float = None) -> Ticket:
+        """The agent resolved a ticket it claimed."""
+        now = time.time() if now is None else now
+        with self.lock:
+            ticket = self._get(ticket_id)
+            if ticket.status != CLAIMED or ticket.agent_id != agent_id:
+                raise TicketError(f"Ticket {ticket_id} is {ticket.status}, not claimed by {agent_id}")
+            self.agents[agent_id] = now
+            ticket.status, ticket.resolved_at = RESOLVED, now
+            handle_s = now - ticket.claimed_at
+            self.handle_s = handle_s if self.handle_s is None else 0.9 * self.handle_s + 0.1 * handle_s
+            self.stats["resolved"] += 1
+            self._retire(ticket)
+            return ticket
+
+    def release(self, ticket_id: str, agent_id: str) -> Ticket:
+        """Put a claimed ticket back in the queue with its original priority and deadline."""
+        with self.lock:
+            ticket = self._get(ticket_id)
+            if ticket.status != CLAIMED or ticket.agent_id != agent_id:
+                raise TicketError(f"Ticket {ticket_id} is {ticket.status}, not claimed by {agent_id}")
+            ticket.status, ticket.agent_id, ticket.claimed_at = OPEN, None, None
+            heapq.heappush(self.heap, (ticket.priority, ticket.deadline, next(self.sequence), ticket.id))
+            self._index(ticket)
+            self.stats["released"] += 1
+            return ticket
+
+    def cancel(self, ticket_id: str) -> Ticket:
+        with self.lock:
+            ticket = self._get(ticket_id)
+            if ticket.status != OPEN:
+                raise TicketError(f"Ticket {ticket_id} is {ticket.status}")
+            self._unindex(ticket) # the heap entry is skipped when it surfaces
+            ticket.status = CANCELLED
+            self.stats["cancelled"] += 1
+            self._retire(ticket)
+            return ticket
+
+    # --- queries ---
+
+    def get(self, ticket_id: str) -> Ticket:
+        with self.lock:
+            return self._get(ticket_id)
+
+    def ahead_of(self, ticket: Ticket) -> int:
+        """Open tickets that will be claimed before this one."""
+        with self.lock:
+            return self._ahead(ticket.priority, ticket.deadline)
+
+    def eta_minutes(self, ticket: Ticket = None, priority: int = 3, now: float = None) -> int:
+        """Minutes until `ticket` (or a new ticket of `priority`) is picked up, at the current pace."""
+        now = time.time() if now is None else now
+        with self.lock:
+            if ticket is not None and ticket.status != OPEN:
+                return 0
+            if ticket is None:
+                ahead = self._ahead(priority, now + SLA_MINUTES.get(priority, SLA_MINUTES[max(SLA_MINUTES)]) * 60)
+            else:
+                ahead = self._ahead(ticket.priority, ticket.deadline)
+            agents = sum(now - seen <= self.agent_timeout_seconds for seen in self.agents.values())
+            handle_minutes = self.handle_s / 60 if self.handle_s is not None else self.default_handle_minutes
+            return math.ceil((ahead // max(agents, 1) + 1) * handle_minutes)
+
+    def snapshot(self, now: float = None) -> dict:
+        now = time.time() if now is None else now
+        with self.lock:
+            return {
+                "open": {priority: len(deadlines) for priority, deadlines in self.deadlines.items()},
+                "in_progress": self.stats["claimed"] - self.stats["resolved"] - self.stats["released"],
+                "heap_entries": len(self.heap),
+                "active_agents": sum(now - seen <= self.agent_timeout_seconds for seen in self.agents.values()),
+                "avg_handle_minutes": round(self.handle_s / 60, 2) if self.handle_s is not None else None,
+                "overdue": sum(bisect.bisect_right(deadlines, now) for deadlines in self.deadlines.values()), # open past their deadline
+                **self.stats
+            }
+
+    # --- internals (lock held) ---
+
+    def _get(self, ticket_id: str) -> Ticket:
+        ticket = self.tickets.get(ticket_id)
+        if ticket is None:
+            raise UnknownTicket(f"Unknown ticket {ticket_id}")
+        return ticket
+
+    def _ahead(self, priority: int, deadline: float) -> int:
+        more_urgent = sum(len(self.deadlines[other]) for other in self.deadlines if other < priority)
+        return more_urgent + bisect.bisect_left(self.deadlines[priority], deadline)
+
+    def _index(self, ticket: Ticket):
+        deadlines = self.deadlines[ticket.priority]
+        deadlines.insert(bisect.bisect_right(deadlines, ticket.deadline), ticket.deadline)
+
+    def _unindex(self, ticket: Ticket):
+        deadlines = self.deadlines[ticket.priority]
+        del deadlines[bisect.bisect_left(deadlines, ticket.deadline)] # any entry with this deadline will do
+
+    def _retire(self, ticket: Ticket):
+        """Keep only the latest `max_resolved` finished tickets around for lookups."""
+        self.resolved.append(ticket.id)
+        if len(self.resolved) > 2 * self.max_resolved:
+            for ticket_id in self.resolved[:-self.max_resolved]:
+                self.tickets.pop(ticket_id, None)
+            del self.resolved[:-self.max_resolved]
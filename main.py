@@ -1,58 +1,197 @@
-# from pyngrok import ngrok
-# import uvicorn
-# from customer_support.urgent_booking_changes.v2.mock_server import app
-
-# # Start server via ngrok (for Colab Compatibility)
-# ngrok_tunnel = ngrok.connect(8000)
-# print(f"API URL: {ngrok_tunnel.public_url}")
-
-# import nest_asyncio
-# nest_asyncio.apply()
-# uvicorn.run(app, host="0.0.0.0", port=8000)
-
-# from basic_chat_bot.v1.bot import stream_graph_updates
-# from basic_chat_bot.v5.bot import graph, stream_graph_updates
-
-# if __name__ == "__main__":
-
-#     while True:
-#         user_input = input("User: ")
-#         if user_input.lower() in ["quit", "exit", "q"]:
-#             print("Goodbye!")
-#             break
-
-#         ## Now let's interact with the bot. First, pick a thread to use as the key for this conversation.
-#         config = {"configurable": {"thread_id": "1"}}
-
-#         stream_graph_updates(graph, user_input, config)
+"""
+Serving entry point for the demo apps.
+
+    python main.py --app v3-chat --workers 1 --threads 8 --port 3001
+    python main.py --app booking-mock --port 8000
+    python main.py --app voice-v2 --dev          # Flask/uvicorn dev server, debugger on
+
+Apps run under gunicorn: WSGI apps with the threaded `gthread` worker, the FastAPI mock server with uvicorn
+workers. The app is preloaded in the master so graphs are compiled once before forking; each worker then
+warms its own API clients in the background and `/readyz` answers 503 until that's done.
+"""
+import argparse
+import importlib
+import multiprocessing
+import threading
+import time
+
+## name -> (module, attribute, interface, keeps state in process memory: conversations, tickets, seat holds)
+APPS = {
+    "v1-graph": ("basic_chat_bot.v1.api", "app", "wsgi", False),
+    "v3-chat": ("basic_chat_bot.v3.api", "app", "wsgi", True),
+    "v4-hitl": ("basic_chat_bot.v4.api", "app", "wsgi", True),
+    "v5-hitl": ("basic_chat_bot.v5.api", "app", "wsgi", True),
+    "voice-v2": ("voice_chat.v2.agent", "app", "wsgi", True),
+    "booking-mock": ("customer_support.urgent_booking_changes.v2.mock_server", "app", "asgi", True)
+}
+
+DEFAULT_PORTS = {"v1-graph": 5000, "v3-chat": 3001, "v4-hitl": 3002, "v5-hitl": 3003, "voice-v2": 5001, "booking-mock": 8000}
+
+# --- Warm-up: runs once per worker, after fork ---
+
+def warm_v1_graph():
+    importlib.import_module("basic_chat_bot.v1.api")
+
+def warm_v3_chat():
+    from basic_chat_bot.v3.api import graph, llm
+    graph.get_graph()
+    llm.root_client.models.list() # opens the worker's own connection pool to OpenAI
+
+def warm_v4_hitl():
+    from basic_chat_bot.v4.api import graph
+    from basic_chat_bot.v1.bot import llm
+    graph.get_graph()
+    llm.root_client.models.list()
+
+def warm_v5_hitl():
+    from basic_chat_bot.v5.api import graph
+    from basic_chat_bot.v1.bot import llm
+    graph.get_graph()
+    llm.root_client.models.list()
+
+def warm_voice_v2():
+    from voice_chat.v2.bot import graph, llm
+    graph.get_graph()
+    llm.root_client.models.list()
+
+def warm_booking_mock():
+    import openai
+    from customer_support.urgent_booking_changes.v2.graph import agent
+    agent.get_graph()
+    openai.models.list()
+
+WARMUPS = {
+    "v1-graph": warm_v1_graph,
+    "v3-chat": warm_v3_chat,
+    "v4-hitl": warm_v4_hitl,
+    "v5-hitl": warm_v5_hitl,
+    "voice-v2": warm_voice_v2,
+    "booking-mock": warm_booking_mock
+}
+
+# --- Readiness ---
+
+readiness = {"ready": False, "error": None}
+
+def warm_until_ready(warm, max_backoff: float = 30):
+    """Retry the warm-up with exponential backoff; the worker reports ready once it succeeds."""
+    backoff = 1
+    while True:
+        try:
+            warm()
+            readiness.update(ready=True, error=None)
+            return
+        except Exception as e:
+            readiness["error"] = f"{type(e).__name__}: {e}"
+            print(f"Warm-up failed, retrying in {backoff}s: {readiness['error']}")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+
+def add_readiness_route(app, interface: str):
+    if interface == "asgi":
+        from fastapi.responses import JSONResponse
+
+        def readyz():
+            return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+        app.add_api_route("/readyz", readyz, methods=["GET"])
+    else:
+        from flask import jsonify
+
+        def readyz():
+            return jsonify(readiness), 200 if readiness["ready"] else 503
+
+        app.add_url_rule("/readyz", "readyz", readyz, methods=["GET"])
+
+# --- Server ---
+
+def load_app(name: str):
+    module, attribute, interface, _ = APPS[name]
+    app = getattr(importlib.import_module(module), attribute)
+    add_readiness_route(app, interface)
+    return app
+
+def serve(args):
+    from gunicorn.app.base import BaseApplication
+
+    _, _, interface, _ = APPS[args.app]
+    warm = WARMUPS[args.app]
+
+    def post_worker_init(worker):
+        threading.Thread(target=warm_until_ready, args=(warm,), daemon=True, name="warm-up").start()
+
+    def worker_exit(server, worker):
+        readiness["ready"] = False
+
+    options = {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "preload_app": args.preload,
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout, # SIGTERM: stop accepting, let in-flight requests finish
+        "keepalive": 5,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests // 10,
+        "post_worker_init": post_worker_init,
+        "worker_exit": worker_exit,
+        "accesslog": "-"
+    }
+    if interface == "asgi":
+        options["worker_class"] = "uvicorn.workers.UvicornWorker"
+    else:
+        options["worker_class"] = "gthread"
+        options["threads"] = args.threads
+
+    class Application(BaseApplication):
+
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app(args.app)
+
+    Application().run()
+
+def serve_dev(args):
+    """Single process with the framework's dev server (debugger / auto-reload on)."""
+    _, _, interface, _ = APPS[args.app]
+    app = load_app(args.app)
+    threading.Thread(target=warm_until_ready, args=(WARMUPS[args.app],), daemon=True, name="warm-up").start()
+
+    if interface == "asgi":
+        import uvicorn
+        uvicorn.run(app, host=args.host, port=args.port)
+    else:
+        app.run(debug=True, host=args.host, port=args.port)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve one of the demo apps.")
+    parser.add_argument("--app", required=True, choices=APPS)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int, help="worker processes (default: 1 for apps with in-memory state, else 2 x CPUs + 1)")
+    parser.add_argument("--threads", type=int, default=8, help="threads per WSGI worker")
+    parser.add_argument("--timeout", type=int, default=120, help="seconds before a silent worker is killed and restarted")
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="seconds in-flight requests get to finish on shutdown")
+    parser.add_argument("--max-requests", type=int, default=0, help="recycle workers after this many requests (0 = never)")
+    parser.add_argument("--no-preload", dest="preload", action="store_false", help="import the app in each worker instead of once in the master")
+    parser.add_argument("--dev", action="store_true", help="run the framework dev server instead of gunicorn")
+    args = parser.parse_args()
+
+    _, _, _, stateful = APPS[args.app]
+    if args.port is None:
+        args.port = DEFAULT_PORTS[args.app]
+    if args.workers is None:
+        args.workers = 1 if stateful else 2 * multiprocessing.cpu_count() + 1
+    elif stateful and args.workers > 1:
+        print(f"WARNING: {args.app} keeps its state (conversations, tickets, seat holds) in process memory; with {args.workers} "
+              "workers every request for a thread/call/ticket must reach the same worker (sticky routing) or it won't be found.")
+    return args
 
 if __name__ == "__main__":
-
-    # from basic_chat_bot.v3.api import app
-
-    # app.run(debug=True, host="0.0.0.0", port="3001")
-
-    from voice_chat.v2.agent import app
-
-    app.run(debug=True, host="0.0.0.0", port="5001")
-
-    # from basic_chat_bot.v6.twilio import main
-
-    # main()
-
-    # from voice_chat.v2.bot import graph, stream_graph_updates
-
-
-    # config = {"configurable": {"thread_id": "1"}}
-
-    # # graph.update_state(config, {"messages": [SYSTEM_PROMPT]})
-
-    # while True:
-    #     user_input = input(f"Enter something: ")
-
-    #     if user_input == 'end' or user_input == 'q':
-    #         print("Thank you!")
-    #         break
-
-    #     assistant_response = stream_graph_updates(user_input=user_input, config=config)
-    #     print(assistant_response)
+    args = parse_args()
+    if args.dev:
+        serve_dev(args)
+    else:
+        serve(args)
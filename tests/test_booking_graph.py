@@ -0,0 +1,68 @@
+import json
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from customer_support.urgent_booking_changes.v2 import nodes
+from customer_support.urgent_booking_changes.v2.graph import agent
+
+BOOKING = {"user_id": "USER456", "status": "confirmed", "flight": "NYC-LON 2024-10-20"}
+
+class FakeResponse:
+    def __init__(self, status_code: int, body):
+        self.status_code = status_code
+        self.body = body
+        self.text = json.dumps(body)
+
+    def json(self):
+        return self.body
+
+@pytest.fixture
+def booking_api(monkeypatch):
+    """The mock server's booking endpoints, recording every call."""
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(("GET", url))
+        if url.endswith("/bookings/BOOKING123"):
+            return FakeResponse(200, BOOKING)
+        return FakeResponse(404, {"detail": "Booking not found"})
+
+    def post(url, **kwargs):
+        calls.append(("POST", url))
+        if url.endswith("/bookings/BOOKING123/reschedule"):
+            return FakeResponse(200, {"message": "Rescheduled"})
+        if url.endswith("/tickets"):
+            return FakeResponse(201, {"ticket_id": "T1"})
+        return FakeResponse(404, {"detail": "Booking not found"})
+
+    monkeypatch.setattr(requests, "get", get)
+    monkeypatch.setattr(requests, "post", post)
+    return calls
+
+def parsed_as(monkeypatch, entities: dict):
+    message = SimpleNamespace(content=json.dumps(entities))
+    monkeypatch.setattr(nodes, "create_chat_completion", lambda **kwargs: SimpleNamespace(choices=[SimpleNamespace(message=message)]))
+
+def test_reschedule_fetches_the_booking_and_holds_seats_on_the_new_date(monkeypatch, booking_api):
+    new_date = next(day for day in (date.today() + timedelta(days=offset) for offset in range(30, 90)) if nodes.inventory.is_available("NYC-LON", day))
+    parsed_as(monkeypatch, {"intent": "reschedule_booking", "booking_id": "BOOKING123", "new_date": new_date.isoformat()})
+
+    result = agent.invoke({"user_input": f"Move BOOKING123 to {new_date}", "api_key": "SECRET_KEY_123"})
+
+    assert result["booking_details"] == BOOKING
+    assert result["is_available"] is True
+    assert not result.get("error") and not result.get("escalation_ticket_id")
+    assert ("POST", f"{nodes.hosted_url}/bookings/BOOKING123/reschedule") in booking_api
+    assert result.get("hold_id") is None # confirmed, not left dangling
+
+def test_reschedule_of_unknown_booking_goes_to_error_handler(monkeypatch, booking_api):
+    parsed_as(monkeypatch, {"intent": "reschedule_booking", "booking_id": "NOPE", "new_date": (date.today() + timedelta(days=30)).isoformat()})
+
+    result = agent.invoke({"user_input": "Move NOPE", "api_key": "SECRET_KEY_123"})
+
+    assert result["error"] == "Booking not found"
+    assert "is_available" not in result
+    assert not any(method == "POST" for method, _ in booking_api)
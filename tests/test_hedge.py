@@ -0,0 +1,107 @@
+import socket
+import threading
+import time
+
+import httpx
+import pytest
+from langchain_core.messages import AIMessageChunk
+from langchain_openai import ChatOpenAI
+
+from common.hedge import HedgedModel, HedgePolicy
+from common.rate_limit import OpenAILimiter, RateLimitedTransport
+
+class FakeStreamingModel:
+    def __init__(self, chunks=("Hi",), delay_s: float = 0.0, error: Exception = None, close_s: float = 0.0):
+        self.chunks = chunks
+        self.delay_s = delay_s
+        self.error = error
+        self.close_s = close_s
+
+    def stream(self, messages):
+        return FakeStream(self)
+
+class FakeStream:
+    def __init__(self, model: FakeStreamingModel):
+        self.model = model
+        self.chunks = iter(model.chunks)
+        self.started = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.started:
+            self.started = True
+            time.sleep(self.model.delay_s)
+            if self.model.error is not None:
+                raise self.model.error
+        return AIMessageChunk(content=next(self.chunks))
+
+    def close(self):
+        time.sleep(self.model.close_s) # still tearing down after the error was reported
+
+def invoke_with_timeout(model: HedgedModel, timeout_s: float = 5):
+    result = {}
+
+    def run():
+        try:
+            result["value"] = model.invoke([])
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout_s)
+    assert not thread.is_alive(), "invoke hung"
+    return result
+
+def test_raises_when_both_models_fail_close_together():
+    primary = FakeStreamingModel(delay_s=0.05, error=RuntimeError("primary down"), close_s=0.5)
+    backup = FakeStreamingModel(delay_s=0.06, error=RuntimeError("backup down"), close_s=0.5)
+    hedged = HedgedModel(primary, backup, HedgePolicy(threshold_s=0.01))
+
+    result = invoke_with_timeout(hedged)
+
+    assert str(result["error"]) == "primary down"
+    assert hedged.stats["errors"] == 1
+
+@pytest.fixture
+def stalled_server():
+    """Sends streaming response headers, then no tokens; records when the client hangs up."""
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    hung_up = threading.Event()
+
+    def serve():
+        connection, _ = listener.accept()
+        connection.recv(65536)
+        connection.sendall(b"HTTP/1.1 200 OK\r\ncontent-type: text/event-stream\r\ntransfer-encoding: chunked\r\n\r\n")
+        connection.settimeout(10)
+        try:
+            while connection.recv(65536):
+                pass
+        except OSError:
+            pass
+        hung_up.set()
+        connection.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield f"http://127.0.0.1:{listener.getsockname()[1]}/v1", hung_up
+    listener.close()
+
+def test_cancelling_the_stalled_primary_closes_its_connection(stalled_server):
+    base_url, hung_up = stalled_server
+    limiter = OpenAILimiter(rpm=10_000, tpm=10_000_000)
+    http_client = httpx.Client(transport=RateLimitedTransport(limiter), timeout=30)
+    primary = ChatOpenAI(model="gpt-4o", api_key="test", base_url=base_url, http_client=http_client, max_retries=0)
+    hedged = HedgedModel(primary, FakeStreamingModel(chunks=("Backup", " answer")), HedgePolicy(threshold_s=0.2))
+
+    result = invoke_with_timeout(hedged)
+
+    assert result["value"].content == "Backup answer"
+    assert hung_up.wait(2), "the losing primary kept its connection open"
+    deadline = time.monotonic() + 2
+    while limiter.in_flight and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert limiter.in_flight == 0
@@ -0,0 +1,31 @@
+from langchain_core.messages import AIMessage
+from langgraph.graph import START, MessagesState, StateGraph
+from langgraph.types import interrupt
+
+from common.checkpoint import CompactSerializer, ProcessLocalSqliteSaver
+from common.interrupts import HumanReviewQueue, InterruptStore
+
+def ask_human(state: MessagesState) -> dict:
+    answer = interrupt({"question": state["messages"][-1].content})
+    return {"messages": [AIMessage(content=f"A human says: {answer['data']}")]}
+
+def review_queue(path: str) -> HumanReviewQueue:
+    """What the v4/v5 apps build at startup with INTERRUPTS_DB set."""
+    builder = StateGraph(MessagesState)
+    builder.add_node("ask_human", ask_human)
+    builder.add_edge(START, "ask_human")
+    graph = builder.compile(checkpointer=ProcessLocalSqliteSaver(path, serde=CompactSerializer()))
+    return HumanReviewQueue("test", graph, InterruptStore(path))
+
+def test_paused_thread_resumes_after_a_restart(tmp_path):
+    path = str(tmp_path / "interrupts.sqlite")
+    paused = review_queue(path).chat("t1", "Can I get an expert?")
+    assert paused["status"] == "interrupted"
+
+    restarted = review_queue(path) # new process: nothing in memory
+    assert [item.thread_id for item in restarted.list()] == ["t1"]
+    result = restarted.resume("t1", paused["interrupt"]["interrupt_id"], {"data": "Yes, one is on the way"})
+
+    assert result == {"status": "done", "assistant": "A human says: Yes, one is on the way"}
+    assert restarted.snapshot()["pending"] == 0
+    assert restarted.stats["expired"] == 0
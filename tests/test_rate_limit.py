@@ -0,0 +1,23 @@
+import gzip
+import json
+
+import httpx
+import openai
+import pytest
+
+from common.rate_limit import OpenAILimiter, RateLimitedTransport
+
+def gzipped_429(request: httpx.Request) -> httpx.Response:
+    body = gzip.compress(json.dumps({"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}).encode())
+    return httpx.Response(429, headers={"content-encoding": "gzip", "content-type": "application/json", "retry-after-ms": "1"}, content=body)
+
+def test_final_429_with_gzip_body_reaches_the_sdk_as_rate_limit_error():
+    transport = RateLimitedTransport(OpenAILimiter(rpm=10_000, tpm=10_000_000), httpx.MockTransport(gzipped_429), max_attempts=2)
+    client = openai.OpenAI(api_key="test", http_client=httpx.Client(transport=transport), max_retries=0)
+
+    with pytest.raises(openai.RateLimitError) as error:
+        client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": "hi"}])
+
+    assert error.value.response.headers["x-should-retry"] == "false"
+    assert "content-encoding" not in error.value.response.headers
+    assert error.value.body["code"] == "rate_limit_exceeded"
@@ -0,0 +1,22 @@
+import pytest
+
+from common.tts import markdown_to_speech
+
+@pytest.mark.parametrize("markdown, speech", [
+    ("It costs $1.5 million.", "It costs one point five million dollars."),
+    ("A $2M limit", "A two million dollars limit."),
+    ("Pay $12.50 per visit", "Pay twelve dollars and fifty cents per visit."),
+    ("Set `snake_case_name` or snake_case_name", "Set snake_case_name or snake_case_name."),
+    ("This is _important_ and __very__ so", "This is important and very so."),
+    ("Covers you and/or your spouse", "Covers you and or your spouse."),
+    ("In-network/out-of-network", "In-network or out-of-network."),
+    ("Due 10/20/2024", "Due October twentieth, twenty twenty four."),
+    ("Due 2024-10-05", "Due October fifth, twenty twenty four."),
+    ("Since 1/2/2007", "Since January second, two thousand seven."),
+    ("Version 1.2.3", "Version one point two point three."),
+    ("Update to v2.0.1.", "Update to version two point zero point one."),
+    ("Call 1-800-555-1234", "Call one, eight zero zero, five five five, one two three four."),
+    ("Covered at 80%", "Covered at eighty percent."),
+])
+def test_markdown_to_speech(markdown, speech):
+    assert markdown_to_speech(markdown) == speech
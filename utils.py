@@ -1,8 +1,9 @@
 import json, re
 
-def extract_json_from_markdown(text: str) -> dict:
+def extract_json_from_markdown(text: str, strict: bool = False) -> dict:
     """
     Extract JSON content from a markdown code block like ```json ... ```
+    With strict=True malformed JSON raises json.JSONDecodeError instead of falling back to the raw text.
     """
     # Match anything between triple backticks
     match = re.search(r"```json\s*(.*?)```", text, re.DOTALL)
@@ -15,4 +16,6 @@ def extract_json_from_markdown(text: str) -> dict:
     try:
         return json.loads(json_str)
     except json.JSONDecodeError:
-        return {"answer": text, "suggested_questions": []}
\ No newline at end of file
+        if strict:
+            raise
+        return {"answer": text, "suggested_questions": []}
@@ -1,15 +1,40 @@
+import os
 from voice_chat.v1.agent import twilio_client, twilio_phone_number, account_sid, auth_token
 from flask import Flask, request, jsonify
 from twilio.rest import Client
 from langchain_core.messages import AIMessage
 from twilio.twiml.voice_response import VoiceResponse, Gather
-from voice_chat.v2.bot import graph, stream_graph_updates
+from voice_chat.v2.bot import graph, memory, context, hedged_llm, prefetcher, search_prefetcher, SPECULATE_ENABLED, stream_graph_updates
+from common.usage import usage_tracker
+from common.rate_limit import openai_limiter, request_priority, INTERACTIVE
+from common.jobs import JobQueue
+from common.turns import ThreadTurnQueue
+from voice_chat.v2.ingest import RecordingIngestor, WhisperTranscriber
+from voice_chat.v2.vad import VoiceActivityDetector
 
 app = Flask(__name__)
 
 SILENCE_TIMEOUT = 1.5
 MAX_RECORDING_LENGTH = 30
 
+## Voice turns run on a worker pool; the Gather webhook answers at once and Twilio polls /speech_result
+TURN_WORKERS = 8
+RESULT_POLL_WAIT = 4 # seconds a /speech_result request waits for the turn (well under Twilio's 15s webhook timeout)
+HOLD_PAUSE = 1 # seconds of silence before polling again
+TURN_TIMEOUT = 25 # seconds after which the caller is asked to repeat
+
+turn_jobs = JobQueue(max_workers=TURN_WORKERS, name="voice-turn")
+call_turns = ThreadTurnQueue() # a turn abandoned on timeout still finishes before the call's next one starts
+
+## Recordings from the fallback path: downloaded (4 at a time), decoded to 16 kHz mono in memory, silence trimmed, transcribed locally
+ingestor = RecordingIngestor(transcribe=WhisperTranscriber(os.getenv("WHISPER_MODEL", "base")), vad=VoiceActivityDetector(), max_concurrency=4, auth=(account_sid, auth_token))
+
+def partial_results(call_sid) -> dict:
+    """Gather options that stream partial transcripts to /partial_speech when speculation is on"""
+    if not SPECULATE_ENABLED:
+        return {}
+    return {"partial_result_callback": f"/partial_speech/{call_sid}", "partial_result_callback_method": "POST"}
+
 @app.route("/make_call", methods=["GET", "POST"])
 def make_call():
     """Initiate a call with the agent"""
@@ -40,7 +65,8 @@ def voice_webhook():
         method="POST",
         language="en-US",
         enhanced=True,
-        speech_model='phone_call'
+        speech_model='phone_call',
+        **partial_results(call_sid)
     )
 
     gather.say("Please speak now...")
@@ -52,9 +78,53 @@ def voice_webhook():
 
     return str(response)
 
+def run_voice_turn(call_sid, speech_result):
+    """One graph turn for the call, on the turn worker pool; returns what the agent says"""
+    return call_turns.run(call_sid, speech_result, lambda: stream_voice_turn(call_sid, speech_result))
+
+def stream_voice_turn(call_sid, speech_result):
+    config = {"configurable": {"thread_id": call_sid}}
+    spoken = []
+
+    for event in graph.stream({"messages": [{"role": "user", "content": speech_result}]}, config):
+        for value in event.values():
+            message = value["messages"][-1]
+
+            tool_calls = message.additional_kwargs.get('tool_calls', [])
+
+            if len(tool_calls) > 0 and tool_calls[0].get('function', {}).get('name', '') == 'tavily_search':
+                print(f"Tool Call: {tool_calls[0]}")
+                pass # handle when tool call is there     
+            elif isinstance(message, AIMessage) and message.content:
+                print(f"Agent Response: {message.content}")
+                spoken.append(message.content)
+
+    return spoken
+
+def continue_conversation(response, call_sid):
+    gather = Gather(
+        input="speech",
+        timeout=SILENCE_TIMEOUT,
+        speech_timeout='auto',
+        action=f"/process_speech_gather/{call_sid}",
+        method="POST",
+        language="en-US",
+        enhanced=True,
+        speech_model="phone_call",
+        **partial_results(call_sid)
+    )
+    gather.say("Please continue speaking...")
+    response.append(gather)
+
+def hold(response, call_sid, job_id, pause=True):
+    """Keep the caller on the line and come back for the turn's result"""
+    if pause:
+        response.pause(length=HOLD_PAUSE)
+    response.redirect(f"/speech_result/{call_sid}/{job_id}", method="POST")
+
 @app.route("/process_speech_gather/<call_sid>", methods=["POST"])
 def process_speech_gather(call_sid):
-    """Process speech from Gather (real-time transcription)"""
+    """Process speech from Gather (real-time transcription): queue the turn and answer right away"""
     response = VoiceResponse()
 
     # Get the transcription from Gather
@@ -65,42 +135,57 @@ def process_speech_gather(call_sid):
     print(f"Confidence: {confidence}")
 
     if speech_result:
-
-        config = {"configurable": {"thread_id": call_sid}}
-
-        for event in graph.stream({"messages": [{"role": "user", "content": speech_result}]}, config):
-            for value in event.values():
-                message = value["messages"][-1]
-
-                tool_calls = message.additional_kwargs.get('tool_calls', [])
-
-                if len(tool_calls) > 0 and tool_calls[0].get('function', {}).get('name', '') == 'tavily_search':
-                    print(f"Tool Call: {tool_calls[0]}")
-                    pass # handle when tool call is there     
-                elif isinstance(message, AIMessage) and message.content:
-                    print(f"Agent Response: {message.content}")
-                    response.say(message.content)
-
-        # Continue the conversation
-        gather = Gather(
-            input="speech",
-            timeout=SILENCE_TIMEOUT,
-            speech_timeout='auto',
-            action=f"/process_speech_gather/{call_sid}",
-            method="POST",
-            language="en-US",
-            enhanced=True,
-            speech_model="phone_call"
-        )
-        gather.say("Please continue speaking...")
-        response.append(gather)
+        # The LLM (and maybe a search) runs on the worker pool, not inside Twilio's webhook timeout
+        job_id = turn_jobs.submit(run_voice_turn, call_sid, speech_result)
+        hold(response, call_sid, job_id, pause=False) # /speech_result long-polls, so go there straight away
     
     else:
+        prefetcher.discard(call_sid)
         response.say("I couldn't understand what you said. Please try again.")
         response.redirect(f"/voice_webhook?CallSid={call_sid}")
     
     return str(response)
 
+@app.route("/speech_result/<call_sid>/<job_id>", methods=["POST"])
+def speech_result(call_sid, job_id):
+    """TwiML for a queued turn once it's ready; otherwise hold and redirect here again"""
+    response = VoiceResponse()
+    job = turn_jobs.wait(job_id, RESULT_POLL_WAIT)
+
+    if job is None:
+        response.say("Sorry, I lost track of that. Could you say it again?")
+        continue_conversation(response, call_sid)
+    elif not job.future.done():
+        if job.age_s < TURN_TIMEOUT:
+            hold(response, call_sid, job_id)
+        else:
+            turn_jobs.mark_timeout(job)
+            response.say("Sorry, that is taking too long. Could you ask me again?")
+            continue_conversation(response, call_sid)
+    elif job.future.exception() is not None:
+        print(f"Turn failed for {call_sid}: {job.future.exception()!r}")
+        response.say("Sorry, something went wrong on my side. Could you say that again?")
+        continue_conversation(response, call_sid)
+    else:
+        for text in job.future.result():
+            response.say(text)
+        # Continue the conversation
+        continue_conversation(response, call_sid)
+
+    return str(response)
+
+@app.route("/partial_speech/<call_sid>", methods=["POST"])
+def partial_speech(call_sid):
+    """Gather partial transcripts: may start a speculative LLM call for the turn"""
+    # Below real voice turns in the OpenAI queue: a speculation may be thrown away
+    with request_priority(INTERACTIVE):
+        prefetcher.on_partial(
+            call_sid,
+            request.values.get("StableSpeechResult", ""),
+            request.values.get("UnstableSpeechResult", ""),
+            request.values.get("SequenceNumber", type=int)
+        )
+    return "", 200
 
 @app.route("/fallback_record/<call_sid>", methods=["GET"])
 def fallback_record(call_sid):
@@ -131,6 +216,9 @@ def process_speech_record(call_sid):
     print(f"Recording URL: {recording_url}")
     print(f"Recording Duration: {recording_duration} seconds")
 
+    if recording_url:
+        ingestor.submit(recording_url, on_done=lambda recording: print(f"Call {call_sid} - Transcript ({recording.speech_s:.1f}s of speech in {recording.duration_s:.1f}s): {recording.transcript}"))
+
     response.say("Thank you for speaking. I'm processing what you said and will respond soon.")
 
     # The transcription will come via the callback, so we wait or continue
@@ -167,4 +255,53 @@ def transcription_callback(call_sid):
         # For now, just log it
         print(f"User said: {transcription_text}")
 
-    return "", 200
\ No newline at end of file
+    return "", 200
+
+@app.route("/memory_stats", methods=["GET"])
+def memory_stats():
+    """Checkpointer memory-usage gauges"""
+    return jsonify(memory.stats())
+
+@app.route("/context_stats", methods=["GET"])
+def context_stats():
+    """Rolling-summary worker: summaries written, pending adoption, calls trimmed to the prompt budget"""
+    return jsonify(context.snapshot())
+
+@app.route("/job_stats", methods=["GET"])
+def job_stats():
+    """Voice-turn worker pool: queue depth, wait/run times, timeouts"""
+    return jsonify(turn_jobs.snapshot())
+
+@app.route("/ingest_stats", methods=["GET"])
+def ingest_stats():
+    """Recording ingestion: recordings, audio seconds, audio-seconds processed per wall-second, silence trimmed"""
+    return jsonify(ingestor.snapshot())
+
+@app.route("/usage", methods=["GET"])
+def usage():
+    """Token/cost accounting per model, graph node and call_sid"""
+    return jsonify(usage_tracker.snapshot())
+
+@app.route("/limiter_stats", methods=["GET"])
+def limiter_stats():
+    """Shared OpenAI rate limiter: budgets, queue and adaptive concurrency"""
+    return jsonify(openai_limiter.snapshot())
+
+@app.route("/hedge_stats", methods=["GET"])
+def hedge_stats():
+    """How often voice turns were hedged and how often the backup model won"""
+    return jsonify(hedged_llm.snapshot())
+
+@app.route("/speculation_stats", methods=["GET"])
+def speculation_stats():
+    """Speculative prefetch from partial transcripts: hit rate and latency saved"""
+    return jsonify(prefetcher.snapshot())
+
+@app.route("/search_prefetch_stats", methods=["GET"])
+def search_prefetch_stats():
+    """Searches started ahead of the model's tool call: hit rate and latency saved"""
+    return jsonify(search_prefetcher.snapshot())
+
+@app.route("/usage/<call_sid>", methods=["GET"])
+def call_usage(call_sid):
+    return jsonify(usage_tracker.thread_usage(call_sid))
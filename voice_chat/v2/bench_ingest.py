@@ -0,0 +1,70 @@
+"""
+Benchmark recording ingestion (download -> ffmpeg decode/resample -> NumPy) at several concurrency limits.
+
+Recordings are synthetic 8 kHz mono WAVs, like Twilio's, served from memory through an httpx mock transport
+with a simulated network rate, so the numbers reflect the pipeline rather than the internet. Reports
+audio-seconds ingested per wall-second for the batch (needs the `ffmpeg` binary on PATH).
+
+Run: python -m voice_chat.v2.bench_ingest [--recordings 32] [--seconds 20] [--concurrency 1 2 4 8]
+"""
+import argparse
+import asyncio
+import io
+import time
+
+import httpx
+import numpy as np
+import soundfile as sf
+
+from voice_chat.v2.ingest import RecordingIngestor
+
+TWILIO_SAMPLE_RATE = 8000
+
+def synthetic_wav(seconds: float, seed: int) -> bytes:
+    """Speech-like bursts (modulated tones + noise) separated by silence, 16-bit PCM WAV."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * TWILIO_SAMPLE_RATE)) / TWILIO_SAMPLE_RATE
+    envelope = (np.sin(2 * np.pi * 0.5 * t) > 0).astype(np.float32)
+    signal = envelope * (0.3 * np.sin(2 * np.pi * rng.uniform(120, 250) * t) * (1 + 0.5 * np.sin(2 * np.pi * 4 * t)))
+    signal += 0.01 * rng.standard_normal(len(t))
+    buffer = io.BytesIO()
+    sf.write(buffer, signal.astype(np.float32), TWILIO_SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+def mock_client(recordings: dict, bytes_per_s: float) -> httpx.AsyncClient:
+
+    async def handler(request: httpx.Request):
+        body = recordings[request.url.path]
+
+        async def stream():
+            for start in range(0, len(body), 16 * 1024):
+                chunk = body[start:start + 16 * 1024]
+                await asyncio.sleep(len(chunk) / bytes_per_s)
+                yield chunk
+
+        return httpx.Response(200, content=stream(), headers={"content-type": "audio/x-wav"})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="https://api.twilio.test")
+
+async def run(count: int, seconds: float, concurrency: int, bytes_per_s: float) -> tuple:
+    recordings = {f"/Recordings/RE{i}": synthetic_wav(seconds, i) for i in range(count)}
+    ingestor = RecordingIngestor(max_concurrency=concurrency, client=mock_client(recordings, bytes_per_s))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(ingestor.ingest(f"https://api.twilio.test{path}") for path in recordings))
+    wall_s = time.perf_counter() - start
+    audio_s = sum(recording.duration_s for recording in results)
+    assert all(recording.audio.dtype == np.float32 and recording.audio.base is not None for recording in results) # views, not copies
+    return audio_s, wall_s, ingestor.snapshot()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recordings", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=20, help="length of each recording")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--network-kbps", type=float, default=2000, help="simulated download speed per recording")
+    args = parser.parse_args()
+
+    print(f"{'concurrency':>12}{'audio s':>10}{'wall s':>10}{'audio s / wall s':>20}{'per-recording':>16}")
+    for concurrency in args.concurrency:
+        audio_s, wall_s, stats = asyncio.run(run(args.recordings, args.seconds, concurrency, args.network_kbps * 1000 / 8))
+        print(f"{concurrency:>12}{audio_s:>10.0f}{wall_s:>10.2f}{audio_s / wall_s:>20.1f}{stats['audio_s_per_wall_s']:>16.1f}")
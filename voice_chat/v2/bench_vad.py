@@ -0,0 +1,89 @@
+"""
+Benchmark silence trimming before transcription.
+
+The synthetic corpus mimics `fallback_record` recordings (up to 30 s): bursts of voiced sound (harmonics
+with a syllable-rate envelope) and fricative noise, with long silences over line noise at several
+levels. Because the speech positions are known, it reports speech recall alongside the audio cut.
+Recorded clips (any format soundfile reads) can be added with --clips. Compute saved is the share of
+audio the transcriber no longer sees; --transcribe MODEL also times local Whisper on both versions.
+
+Run: python -m voice_chat.v2.bench_vad [--clips a.wav b.flac] [--count 50] [--transcribe base]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from voice_chat.v2.vad import SAMPLE_RATE, VoiceActivityDetector, read_audio
+
+def synthetic_clip(rng: np.random.Generator, seconds: float = 30, noise_db: float = -60) -> tuple:
+    """(audio, boolean speech mask per sample)."""
+    n = int(seconds * SAMPLE_RATE)
+    audio = (10 ** (noise_db / 20) * rng.standard_normal(n)).astype(np.float32)
+    truth = np.zeros(n, dtype=bool)
+    position = rng.uniform(0.5, 4)
+    while position < seconds - 1:
+        length = min(rng.uniform(0.6, 4), seconds - position)
+        start, end = int(position * SAMPLE_RATE), int((position + length) * SAMPLE_RATE)
+        t = np.arange(end - start) / SAMPLE_RATE
+        pitch = rng.uniform(90, 260)
+        voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        syllables = np.clip(np.sin(2 * np.pi * rng.uniform(3, 5) * t), 0, None) # ~4 syllables/s with gaps
+        fricatives = rng.standard_normal(len(t)) * (syllables == 0) * 0.3 # noisy consonants between syllables
+        audio[start:end] += (rng.uniform(0.05, 0.3) * (voiced * syllables / 2 + fricatives)).astype(np.float32)
+        truth[start:end] = True
+        position += length + rng.uniform(0.5, 6)
+    return audio, truth
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clips", nargs="*", default=[], help="recorded clips to add to the corpus")
+    parser.add_argument("--count", type=int, default=50, help="synthetic clips")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--transcribe", metavar="MODEL", help="also time local Whisper on full vs trimmed audio")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    corpus = [("synthetic", *synthetic_clip(rng, args.seconds, rng.choice([-70, -60, -50]))) for _ in range(args.count)]
+    corpus += [(path, read_audio(path), None) for path in args.clips]
+    detector = VoiceActivityDetector()
+    model = None
+    if args.transcribe:
+        import whisper
+        model = whisper.load_model(args.transcribe)
+
+    rows = {}
+    for name, audio, truth in corpus:
+        kind = "synthetic" if truth is not None else "recorded"
+        row = rows.setdefault(kind, {"clips": 0, "audio_s": 0.0, "kept_s": 0.0, "vad_s": 0.0, "speech": 0, "speech_kept": 0, "stt_full_s": 0.0, "stt_trimmed_s": 0.0})
+        start = time.perf_counter()
+        segments = detector.segments(audio)
+        trimmed = detector.trim(audio)
+        row["vad_s"] += time.perf_counter() - start
+        row["clips"] += 1
+        row["audio_s"] += len(audio) / SAMPLE_RATE
+        row["kept_s"] += len(trimmed) / SAMPLE_RATE
+        if truth is not None:
+            kept = np.zeros(len(audio), dtype=bool)
+            for segment_start, segment_end in segments:
+                kept[segment_start:segment_end] = True
+            row["speech"] += np.count_nonzero(truth)
+            row["speech_kept"] += np.count_nonzero(truth & kept)
+        if model is not None:
+            for key, clip in (("stt_full_s", audio), ("stt_trimmed_s", trimmed)):
+                start = time.perf_counter()
+                if len(clip):
+                    model.transcribe(clip, fp16=False)
+                row[key] += time.perf_counter() - start
+
+    print(f"{'corpus':>10}{'clips':>7}{'audio s':>10}{'to STT s':>10}{'saved':>8}{'speech kept':>13}{'VAD x realtime':>16}" + (f"{'STT full s':>12}{'STT trimmed s':>15}" if model else ""))
+    for kind, row in rows.items():
+        recall = f"{row['speech_kept'] / row['speech']:.1%}" if row["speech"] else "n/a"
+        line = (f"{kind:>10}{row['clips']:>7}{row['audio_s']:>10.0f}{row['kept_s']:>10.0f}{1 - row['kept_s'] / row['audio_s']:>8.0%}"
+                f"{recall:>13}{row['audio_s'] / row['vad_s']:>16.0f}")
+        if model:
+            line += f"{row['stt_full_s']:>12.1f}{row['stt_trimmed_s']:>15.1f}"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import json
 import os
 
 from typing import Annotated
@@ -5,20 +6,30 @@ from typing_extensions import TypedDict
 
 from langchain_openai import ChatOpenAI
 from langchain_tavily import TavilySearch
-from langchain_core.messages import SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
 from langgraph.graph import StateGraph, START
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
-from langgraph.checkpoint.memory import MemorySaver
 
 from dotenv import load_dotenv
 
+from common.checkpoint import EvictingMemorySaver, CompactSerializer
+from common.usage import usage_callback, current_graph_context
+from common.rate_limit import rate_limited_http_client, request_priority, REALTIME, BATCH
+from common.hedge import HedgedModel, HedgePolicy
+from common.speculation import SpeculativePrefetcher, SearchPrefetcher, is_realtime_query, realtime_search_args
+from common.context_window import RollingSummary, render_transcript, summary_message
+
 load_dotenv()
 
-llm = ChatOpenAI(model="gpt-4o", api_key=os.getenv("OPENAI_SECRET"))
+llm = ChatOpenAI(model="gpt-4o", api_key=os.getenv("OPENAI_SECRET"), callbacks=[usage_callback], stream_usage=True, http_client=rate_limited_http_client())
 web_search_tool = TavilySearch(max_results=2, tavily_api_key=os.getenv("TAVILY_SECRET"))
 
-memory = MemorySaver()
+## One thread per Twilio call_sid; idle calls are evicted so a long-running server doesn't leak memory.
+memory = EvictingMemorySaver(ttl_seconds=30 * 60, max_threads=1000, serde=CompactSerializer())
+
+## A caller is waiting on the line: voice turns jump the OpenAI queue, but don't wait for budget forever
+LLM_QUEUE_TIMEOUT = 5
 
 SYSTEM_PROMPT = """
 You are a respectful, professional voice assistant. Always use polite language and treat all users with dignity regardless of background or communication style. Keep responses concise (1-3 sentences) and conversational using natural speech patterns. Wait for natural pauses before responding - never interrupt.
@@ -36,34 +47,120 @@ Key guidelines:
 - If you're unsure about current information, use the search tool
 """
 
+SUMMARY_PROMPT = "You maintain the running summary of a phone call between a caller and a voice assistant. Merge the new messages into the current summary. Keep names, facts, numbers, the caller's requests and anything the assistant promised; drop small talk. At most 150 words, plain text."
+
 class State(TypedDict):
     messages: Annotated[list, add_messages]
+    summary: Annotated[str, "Rolling summary of the turns before `summarized`"]
+    summarized: Annotated[int, "Number of leading messages covered by the summary"]
 
 graph_builder = StateGraph(State)
 tools = [web_search_tool]
 llm_with_tools = llm.bind_tools(tools)
 
+## Opt-in hedging (VOICE_HEDGE=1): if gpt-4o hasn't streamed its first token by the threshold, race a smaller
+## model and keep whichever answers first. VOICE_HEDGE_THRESHOLD fixes the threshold in seconds, otherwise
+## it tracks the p95 of gpt-4o's recent time-to-first-token.
+HEDGE_ENABLED = os.getenv("VOICE_HEDGE") == "1"
+backup_llm = ChatOpenAI(model="gpt-4o-mini", api_key=os.getenv("OPENAI_SECRET"), callbacks=[usage_callback], stream_usage=True, http_client=rate_limited_http_client())
+hedged_llm = HedgedModel(
+    llm_with_tools,
+    backup_llm.bind_tools(tools),
+    HedgePolicy(threshold_s=float(os.getenv("VOICE_HEDGE_THRESHOLD")) if os.getenv("VOICE_HEDGE_THRESHOLD") else None)
+)
+
+## Prompt layout: static prefix | rolling summary | recent turns. The prefix (with the bound tools) is
+## byte-identical on every call and the recent turns only grow until the summary moves, so OpenAI's
+## prompt cache serves most of each call's prompt. Long calls stay within a bounded prompt.
+STATIC_PREFIX = [SystemMessage(content=SYSTEM_PROMPT)]
+
+def summarize(thread_id: str, summary: str, messages: list) -> str:
+    # Off the hot path: runs on the summary worker, behind voice turns in the OpenAI queue
+    with request_priority(BATCH):
+        return backup_llm.invoke(
+            [SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content=f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{render_transcript(messages)}")],
+            config={"metadata": {"thread_id": thread_id, "langgraph_node": "summary"}}
+        ).content
+
+context = RollingSummary(summarize, max_recent_tokens=2000, keep_recent_tokens=800, budget_tokens=3000)
+
+def build_prompt(thread_id: str, values: dict) -> tuple:
+    """(messages for the model, state update adopting a newer summary)"""
+    summary, summarized, recent = context.window(thread_id, values)
+    update = {"summary": summary, "summarized": summarized} if summarized != (values.get("summarized") or 0) else {}
+    return STATIC_PREFIX + summary_message(summary) + recent, update
+
+## Opt-in speculation (VOICE_SPECULATE=1): Gather's partial transcripts start the first LLM call of a turn
+## while the caller is still talking; the final transcript reuses it if the words match.
+SPECULATE_ENABLED = os.getenv("VOICE_SPECULATE") == "1"
+SPECULATION_WAIT = 15 # seconds the turn waits for a matching speculation still in flight
+
+def speculative_prompt(thread_id: str, transcript: str) -> list:
+    values = graph.get_state({"configurable": {"thread_id": thread_id}}).values
+    messages, _ = build_prompt(thread_id, {**values, "messages": values.get("messages", []) + [HumanMessage(content=transcript)]})
+    return messages
+
+prefetcher = SpeculativePrefetcher(llm_with_tools, speculative_prompt)
+
+## Opt-in search prefetch (VOICE_SEARCH_PREFETCH=1): weather/news-style questions start the web search
+## alongside the first LLM call, and the model's search tool call gets the prefetched result.
+SEARCH_PREFETCH_ENABLED = os.getenv("VOICE_SEARCH_PREFETCH") == "1"
+SEARCH_PREFETCH_WAIT = 10 # seconds a tool call waits for a matching prefetch before searching itself
+
+search_prefetcher = SearchPrefetcher(lambda query, args: web_search_tool.invoke({"query": query, **args}))
+
+def prefetch_search(thread_id: str, message):
+    """Classifier in front of the first LLM call of a turn: real-time questions start their search now."""
+    if SEARCH_PREFETCH_ENABLED and isinstance(message, HumanMessage) and is_realtime_query(message.content):
+        search_prefetcher.start(thread_id, message.content, realtime_search_args(message.content))
+
 def chatbot(state: State):
-    # Get all messages from state
-    messages = state["messages"]
-    
-    # Check if system message already exists as the FIRST message
-    has_system_message = (len(messages) > 0 and 
-                         isinstance(messages[0], SystemMessage))
-    
-    # If no system message, prepend it
-    if not has_system_message:
-        messages = [SystemMessage(content=SYSTEM_PROMPT)] + messages
-    
+    thread_id, _ = current_graph_context()
+
+    # Static prefix + summary + recent turns, within the prompt budget
+    messages, update = build_prompt(thread_id, state)
+
+    prefetch_search(thread_id, state["messages"][-1])
+
+    response = None
+    if SPECULATE_ENABLED and isinstance(state["messages"][-1], HumanMessage):
+        response = prefetcher.take(thread_id, messages, timeout_s=SPECULATION_WAIT)
+
     # Invoke the LLM with the messages (including system prompt)
-    response = llm_with_tools.invoke(messages)
+    if response is None:
+        with request_priority(REALTIME, timeout_s=LLM_QUEUE_TIMEOUT):
+            response = hedged_llm.invoke(messages) if HEDGE_ENABLED else llm_with_tools.invoke(messages)
+
+    # Refresh the summary in the background once the recent turns outgrow their share
+    context.schedule(thread_id, {**state, **update, "messages": state["messages"] + [response]})
     
-    return {"messages": [response]}
+    return {"messages": [response], **update}
+
+tool_node = ToolNode(tools=tools)
+
+def run_tools(state: State):
+    """ToolNode, except that search calls matching a prefetched search are answered from it."""
+    message = state["messages"][-1]
+    thread_id, _ = current_graph_context()
+
+    answered = []
+    remaining = []
+    for tool_call in message.tool_calls:
+        result = None
+        if tool_call["name"] == web_search_tool.name:
+            result = search_prefetcher.take(thread_id, tool_call["args"], timeout_s=SEARCH_PREFETCH_WAIT)
+        if result is None:
+            remaining.append(tool_call)
+        else:
+            answered.append(ToolMessage(content=json.dumps(result, ensure_ascii=False), name=tool_call["name"], tool_call_id=tool_call["id"]))
+
+    if remaining:
+        answered += tool_node.invoke({"messages": [AIMessage(content="", tool_calls=remaining)]})["messages"]
+    return {"messages": answered}
 
 # Nodes
 graph_builder.add_node("chatbot", chatbot)
-tool_node = ToolNode(tools=tools)
-graph_builder.add_node("tools", tool_node)
+graph_builder.add_node("tools", run_tools)
 
 # Edges
 graph_builder.add_edge(START, "chatbot")
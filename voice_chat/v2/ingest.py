@@ -0,0 +1,200 @@
+"""
+Recording ingestion: Twilio RecordingUrl -> 16 kHz mono float32 NumPy buffer -> transcriber.
+
+Downloads are async with bounded concurrency and are streamed straight into an ffmpeg process (built with
+ffmpeg-python, driven through asyncio pipes), so decoding and resampling overlap the download and nothing
+touches disk. The decoded PCM lands in one bytearray that `np.frombuffer` wraps without copying. With a
+`vad`, silence is cut out before the transcriber sees the audio, and a recording with no speech is not
+transcribed at all.
+
+All ingestion runs on one event loop in a background thread, started on first use (after fork under gunicorn).
+"""
+import asyncio
+import threading
+import time
+
+import ffmpeg
+import httpx
+import numpy as np
+
+SAMPLE_RATE = 16000 # what Whisper-style models expect
+CHUNK_SIZE = 64 * 1024
+
+def decode_command(sample_rate: int = SAMPLE_RATE) -> list:
+    """ffmpeg argv: any container/codec on stdin -> raw little-endian float32 mono PCM on stdout."""
+    stream = ffmpeg.input("pipe:0").output("pipe:1", format="f32le", acodec="pcm_f32le", ac=1, ar=sample_rate)
+    return ffmpeg.compile(stream.global_args("-hide_banner", "-loglevel", "error"))
+
+class WhisperTranscriber:
+    """Local Whisper (openai-whisper), loaded on first use; accepts 16 kHz float32 arrays directly."""
+
+    def __init__(self, model_name: str = "base"):
+        self.model_name = model_name
+        self.model = None
+        self.lock = threading.Lock() # one inference at a time per model
+
+    def __call__(self, audio: np.ndarray) -> str:
+        with self.lock:
+            if self.model is None:
+                import whisper
+                self.model = whisper.load_model(self.model_name)
+            return self.model.transcribe(audio, fp16=False)["text"].strip()
+
+class Recording:
+    def __init__(self, url: str, audio: np.ndarray, sample_rate: int, started_at: float, decoded_at: float):
+        self.url = url
+        self.audio = audio
+        self.sample_rate = sample_rate
+        self.started_at = started_at
+        self.decoded_at = decoded_at
+        self.transcript = None
+        self.speech_s = None # audio sent to the transcriber after silence trimming
+
+    @property
+    def duration_s(self) -> float:
+        return len(self.audio) / self.sample_rate
+
+    @property
+    def ingest_s(self) -> float:
+        return self.decoded_at - self.started_at
+
+class RecordingIngestor:
+
+    def __init__(self, transcribe=None, vad=None, max_concurrency: int = 4, sample_rate: int = SAMPLE_RATE, auth: tuple = None, client: httpx.AsyncClient = None, download_attempts: int = 3):
+        self.transcribe = transcribe # (np.ndarray) -> str, run on a thread; None = decode only
+        self.vad = vad # VoiceActivityDetector; None = transcribe the whole recording
+        self.max_concurrency = max_concurrency
+        self.sample_rate = sample_rate
+        self.auth = auth
+        self.client = client
+        self.download_attempts = download_attempts
+        self.loop = None
+        self.semaphore = None
+        self.lock = threading.Lock()
+        self.stats = {"recordings": 0, "failed": 0, "in_flight": 0, "audio_s": 0.0, "ingest_s": 0.0, "transcribe_s": 0.0, "speech_s": 0.0, "vad_s": 0.0, "silent": 0, "bytes": 0}
+
+    # --- event loop (background thread) ---
+
+    def _ensure_loop(self):
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, daemon=True, name="recording-ingest").start()
+        return self.loop
+
+    def submit(self, url: str, on_done=None):
+        """Ingest from any thread; `on_done(recording)` is called with the transcribed Recording."""
+        future = asyncio.run_coroutine_threadsafe(self.ingest(url), self._ensure_loop())
+
+        def done(future):
+            if future.exception() is not None:
+                print(f"Ingestion failed for {url}: {future.exception()!r}")
+            elif on_done:
+                on_done(future.result())
+
+        future.add_done_callback(done)
+        return future
+
+    # --- pipeline ---
+
+    async def ingest(self, url: str) -> Recording:
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency) # bound to the running loop
+        if self.client is None:
+            self.client = httpx.AsyncClient(auth=self.auth, timeout=httpx.Timeout(30, connect=5), follow_redirects=True)
+
+        async with self.semaphore:
+            self._add("in_flight", 1)
+            try:
+                recording = await self.download_and_decode(url)
+                if self.transcribe is not None:
+                    await self.transcribe_speech(recording)
+            except Exception:
+                self._add("failed", 1)
+                raise
+            finally:
+                self._add("in_flight", -1)
+
+        with self.lock:
+            self.stats["recordings"] += 1
+            self.stats["audio_s"] += recording.duration_s
+            self.stats["ingest_s"] += recording.ingest_s
+        return recording
+
+    async def download_and_decode(self, url: str) -> Recording:
+        started_at = time.perf_counter()
+        for attempt in range(self.download_attempts):
+            process = await asyncio.create_subprocess_exec(
+                *decode_command(self.sample_rate),
+                stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+            pcm = bytearray()
+            reader = asyncio.create_task(self._read_into(process.stdout, pcm))
+            try:
+                async with self.client.stream("GET", url) as response:
+                    if response.status_code == 404 and attempt + 1 < self.download_attempts:
+                        # Twilio can call the action URL a moment before the recording is downloadable
+                        process.kill()
+                        await process.wait()
+                        reader.cancel()
+                        await asyncio.sleep(0.5 * (attempt + 1))
+                        continue
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                        self._add("bytes", len(chunk))
+                        process.stdin.write(chunk)
+                        await process.stdin.drain()
+                process.stdin.close()
+                await reader
+                stderr = await process.stderr.read()
+                if await process.wait() != 0:
+                    raise RuntimeError(f"ffmpeg failed ({process.returncode}): {stderr.decode(errors='replace').strip()}")
+            except BaseException:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                reader.cancel()
+                raise
+
+            # Zero-copy: the array is a view over the bytearray ffmpeg's output was read into
+            audio = np.frombuffer(pcm, dtype=np.float32)
+            return Recording(url, audio, self.sample_rate, started_at, time.perf_counter())
+
+    async def transcribe_speech(self, recording: Recording):
+        loop = asyncio.get_running_loop()
+        audio = recording.audio
+        if self.vad is not None:
+            start = time.perf_counter()
+            audio = await loop.run_in_executor(None, self.vad.trim, audio, self.sample_rate)
+            self._add("vad_s", time.perf_counter() - start)
+        recording.speech_s = len(audio) / self.sample_rate
+        self._add("speech_s", recording.speech_s)
+        if len(audio) == 0:
+            recording.transcript = ""
+            self._add("silent", 1)
+            return
+
+        start = time.perf_counter()
+        recording.transcript = await loop.run_in_executor(None, self.transcribe, audio)
+        self._add("transcribe_s", time.perf_counter() - start)
+
+    @staticmethod
+    async def _read_into(stream: asyncio.StreamReader, buffer: bytearray):
+        while chunk := await stream.read(CHUNK_SIZE):
+            buffer += chunk
+
+    def _add(self, key: str, value):
+        with self.lock:
+            self.stats[key] += value
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+        return {
+            **stats,
+            # Per-recording ingestion speed: audio seconds downloaded + decoded per wall-second
+            "audio_s_per_wall_s": stats["audio_s"] / stats["ingest_s"] if stats["ingest_s"] else 0.0,
+            "transcribe_realtime_factor": stats["transcribe_s"] / stats["audio_s"] if stats["audio_s"] else 0.0,
+            # Share of the audio the transcriber never saw (silence trimmed by the VAD)
+            "silence_trimmed": 1 - stats["speech_s"] / stats["audio_s"] if stats["audio_s"] and self.transcribe else 0.0
+        }